@@ -2,17 +2,41 @@ import argparse
 import sys
 import json
 import os
-from tqdm import tqdm
-from pdf_processor import extract_text_chunks
-from extractor import extract_knowledge
-from merger import merge_results
+
+# Make the shared `common` package importable when run from this directory
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _repo_root not in sys.path:
+    sys.path.append(_repo_root)
+
+from common.llm_cache import configure_cache
+from common.prescreen import DEFAULT_THRESHOLD
+from common.ndjson import NDJSONWriter
+from common.ollama_client import warm_model, release_model, set_streaming, set_adaptive, concurrency_report
+from common.json_repair import repair_stats
+from common.telemetry import call_telemetry
+from common.manifest import PageManifest, manifest_path_for, hash_pages, document_order
+from pdf_processor import extract_text_chunks, extract_context_chunks, iter_page_texts
+from engine import extract_all
+from journal import RunJournal, journal_path_for, hash_file
+from merger import KnowledgeAccumulator
 from supervisor import supervise_cheatsheet
 
 def main():
     parser = argparse.ArgumentParser(description="PDF Knowledge Extractor using Ollama (Llama 3.1)")
     parser.add_argument("pdf_path", help="Path to the source PDF file")
     parser.add_argument("--output", "-o", default="output.json", help="Path to save the final JSON output")
+    parser.add_argument("--ndjson", help="Also stream final items to this NDJSON file as soon as they are ready")
     parser.add_argument("--model", "-m", default="llama3.1:8b", help="Ollama model to use")
+    parser.add_argument("--concurrency", "-c", type=int, default=6, help="Upper bound on LLM requests in flight; the adaptive limit settles below it")
+    parser.add_argument("--fixed-concurrency", action="store_true", help="Always keep --concurrency requests in flight instead of adapting to observed latency")
+    parser.add_argument("--prescreen-threshold", type=float, default=DEFAULT_THRESHOLD, help="Only send items scoring at least this on the local repair check to the supervisor (0 = send all)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk LLM response cache")
+    parser.add_argument("--clear-cache", action="store_true", help="Clear the LLM response cache before running")
+    parser.add_argument("--chunk-tokens", type=int, default=1500, help="Pack whole pages into chunks of about this many tokens (0 = fixed 3-page windows)")
+    parser.add_argument("--context-tokens", type=int, default=150, help="Send this many tokens of the previous chunk as read-only context instead of overlapping pages (0 = legacy 1-page overlap)")
+    parser.add_argument("--resume", action="store_true", help="Resume from the run journal next to the output, skipping finished work")
+    parser.add_argument("--full", action="store_true", help="Ignore the page manifest from the previous run and reprocess every page")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for complete replies instead of streaming them item by item")
     
     args = parser.parse_args()
 
@@ -20,31 +44,85 @@ def main():
         print(f"Error: File not found: {args.pdf_path}")
         sys.exit(1)
 
+    cache = configure_cache(enabled=not args.no_cache, clear=args.clear_cache)
+    set_streaming(not args.no_stream)
+    set_adaptive(not args.fixed_concurrency)
+    # Loads in the background while the PDF is read
+    warm_model(args.model)
+
     print(f"Processing {args.pdf_path}...")
     print(f"Using model: {args.model}")
+    print(f"Concurrency: {args.concurrency}{'' if args.fixed_concurrency else ' at most (adaptive)'}")
+
+    # Created (and truncated) up front so readers never see a previous run's records
+    stream = NDJSONWriter(args.ndjson) if args.ndjson else None
+
+    journal_path = journal_path_for(args.output)
+    journal = RunJournal(journal_path, hash_file(args.pdf_path), args.model, resume=args.resume)
+    print(f"Checkpoint journal: {journal_path}")
+
+    # 1. Compare page hashes with the previous run and only re-chunk the
+    #    pages that changed; chunks over unchanged pages keep their results
+    manifest = PageManifest(
+        manifest_path_for(args.pdf_path, "cheatsheet"),
+        settings={"model": args.model, "chunk_tokens": args.chunk_tokens, "context_tokens": args.context_tokens},
+        enabled=not args.full
+    )
+    page_hashes = hash_pages(iter_page_texts(args.pdf_path))
+    reused, spans = manifest.plan(page_hashes)
 
-    # 1. Parse PDF into chunks
     # We collect all chunks first to know the total for tqdm, 
     # or we can just iterate. Let's collect to be safe and simple.
     print("Reading PDF and creating chunks...")
-    chunks = list(extract_text_chunks(args.pdf_path))
-    print(f"Total chunks created: {len(chunks)}")
+    fresh = []
+    for span in spans:
+        if args.context_tokens:
+            fresh.extend(extract_context_chunks(args.pdf_path, token_budget=args.chunk_tokens or None, context_tokens=args.context_tokens, page_range=span))
+        else:
+            fresh.extend(extract_text_chunks(args.pdf_path, token_budget=args.chunk_tokens or None, page_range=span))
+    chunks, reuse = document_order(reused, fresh)
+    print(f"Total chunks created: {len(chunks)} ({len(fresh)} to process)")
 
-    # 2. Extract Knowledge from each chunk
-    extracted_data = []
-    
+    # 2. Extract Knowledge from each chunk, merging and deduplicating
+    #    each result in chunk order as soon as it arrives
     print("Extracting knowledge (this may take a while)...")
-    for text, start, end in tqdm(chunks, unit="chunk"):
-        result = extract_knowledge(text, model_name=args.model)
-        extracted_data.append(result)
+    accumulator = KnowledgeAccumulator()
+
+    def on_result(index, result):
+        accumulator.add(result)
+        # Goes to disk right away; only the deduplicated accumulator stays in memory
+        manifest.record_chunk(chunks[index][1], chunks[index][2], result)
+
+    extract_all(
+        chunks,
+        model_name=args.model,
+        concurrency=args.concurrency,
+        journal=journal,
+        on_result=on_result,
+        reuse=reuse
+    )
 
     # 3. Merge Results
     print("Merging and deduplicating results...")
-    merged_knowledge = merge_results(extracted_data)
+    merged_knowledge = accumulator.snapshot()
 
     # 4. AI Supervision
     print("Applying AI Supervision (fixing incomplete sentences)...")
-    final_knowledge = supervise_cheatsheet(merged_knowledge, model=args.model)
+    on_final = None
+    if stream:
+        on_final = lambda category, items: stream.write_many({"category": category, "item": item} for item in items)
+    final_knowledge = supervise_cheatsheet(
+        merged_knowledge,
+        model=args.model,
+        journal=journal,
+        concurrency=args.concurrency,
+        threshold=args.prescreen_threshold,
+        on_final=on_final,
+        known_fixes=manifest.fixes
+    )
+    if stream:
+        stream.close()
+        print(f"Streamed {stream.count} items to {args.ndjson}")
 
     # 5. Save to file
     try:
@@ -54,5 +132,17 @@ def main():
     except Exception as e:
         print(f"Error saving file: {e}")
 
+    try:
+        manifest.save(page_hashes)
+    except Exception as e:
+        print(f"Error saving page manifest: {e}")
+
+    release_model(args.model)
+    print(cache.report())
+    print(repair_stats.report())
+    print(call_telemetry.report())
+    if concurrency_report():
+        print(concurrency_report())
+
 if __name__ == "__main__":
     main()
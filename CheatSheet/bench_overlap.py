@@ -0,0 +1,57 @@
+import os
+import sys
+import argparse
+from tqdm import tqdm
+
+# Make the shared `common` package importable when run from this directory
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _repo_root not in sys.path:
+    sys.path.append(_repo_root)
+
+from common.tokens import estimate_message_tokens
+from pdf_processor import extract_text_chunks, extract_context_chunks
+from extractor import build_messages, extract_knowledge
+from merger import merge_results
+
+def schemes(pdf_path: str):
+    """
+    The chunking schemes being compared, as (label, chunks) pairs.
+    """
+    yield "pages 3, overlap 1 (legacy)", list(extract_text_chunks(pdf_path, chunk_size=3, overlap=1))
+    yield "pages 3, 150-token context", list(extract_context_chunks(pdf_path, chunk_size=3, context_tokens=150))
+    yield "1500-token pages, 150-token context", list(extract_context_chunks(pdf_path, token_budget=1500, context_tokens=150))
+
+def count_unique_items(merged):
+    return sum(len(merged.get(k, [])) for k in ["definitions", "comparisons", "timelines", "concepts"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare prompt tokens and unique items across chunk overlap schemes")
+    parser.add_argument("pdf_path", nargs="?", default=os.path.join(_repo_root, "test.pdf"), help="PDF to benchmark (default: test.pdf)")
+    parser.add_argument("--model", "-m", default="llama3.1:8b", help="Ollama model to use")
+    parser.add_argument("--dry-run", action="store_true", help="Only count prompt tokens, do not call the model")
+    args = parser.parse_args()
+
+    rows = []
+    for label, chunks in schemes(args.pdf_path):
+        prompt_tokens = 0
+        results = []
+        for chunk in tqdm(chunks, desc=label, unit="chunk", disable=args.dry_run):
+            text = chunk[0]
+            context = chunk[3] if len(chunk) > 3 else None
+            prompt_tokens += estimate_message_tokens(build_messages(text, context))
+            if not args.dry_run:
+                results.append(extract_knowledge(text, model_name=args.model, context=context))
+
+        unique = count_unique_items(merge_results(results)) if not args.dry_run else None
+        rows.append((label, len(chunks), prompt_tokens, unique))
+
+    baseline_tokens = rows[0][2] or 1
+    print(f"\n{'scheme':<38}{'chunks':>8}{'prompt tok':>12}{'vs legacy':>11}{'unique items':>14}")
+    for label, n_chunks, prompt_tokens, unique in rows:
+        ratio = f"{prompt_tokens / baseline_tokens * 100:.0f}%"
+        unique_str = "-" if unique is None else str(unique)
+        print(f"{label:<38}{n_chunks:>8}{prompt_tokens:>12}{ratio:>11}{unique_str:>14}")
+    print("\nPrompt tokens are local estimates (common.tokens), including the system prompt.")
+
+if __name__ == "__main__":
+    main()
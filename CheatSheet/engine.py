@@ -0,0 +1,126 @@
+import asyncio
+from typing import List, Dict, Any, Tuple, Callable, Optional
+from tqdm import tqdm
+
+from common.ollama_client import get_async_client, request_limiter, streaming_enabled
+from common.json_stream import RequestTimer, StreamTimings
+from extractor import request_knowledge_async, empty_result
+from journal import RunJournal
+
+class InOrderEmitter:
+    """
+    Hands results to a callback strictly in chunk order. Results that finish
+    early are parked until every earlier chunk has been emitted, so at most
+    roughly `concurrency` results are buffered at a time.
+    """
+
+    def __init__(self, on_result: Callable[[int, Dict[str, Any]], None]):
+        self.on_result = on_result
+        self.next_index = 0
+        self.ready: Dict[int, Dict[str, Any]] = {}
+
+    def push(self, index: int, result: Dict[str, Any]):
+        self.ready[index] = result
+        while self.next_index in self.ready:
+            self.on_result(self.next_index, self.ready.pop(self.next_index))
+            self.next_index += 1
+
+async def _extract_all(
+    chunks: List[Tuple],
+    model_name: str,
+    concurrency: int,
+    journal: RunJournal = None,
+    on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    reuse: Optional[Dict[int, Dict[str, Any]]] = None
+) -> Optional[List[Dict[str, Any]]]:
+    client = get_async_client()
+    semaphore = request_limiter(concurrency)
+
+    results: List[Dict[str, Any]] = None
+    if on_result is None:
+        # Pre-sized so every result lands in its chunk's slot regardless of completion order
+        results = [None] * len(chunks)
+
+        def on_result(index, result):
+            results[index] = result
+
+    emitter = InOrderEmitter(on_result)
+
+    pending = []
+    resumed = 0
+    for i, chunk in enumerate(chunks):
+        text = chunk[0]
+        if reuse and i in reuse:
+            emitter.push(i, reuse[i])
+            continue
+        cached = journal.get_chunk(i, text) if journal else None
+        if cached is not None:
+            emitter.push(i, cached)
+            resumed += 1
+        else:
+            pending.append(i)
+
+    if resumed:
+        print(f"Resuming: {resumed} of {len(chunks)} chunks already done.")
+
+    timings = StreamTimings()
+    streamed_items = 0
+
+    with tqdm(total=len(chunks), initial=len(chunks) - len(pending), unit="chunk") as pbar:
+        def count_item(category, item):
+            # Items show up in the progress bar as soon as they are generated
+            nonlocal streamed_items
+            streamed_items += 1
+            pbar.set_postfix(items=streamed_items, refresh=False)
+
+        async def worker(index: int):
+            text, start, end = chunks[index][:3]
+            # Chunks from extract_context_chunks() carry read-only preceding context
+            context = chunks[index][3] if len(chunks[index]) > 3 else None
+            async with semaphore:
+                timer = RequestTimer(count_item)
+                try:
+                    result = await request_knowledge_async(text, model_name=model_name, client=client, context=context, on_item=timer.on_item, label=f"chunk {index + 1}, pages {start}-{end}")
+                    timings.record(timer)
+                    if journal:
+                        journal.record_chunk(index, text, start, end, result)
+                except Exception as e:
+                    # Failed chunks are not journaled so --resume retries them
+                    print(f"Error extracting knowledge (pages {start}-{end}): {e}")
+                    result = empty_result()
+            emitter.push(index, result)
+            pbar.update(1)
+
+        await asyncio.gather(*(worker(i) for i in pending))
+
+    if pending and streaming_enabled():
+        print(timings.report())
+
+    return results
+
+def extract_all(
+    chunks: List[Tuple],
+    model_name: str = "llama3.1:8b",
+    concurrency: int = 4,
+    journal: RunJournal = None,
+    on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    reuse: Optional[Dict[int, Dict[str, Any]]] = None
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Runs extract_knowledge over every chunk with at most `concurrency`
+    requests in flight against the Ollama server.
+
+    Results are returned in chunk order, so merge_results() output is the
+    same as with the sequential loop. When a journal is given, chunks it
+    already holds are skipped and every new result is checkpointed.
+
+    If `on_result(index, result)` is given, each result is passed to it in
+    chunk order as soon as it is available and nothing is retained (the
+    function then returns None).
+
+    `reuse` maps chunk indices to results from a previous run (see
+    common.manifest); those chunks are emitted as-is without a request.
+    """
+    if concurrency < 1:
+        concurrency = 1
+    return asyncio.run(_extract_all(chunks, model_name, concurrency, journal, on_result, reuse))
@@ -1,7 +1,10 @@
 import ollama
-from typing import Dict, Any
+from typing import Dict, Any, List, Callable, Optional
 import json
 
+from common.llm_cache import cached_chat, cached_achat
+from common.ollama_client import get_async_client
+
 SYSTEM_PROMPT = """
 You are an expert knowledge extractor. Your task is to analyze the provided text from a document and extract structured information into JSON format.
 
@@ -18,28 +21,64 @@ Rules:
 - Do not make up information.
 """
 
-def extract_knowledge(text_chunk: str, model_name: str = "llama3.1:8b") -> Dict[str, Any]:
+def empty_result() -> Dict[str, Any]:
+    """
+    Returns the extraction structure with every category empty.
+    """
+    return {
+        "definitions": [],
+        "comparisons": [],
+        "timelines": [],
+        "concepts": []
+    }
+
+CONTEXT_PREFIX = """Preceding context (already processed; use it only to understand the text below, do NOT extract anything from it):
+
+{context}
+
+---
+
+"""
+
+def build_messages(text_chunk: str, context: str = None) -> List[Dict[str, str]]:
+    """
+    Builds the chat messages for a single extraction request.
+    `context` is optional read-only text from the previous chunk.
+    """
+    prefix = CONTEXT_PREFIX.format(context=context) if context else ""
+    return [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': f"{prefix}Analyze this text and extract knowledge:\n\n{text_chunk}"}
+    ]
+
+def extract_knowledge(text_chunk: str, model_name: str = "llama3.1:8b", context: str = None) -> Dict[str, Any]:
     """
     Sends text to Ollama and returns structured JSON extraction.
     """
     try:
-        response = ollama.chat(
-            model=model_name,
-            messages=[
-                {'role': 'system', 'content': SYSTEM_PROMPT},
-                {'role': 'user', 'content': f"Analyze this text and extract knowledge:\n\n{text_chunk}"}
-            ],
-            format='json',
-        )
-        
-        content = response['message']['content']
+        content = cached_chat(model_name, build_messages(text_chunk, context), format='json', stage="extract")
         return json.loads(content)
         
     except Exception as e:
         print(f"Error extracting knowledge: {e}")
-        return {
-            "definitions": [],
-            "comparisons": [],
-            "timelines": [],
-            "concepts": []
-        }
+        return empty_result()
+
+async def request_knowledge_async(
+    text_chunk: str,
+    model_name: str = "llama3.1:8b",
+    client: ollama.AsyncClient = None,
+    context: str = None,
+    on_item: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    label: str = None
+) -> Dict[str, Any]:
+    """
+    Async extraction request that raises on failure instead of returning
+    empty lists, so callers can tell a failed chunk from an empty one.
+    `on_item(category, item)` is called for each item as it streams in;
+    `label` identifies the chunk in watchdog logs.
+    """
+    if client is None:
+        client = get_async_client()
+
+    content = await cached_achat(client, model_name, build_messages(text_chunk, context), format='json', stage="extract", on_item=on_item, label=label)
+    return json.loads(content)
@@ -0,0 +1,122 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def journal_path_for(output_path: str) -> str:
+    """
+    The journal lives next to the output file, e.g. output.json -> output.journal.jsonl
+    """
+    root, _ = os.path.splitext(output_path)
+    return f"{root}.journal.jsonl"
+
+class RunJournal:
+    """
+    Append-only JSONL checkpoint log for one cheat-sheet run.
+
+    Every finished chunk extraction and supervisor batch is written as one
+    line as soon as it completes, so a killed run can be resumed without
+    repeating LLM work. Entries are matched on an input hash, so anything
+    whose input changed since the journal was written is redone.
+    """
+
+    def __init__(self, path: str, source_hash: str, model: str, resume: bool = False):
+        self.path = path
+        self.source_hash = source_hash
+        self.model = model
+        self.chunks: Dict[int, Dict[str, Any]] = {}
+        self.batches: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+        if resume and os.path.exists(path):
+            self._load()
+        else:
+            self._start()
+
+    def _start(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"type": "run", "source_hash": self.source_hash, "model": self.model}) + "\n")
+
+    def _load(self):
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A run killed mid-write can leave a partial last line
+                    continue
+
+        header = entries[0] if entries else {}
+        if header.get("type") != "run" or header.get("source_hash") != self.source_hash or header.get("model") != self.model:
+            print("  ! Journal belongs to a different PDF or model, starting fresh.")
+            self._start()
+            return
+
+        for entry in entries[1:]:
+            if entry.get("type") == "chunk":
+                self.chunks[entry["index"]] = entry
+            elif entry.get("type") == "supervisor_batch":
+                self.batches[self._batch_key(entry["category"], entry["batch_index"])] = entry
+
+    def _append(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+
+    @staticmethod
+    def _batch_key(category: str, batch_index: int) -> str:
+        return f"{category}:{batch_index}"
+
+    def get_chunk(self, index: int, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the journaled extraction for a chunk, or None if it has to be (re)done.
+        """
+        # Popped so a resumed run does not keep every journaled result in memory
+        entry = self.chunks.pop(index, None)
+        if entry and entry.get("input_hash") == hash_text(text):
+            return entry["result"]
+        return None
+
+    def record_chunk(self, index: int, text: str, start_page: int, end_page: int, result: Dict[str, Any]):
+        entry = {
+            "type": "chunk",
+            "index": index,
+            "start_page": start_page,
+            "end_page": end_page,
+            "input_hash": hash_text(text),
+            "result": result
+        }
+        self._append(entry)
+
+    def get_batch(self, category: str, batch_index: int, batch: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        entry = self.batches.pop(self._batch_key(category, batch_index), None)
+        if entry and entry.get("input_hash") == hash_text(json.dumps(batch, ensure_ascii=False, sort_keys=True)):
+            return entry["result"]
+        return None
+
+    def record_batch(self, category: str, batch_index: int, batch: List[Dict[str, Any]], result: List[Dict[str, Any]]):
+        entry = {
+            "type": "supervisor_batch",
+            "category": category,
+            "batch_index": batch_index,
+            "input_hash": hash_text(json.dumps(batch, ensure_ascii=False, sort_keys=True)),
+            "result": result
+        }
+        self._append(entry)
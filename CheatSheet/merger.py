@@ -1,23 +1,42 @@
 from typing import List, Dict, Any
 
-def merge_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+from common.dedupe import collapse_near_duplicates
+
+# Jaccard similarity above which two items are treated as the same fact
+NEAR_DUPLICATE_THRESHOLD = 0.6
+
+class KnowledgeAccumulator:
     """
-    Merges multiple extraction dictionaries into a single master dictionary,
-    removing duplicates.
+    Incrementally merges extraction dictionaries as they arrive, removing
+    duplicates on the fly. Only unique items are kept, so memory grows with
+    the number of distinct definitions/comparisons/timelines/concepts rather
+    than with the number of chunks consumed.
+
+    Near-duplicates ("Pandas" / "pandas" / "Pandas library") are collapsed
+    when a snapshot is taken; pass near_duplicate_threshold=None to keep
+    exact-match deduplication only.
     """
-    merged = {
-        "definitions": {},  # Keyed by term
-        "comparisons": set(), # Set of tuples for uniqueness
-        "timelines": {},    # Keyed by date+event signature
-        "concepts": {}      # Keyed by concept name
-    }
 
-    for res in results:
+    def __init__(self, near_duplicate_threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.definitions = {}  # Keyed by term
+        self.comparisons = {}  # Tuples as keys for uniqueness, in first-seen order
+        self.timelines = {}    # Keyed by date+event signature
+        self.concepts = {}     # Keyed by concept name
+        self.chunks_seen = 0
+
+    def add(self, res: Dict[str, Any]):
+        """
+        Consumes one chunk's extraction result. Items missing their main
+        field (e.g. one closed early by JSON repair) are skipped.
+        """
+        self.chunks_seen += 1
+
         # 1. Merge Definitions (Deduplicate by Term)
         for item in res.get("definitions", []):
             term = item.get("term", "").strip()
-            if term and term not in merged["definitions"]:
-                merged["definitions"][term] = item["definition"]
+            if term and item.get("definition") and term not in self.definitions:
+                self.definitions[term] = item["definition"]
 
         # 2. Merge Comparisons (Deduplicate by full content)
         for item in res.get("comparisons", []):
@@ -27,40 +46,90 @@ def merge_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
                 item.get("subject_b", "").strip(),
                 item.get("difference_or_similarity", "").strip()
             )
-            merged["comparisons"].add(comp_tuple)
+            self.comparisons.setdefault(comp_tuple, None)
 
         # 3. Merge Timelines (Deduplicate by Date + Event)
         for item in res.get("timelines", []):
             date_str = item.get("date", "").strip()
             event_str = item.get("event", "").strip()
             key = f"{date_str}||{event_str}"
-            if key and key not in merged["timelines"]:
-                merged["timelines"][key] = item
+            if event_str and key not in self.timelines:
+                self.timelines[key] = item
 
         # 4. Merge Concepts (Deduplicate by Name)
         for item in res.get("concepts", []):
             name = item.get("name", "").strip()
-            if name and name not in merged["concepts"]:
-                merged["concepts"][name] = item["explanation"]
+            if name and item.get("explanation") and name not in self.concepts:
+                self.concepts[name] = item["explanation"]
 
-    # Convert back to list format
-    final_output = {
-        "definitions": [
-            {"term": k, "definition": v} for k, v in merged["definitions"].items()
-        ],
-        "comparisons": [
-            {"subject_a": t[0], "subject_b": t[1], "difference_or_similarity": t[2]} 
-            for t in merged["comparisons"]
-        ],
-        "timelines": list(merged["timelines"].values()),
-        "concepts": [
-            {"name": k, "explanation": v} for k, v in merged["concepts"].items()
-        ]
-    }
-    
-    # Sort for tidiness (Optional)
-    final_output["definitions"].sort(key=lambda x: x["term"])
-    final_output["timelines"].sort(key=lambda x: x["date"])
-    final_output["concepts"].sort(key=lambda x: x["name"])
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the merged output for everything consumed so far.
+        Can be called at any point without affecting further add() calls.
+        """
+        # Convert back to list format
+        final_output = {
+            "definitions": [
+                {"term": k, "definition": v} for k, v in self.definitions.items()
+            ],
+            "comparisons": [
+                {"subject_a": t[0], "subject_b": t[1], "difference_or_similarity": t[2]} 
+                for t in self.comparisons
+            ],
+            "timelines": list(self.timelines.values()),
+            "concepts": [
+                {"name": k, "explanation": v} for k, v in self.concepts.items()
+            ]
+        }
+        
+        if self.near_duplicate_threshold:
+            self._collapse(final_output)
 
-    return final_output
+        # Sort for tidiness (Optional)
+        final_output["definitions"].sort(key=lambda x: x["term"])
+        final_output["timelines"].sort(key=lambda x: x.get("date", ""))
+        final_output["concepts"].sort(key=lambda x: x["name"])
+
+        return final_output
+
+    def _collapse(self, output: Dict[str, Any]):
+        threshold = self.near_duplicate_threshold
+        output["definitions"] = collapse_near_duplicates(
+            output["definitions"],
+            key=lambda x: x["term"],
+            text=lambda x: f"{x['term']} {x['definition']}",
+            threshold=threshold,
+            subject=lambda x: x["term"]
+        )
+        output["comparisons"] = collapse_near_duplicates(
+            output["comparisons"],
+            # Subject order does not matter for "A vs B"
+            key=lambda x: " | ".join(sorted([x["subject_a"], x["subject_b"]])) + " | " + x["difference_or_similarity"],
+            text=lambda x: f"{x['subject_a']} {x['subject_b']} {x['difference_or_similarity']}",
+            threshold=threshold,
+            subject=lambda x: f"{x['subject_a']} {x['subject_b']}"
+        )
+        output["timelines"] = collapse_near_duplicates(
+            output["timelines"],
+            key=lambda x: f"{x.get('date', '')} {x.get('event', '')}",
+            text=lambda x: f"{x.get('date', '')} {x.get('event', '')}",
+            threshold=threshold,
+            subject=lambda x: x.get("date", "") or x.get("event", "")
+        )
+        output["concepts"] = collapse_near_duplicates(
+            output["concepts"],
+            key=lambda x: x["name"],
+            text=lambda x: f"{x['name']} {x['explanation']}",
+            threshold=threshold,
+            subject=lambda x: x["name"]
+        )
+
+def merge_results(results: List[Dict[str, Any]], near_duplicate_threshold: float = NEAR_DUPLICATE_THRESHOLD) -> Dict[str, Any]:
+    """
+    Merges multiple extraction dictionaries into a single master dictionary,
+    removing duplicates.
+    """
+    accumulator = KnowledgeAccumulator(near_duplicate_threshold)
+    for res in results:
+        accumulator.add(res)
+    return accumulator.snapshot()
@@ -1,31 +1,67 @@
+import re
 import fitz  # PyMuPDF
-from typing import List, Generator, Tuple
+from typing import List, Generator, Tuple, Iterator
 
-def extract_text_chunks(pdf_path: str, chunk_size: int = 3, overlap: int = 1) -> Generator[Tuple[str, int, int], None, None]:
+from common.tokens import estimate_tokens
+
+def iter_page_texts(pdf_path: str) -> Iterator[str]:
+    """
+    Yields the text of every page in order.
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        for page in doc:
+            yield page.get_text()
+    finally:
+        doc.close()
+
+def _page_bounds(doc, page_range: Tuple[int, int] = None) -> Tuple[int, int]:
+    """
+    0-based [first, last) page indices for a 1-based inclusive page range.
+    """
+    if not page_range:
+        return 0, len(doc)
+    return page_range[0] - 1, min(page_range[1], len(doc))
+
+def extract_text_chunks(
+    pdf_path: str,
+    chunk_size: int = 3,
+    overlap: int = 1,
+    token_budget: int = None,
+    page_range: Tuple[int, int] = None
+) -> Generator[Tuple[str, int, int], None, None]:
     """
     Extracts text from a PDF using a sliding window approach.    
     Args:
         pdf_path: Path to the PDF file.
         chunk_size: Number of pages per chunk.
         overlap: Number of pages to overlap between chunks.        
+        token_budget: If set, ignore chunk_size/overlap and pack whole pages
+            up to this many estimated tokens instead (see extract_budgeted_chunks).
+        page_range: Optional 1-based inclusive (first, last) pages to chunk
+            instead of the whole document.
     Yields:
         Tuple containing (combined_text, start_page_num, end_page_num).
         Page numbers are 1-based.
     """
+    if token_budget:
+        yield from extract_budgeted_chunks(pdf_path, token_budget, page_range)
+        return
+
     doc = fitz.open(pdf_path)
-    total_pages = len(doc)
+    first_page, total_pages = _page_bounds(doc, page_range)
     
     # Calculate step size
     step = chunk_size - overlap
     if step < 1:
         step = 1
 
-    for start_idx in range(0, total_pages, step):
+    for start_idx in range(first_page, total_pages, step):
         end_idx = min(start_idx + chunk_size, total_pages)
         
         # If we are at the end and the chunk is just the overlap from previous, stop 
         # (unless it's the very first chunk and total pages < chunk_size)
-        if start_idx > 0 and start_idx >= total_pages:
+        if start_idx > first_page and start_idx >= total_pages:
             break
 
         chunk_text = []
@@ -39,3 +75,135 @@ def extract_text_chunks(pdf_path: str, chunk_size: int = 3, overlap: int = 1) ->
         yield combined_text, start_idx + 1, end_idx
 
     doc.close()
+
+# Split points tried in order for an oversized page: paragraphs, then lines, then words
+_SEPARATORS = [(r"\n\s*\n", "\n\n"), (r"\n", "\n"), (r" +", " ")]
+
+def _split_oversized(text: str, token_budget: int, level: int = 0) -> List[str]:
+    """
+    Splits a single page that exceeds the budget at paragraph boundaries,
+    falling back to lines and then words for paragraphs that are still too big.
+    """
+    if estimate_tokens(text) <= token_budget or level == len(_SEPARATORS):
+        return [text]
+
+    pattern, joiner = _SEPARATORS[level]
+    parts = []
+    for part in re.split(pattern, text):
+        if part.strip():
+            parts.extend(_split_oversized(part, token_budget, level + 1))
+    return _pack(parts, token_budget, joiner)
+
+def _pack(parts: List[str], token_budget: int, separator: str) -> List[str]:
+    packed = []
+    current = []
+    current_tokens = 0
+    for part in parts:
+        tokens = estimate_tokens(part)
+        if current and current_tokens + tokens > token_budget:
+            packed.append(separator.join(current))
+            current = []
+            current_tokens = 0
+        current.append(part)
+        current_tokens += tokens
+    if current:
+        packed.append(separator.join(current))
+    return packed
+
+def extract_budgeted_chunks(
+    pdf_path: str,
+    token_budget: int = 1500,
+    page_range: Tuple[int, int] = None
+) -> Generator[Tuple[str, int, int], None, None]:
+    """
+    Packs whole pages into chunks of at most `token_budget` estimated tokens.
+    Sparse pages (slides) are combined into fewer, fuller requests, and any
+    page larger than the budget is split at paragraph boundaries so nothing
+    is silently truncated by the model's context window.
+    Yields:
+        Tuple containing (combined_text, start_page_num, end_page_num).
+        Page numbers are 1-based; pieces of a split page share its number.
+    """
+    doc = fitz.open(pdf_path)
+
+    chunk_text = []
+    chunk_tokens = 0
+    start_page = None
+    end_page = None
+
+    first_page, last_page = _page_bounds(doc, page_range)
+    for i in range(first_page, last_page):
+        page_num = i + 1
+        text = doc.load_page(i).get_text()
+        tokens = estimate_tokens(text)
+
+        if tokens > token_budget:
+            if chunk_text:
+                yield "\n".join(chunk_text), start_page, end_page
+                chunk_text, chunk_tokens = [], 0
+            for piece in _split_oversized(text, token_budget):
+                yield piece, page_num, page_num
+            continue
+
+        if chunk_text and chunk_tokens + tokens > token_budget:
+            yield "\n".join(chunk_text), start_page, end_page
+            chunk_text, chunk_tokens = [], 0
+
+        if not chunk_text:
+            start_page = page_num
+        chunk_text.append(text)
+        chunk_tokens += tokens
+        end_page = page_num
+
+    if chunk_text:
+        yield "\n".join(chunk_text), start_page, end_page
+
+    doc.close()
+
+def _tail_sentences(text: str, context_tokens: int) -> str:
+    """
+    Returns the last whole sentences of `text` that fit in `context_tokens`.
+    """
+    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+    tail = []
+    used = 0
+    for sentence in reversed(sentences):
+        tokens = estimate_tokens(sentence)
+        if tail and used + tokens > context_tokens:
+            break
+        if not tail and tokens > context_tokens:
+            # The final sentence alone is too long: keep only its last words
+            words = sentence.split()
+            keep = max(1, len(words) * context_tokens // tokens)
+            return " ".join(words[-keep:])
+        tail.append(sentence)
+        used += tokens
+    return " ".join(reversed(tail))
+
+def extract_context_chunks(
+    pdf_path: str,
+    chunk_size: int = 3,
+    token_budget: int = None,
+    context_tokens: int = 150,
+    page_range: Tuple[int, int] = None
+) -> Generator[Tuple[str, int, int, str], None, None]:
+    """
+    Non-overlapping chunks, each paired with a short tail of the previous
+    chunk as read-only context. Unlike page overlap, no page is extracted
+    twice; the model only sees a few sentences of what came before so
+    facts spanning a chunk boundary still make sense.
+    Yields:
+        Tuple containing (text, start_page_num, end_page_num, preceding_context).
+        The first three fields follow extract_text_chunks(); the context is
+        empty for the first chunk. When `page_range` starts mid-document,
+        the first chunk gets the tail of the page before the range.
+    """
+    previous = None
+    if page_range and page_range[0] > 1:
+        doc = fitz.open(pdf_path)
+        previous = doc.load_page(page_range[0] - 2).get_text()
+        doc.close()
+    for text, start, end in extract_text_chunks(pdf_path, chunk_size=chunk_size, overlap=0, token_budget=token_budget, page_range=page_range):
+        context = _tail_sentences(previous, context_tokens) if previous else ""
+        yield text, start, end, context
+        previous = text
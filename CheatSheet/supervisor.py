@@ -1,6 +1,13 @@
-import ollama
 import json
-from typing import Dict, Any, List
+import asyncio
+import ollama
+from typing import Dict, Any, List, Callable
+
+from common.llm_cache import cached_achat
+from common.ollama_client import get_async_client, request_limiter
+from common.tokens import batch_by_tokens, estimate_tokens
+from common.prescreen import needs_repair, DEFAULT_THRESHOLD
+from common.manifest import item_hash
 
 SUPERVISOR_PROMPT = """
 You are an expert editor. Your task is to review the provided structured notes (definitions, comparisons, timelines, concepts) and fix any incomplete sentences, grammatical errors, or awkward phrasing.
@@ -8,63 +15,191 @@ Ensure the content remains accurate to the source material but is polished and c
 Return the output in the EXACT same JSON structure as the input. Do not add or remove items, just refine the text values.
 """
 
-def supervise_cheatsheet(data: Dict[str, Any], model: str = "llama3.1:8b") -> Dict[str, Any]:
+CATEGORIES = ["definitions", "comparisons", "timelines", "concepts"]
+
+# Field kinds used by the local pre-screen (see common.prescreen.score_text)
+CATEGORY_FIELDS = {
+    "definitions": {"term": "phrase", "definition": "sentence"},
+    "comparisons": {"subject_a": "phrase", "subject_b": "phrase", "difference_or_similarity": "sentence"},
+    "timelines": {"date": "phrase", "event": "phrase"},
+    "concepts": {"name": "phrase", "explanation": "sentence"},
+}
+
+# The model echoes every item back, so input and output each get about this
+# many tokens; together with the prompt that fits llama3.1's default context.
+BATCH_TOKENS = 800
+MAX_BATCH_ITEMS = 20
+
+def _item_tokens(item: Dict[str, Any]) -> int:
+    return estimate_tokens(json.dumps(item, ensure_ascii=False))
+
+def _parse_fixed_batch(content: str, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    fixed_batch = json.loads(content)
+    
+    # Handling potential structure mismatch from LLM
+    if isinstance(fixed_batch, dict):
+        # sometimes LLM wraps it in a key like {"definitions": [...]} 
+        values = list(fixed_batch.values())
+        if values and isinstance(values[0], list):
+            fixed_batch = values[0]
+        else:
+            # If it returned a dict but not the list we wanted, fallback to original
+            fixed_batch = batch
+
+    if not isinstance(fixed_batch, list):
+        fixed_batch = batch
+    return fixed_batch
+
+async def _supervise_batch(
+    client: ollama.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    model: str,
+    category: str,
+    batch_index: int,
+    batch: List[Dict[str, Any]],
+    journal
+) -> List[Dict[str, Any]]:
+    if journal:
+        done = journal.get_batch(category, batch_index, batch)
+        if done is not None:
+            return done
+
+    async with semaphore:
+        try:
+            content = await cached_achat(
+                client,
+                model,
+                [
+                    {'role': 'system', 'content': SUPERVISOR_PROMPT},
+                    {'role': 'user', 'content': f"Fix and polish this JSON list of {category}:\n\n{json.dumps(batch, ensure_ascii=False)}"}
+                ],
+                format='json',
+                stage="supervise",
+                label=f"{category} batch {batch_index + 1}",
+            )
+            fixed_batch = _parse_fixed_batch(content, batch)
+
+        except Exception as e:
+            print(f"    ! Error supervising batch in {category}: {e}")
+            # Fallback to original data on error
+            return batch
+
+    if journal:
+        journal.record_batch(category, batch_index, batch, fixed_batch)
+    return fixed_batch
+
+async def _supervise_all(
+    data: Dict[str, Any],
+    model: str,
+    journal,
+    concurrency: int,
+    batch_tokens: int,
+    threshold: float,
+    on_final: Callable[[str, List[Dict[str, Any]]], None] = None,
+    known_fixes: Dict[str, Dict[str, Any]] = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    client = get_async_client()
+    semaphore = request_limiter(concurrency)
+
+    refined_data = {category: list(data.get(category, [])) for category in CATEGORIES}
+
+    previous_fixes = {}
+    if known_fixes is not None:
+        previous_fixes = dict(known_fixes)
+        known_fixes.clear()
+
+    # Only items the local pre-screen flags are sent; batches from every
+    # category are dispatched together
+    jobs = []
+    flagged_by_category = {}
+    total_items = 0
+    flagged_items = 0
+    reused_fixes = 0
+    calls_without_prescreen = 0
+    prescreen_calls = 0
+    for category in CATEGORIES:
+        items = refined_data[category]
+        flagged = [i for i, item in enumerate(items) if needs_repair(item, CATEGORY_FIELDS[category], threshold)]
+        total_items += len(items)
+        flagged_items += len(flagged)
+        calls_without_prescreen += len(batch_by_tokens(items, batch_tokens, max_items=MAX_BATCH_ITEMS))
+        calls_needed = len(batch_by_tokens(flagged, batch_tokens, max_items=MAX_BATCH_ITEMS, cost=lambda i: _item_tokens(items[i])))
+
+        # Items repaired in a previous run (unchanged pages) reuse that repair
+        still_flagged = []
+        for i in flagged:
+            key = item_hash(items[i])
+            if key in previous_fixes:
+                known_fixes[key] = previous_fixes[key]
+                items[i] = previous_fixes[key]
+            else:
+                still_flagged.append(i)
+        reused_fixes += len(flagged) - len(still_flagged)
+        flagged = still_flagged
+        flagged_by_category[category] = set(flagged)
+
+        index_batches = batch_by_tokens(flagged, batch_tokens, max_items=MAX_BATCH_ITEMS, cost=lambda i: _item_tokens(items[i]))
+        for batch_index, indices in enumerate(index_batches):
+            jobs.append((category, batch_index, indices, [items[i] for i in indices]))
+        prescreen_calls += calls_needed
+
+    print(f"  - Pre-screen: {flagged_items} of {total_items} items need repair, "
+          f"{calls_without_prescreen - prescreen_calls} of {calls_without_prescreen} LLM calls saved")
+    if reused_fixes:
+        print(f"  - Reused {reused_fixes} repairs from the previous run, "
+              f"{prescreen_calls - len(jobs)} more LLM calls saved")
+
+    if on_final:
+        # Items that skip the LLM are already final
+        for category in CATEGORIES:
+            flagged = flagged_by_category[category]
+            on_final(category, [item for i, item in enumerate(refined_data[category]) if i not in flagged])
+
+    async def run_job(category, batch_index, indices, batch):
+        fixed_batch = await _supervise_batch(client, semaphore, model, category, batch_index, batch, journal)
+        if len(fixed_batch) != len(indices):
+            print(f"    ! Supervisor returned {len(fixed_batch)} items for {len(indices)} in {category}, keeping originals")
+            fixed_batch = batch
+
+        # Put repaired items back in their original positions
+        for i, original, item in zip(indices, batch, fixed_batch):
+            refined_data[category][i] = item
+            # Fallbacks to the original are not remembered, so they are retried next run
+            if known_fixes is not None and fixed_batch is not batch:
+                known_fixes[item_hash(original)] = item
+        if on_final:
+            on_final(category, fixed_batch)
+
+    await asyncio.gather(*(run_job(*job) for job in jobs))
+    return refined_data
+
+def supervise_cheatsheet(
+    data: Dict[str, Any],
+    model: str = "llama3.1:8b",
+    journal=None,
+    concurrency: int = 4,
+    batch_tokens: int = BATCH_TOKENS,
+    threshold: float = DEFAULT_THRESHOLD,
+    on_final: Callable[[str, List[Dict[str, Any]]], None] = None,
+    known_fixes: Dict[str, Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """
     Sends the merged data to the LLM for a final polish/fix pass.
-    To avoid context limits, we process each category separately or in batches.
+    To avoid context limits, items are grouped into batches of about
+    `batch_tokens` tokens, and up to `concurrency` batches from all
+    categories are in flight at once.
+    Only items flagged by the local pre-screen (score >= `threshold`) are
+    sent; threshold=0 sends every item.
+    `on_final(category, items)` is called as soon as items are final (not
+    sent to the LLM, or their batch has come back), in no particular order.
+    If a RunJournal is given, batches it already holds are reused and new ones are checkpointed.
+    `known_fixes` maps item_hash() of an input item to its repair from a
+    previous run; matching items skip the LLM. It is updated in place to
+    hold exactly the repairs that apply to this run's items.
     """
     print("  - Running AI Supervision on Notes...")
-    
-    refined_data = {
-        "definitions": [],
-        "comparisons": [],
-        "timelines": [],
-        "concepts": []
-    }
-
-    # Process each category
-    for category in ["definitions", "comparisons", "timelines", "concepts"]:
-        items = data.get(category, [])
-        if not items:
-            continue
-            
-        # We'll process items in batches of 10 to ensure quality and fit in context
-        batch_size = 10
-        for i in range(0, len(items), batch_size):
-            batch = items[i : i + batch_size]
-            
-            try:
-                response = ollama.chat(
-                    model=model,
-                    messages=[
-                        {'role': 'system', 'content': SUPERVISOR_PROMPT},
-                        {'role': 'user', 'content': f"Fix and polish this JSON list of {category}:\n\n{json.dumps(batch, ensure_ascii=False)}"}
-                    ],
-                    format='json',
-                )
-                
-                content = response['message']['content']
-                fixed_batch = json.loads(content)
-                
-                # Handling potential structure mismatch from LLM
-                if isinstance(fixed_batch, dict):
-                    # sometimes LLM wraps it in a key like {"definitions": [...]} 
-                    values = list(fixed_batch.values())
-                    if values and isinstance(values[0], list):
-                        fixed_batch = values[0]
-                    else:
-                        # If it returned a dict but not the list we wanted, fallback to original
-                        fixed_batch = batch
-
-                if isinstance(fixed_batch, list):
-                    refined_data[category].extend(fixed_batch)
-                else:
-                    refined_data[category].extend(batch)
-                    
-            except Exception as e:
-                print(f"    ! Error supervising batch in {category}: {e}")
-                # Fallback to original data on error
-                refined_data[category].extend(batch)
+
+    refined_data = asyncio.run(_supervise_all(data, model, journal, max(1, concurrency), batch_tokens, threshold, on_final, known_fixes))
 
     # Copy over any other keys that might exist (though merger usually only outputs these 4)
     for k, v in data.items():
@@ -0,0 +1,13 @@
+from engine import InOrderEmitter
+
+def test_results_are_emitted_in_chunk_order():
+    emitted = []
+    emitter = InOrderEmitter(lambda index, result: emitted.append((index, result)))
+    emitter.push(2, "c")
+    emitter.push(1, "b")
+    assert emitted == []
+    emitter.push(0, "a")
+    assert emitted == [(0, "a"), (1, "b"), (2, "c")]
+    assert emitter.ready == {}
+    emitter.push(3, "d")
+    assert emitted[-1] == (3, "d")
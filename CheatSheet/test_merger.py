@@ -0,0 +1,23 @@
+from merger import merge_results
+
+def test_distinct_facts_with_similar_wording_are_kept():
+    merged = merge_results([
+        {"definitions": [{"term": "Supervised learning", "definition": "Learning from labeled data."}]},
+        {"definitions": [{"term": "Unsupervised learning", "definition": "Learning from unlabeled data."}],
+         "concepts": [{"name": "Python list", "explanation": "An ordered collection of items."},
+                      {"name": "Python tuple", "explanation": "An ordered collection of items that cannot change."}]},
+    ])
+    assert [d["term"] for d in merged["definitions"]] == ["Supervised learning", "Unsupervised learning"]
+    assert [c["name"] for c in merged["concepts"]] == ["Python list", "Python tuple"]
+
+def test_near_duplicates_are_collapsed():
+    merged = merge_results([
+        {"definitions": [{"term": "Pandas", "definition": "A Python library for data analysis and manipulation."}]},
+        {"definitions": [{"term": "Pandas library", "definition": "A Python library for data analysis and manipulation."}]},
+    ])
+    assert [d["term"] for d in merged["definitions"]] == ["Pandas library"]
+
+def test_items_without_their_main_field_are_skipped():
+    merged = merge_results([{"definitions": [{"term": "Cut off"}], "timelines": [{"date": "1990"}]}])
+    assert merged["definitions"] == []
+    assert merged["timelines"] == []
@@ -0,0 +1,167 @@
+import asyncio
+from typing import List, Dict, Any, Iterable, Tuple, Optional, Callable
+from tqdm import tqdm
+
+from common.ollama_client import get_async_client, request_limiter, streaming_enabled
+from common.json_stream import RequestTimer, StreamTimings
+from llm_client import generate_questions_async, generate_questions_from_notes_async
+
+def _item_counter(pbar: tqdm) -> Callable[[Optional[str], Dict[str, Any]], None]:
+    """
+    Streamed questions show up in the progress bar as soon as they are generated.
+    """
+    count = 0
+
+    def on_item(key, item):
+        nonlocal count
+        count += 1
+        pbar.set_postfix(questions=count, refresh=False)
+
+    return on_item
+
+async def _generate_all(
+    chunks: Iterable[str],
+    question_type: str,
+    char_limit: int,
+    model: str,
+    concurrency: int,
+    notes_data: Optional[Dict[str, Any]],
+    on_chunk: Optional[Callable[[int, List[Dict[str, Any]]], None]]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    client = get_async_client()
+    semaphore = request_limiter(concurrency)
+
+    # The notes shards start first and share the same concurrency limit as the chunk jobs
+    notes_task = None
+    if notes_data:
+        notes_task = asyncio.create_task(
+            generate_questions_from_notes_async(notes_data, question_type, char_limit, model=model, client=client, semaphore=semaphore)
+        )
+
+    tasks = []
+    timings = StreamTimings()
+    with tqdm(unit="chunk") as pbar:
+        count_item = _item_counter(pbar)
+
+        async def chunk_job(index: int, chunk: str):
+            try:
+                timer = RequestTimer(count_item)
+                questions = await generate_questions_async(
+                    chunk, question_type, char_limit, model=model, client=client, on_item=timer.on_item, label=f"chunk {index + 1}"
+                )
+                timings.record(timer)
+                if on_chunk:
+                    on_chunk(index, questions)
+                return questions
+            finally:
+                semaphore.release()
+                pbar.update(1)
+
+        for chunk in chunks:
+            # Acquire before reading on, so the lazy chunk stream is only
+            # consumed as fast as requests can be sent
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(chunk_job(len(tasks), chunk)))
+            pbar.total = len(tasks)
+            pbar.refresh()
+
+        chunk_results = await asyncio.gather(*tasks)
+
+    if tasks and streaming_enabled():
+        print(timings.report())
+
+    note_questions = await notes_task if notes_task else []
+
+    # gather() keeps task order, so questions come out in chunk order
+    chunk_questions = [q for questions in chunk_results for q in questions]
+    return chunk_questions, note_questions, len(tasks)
+
+def generate_all(
+    chunks: Iterable[str],
+    question_type: str,
+    char_limit: int,
+    model: str = "llama3.1:8b",
+    concurrency: int = 4,
+    notes_data: Optional[Dict[str, Any]] = None,
+    on_chunk: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    """
+    Generates questions for every chunk with at most `concurrency` requests
+    in flight. If `notes_data` is given, the notes-based questions are
+    generated alongside the chunk jobs instead of after them.
+
+    If `on_chunk(index, questions)` is given, it is called as each chunk
+    finishes, in completion order.
+
+    Returns (chunk_questions in chunk order, note_questions, number of chunks).
+    """
+    if concurrency < 1:
+        concurrency = 1
+    return asyncio.run(_generate_all(chunks, question_type, char_limit, model, concurrency, notes_data, on_chunk))
+
+async def _generate_many(
+    streams: List[Iterable[str]],
+    question_type: str,
+    char_limit: int,
+    model: str,
+    concurrency: int,
+    on_chunk: Optional[Callable[[int, int, List[Dict[str, Any]]], None]]
+) -> List[List[List[Dict[str, Any]]]]:
+    client = get_async_client()
+    semaphore = request_limiter(concurrency)
+
+    tasks_by_doc = [[] for _ in streams]
+    total = 0
+    timings = StreamTimings()
+    with tqdm(unit="chunk") as pbar:
+        count_item = _item_counter(pbar)
+
+        async def chunk_job(doc: int, index: int, chunk: str):
+            try:
+                timer = RequestTimer(count_item)
+                questions = await generate_questions_async(
+                    chunk, question_type, char_limit, model=model, client=client, on_item=timer.on_item, label=f"document {doc + 1}, chunk {index + 1}"
+                )
+                timings.record(timer)
+                if on_chunk:
+                    on_chunk(doc, index, questions)
+                return questions
+            finally:
+                semaphore.release()
+                pbar.update(1)
+
+        # One queue for every document: the next PDF's chunks go out as soon
+        # as slots free up, without waiting for the previous PDF to finish
+        for doc, chunks in enumerate(streams):
+            for chunk in chunks:
+                await semaphore.acquire()
+                tasks_by_doc[doc].append(asyncio.create_task(chunk_job(doc, len(tasks_by_doc[doc]), chunk)))
+                total += 1
+                pbar.total = total
+                pbar.refresh()
+
+        results = [list(await asyncio.gather(*tasks)) for tasks in tasks_by_doc]
+
+    if total and streaming_enabled():
+        print(timings.report())
+    return results
+
+def generate_many(
+    streams: List[Iterable[str]],
+    question_type: str,
+    char_limit: int,
+    model: str = "llama3.1:8b",
+    concurrency: int = 4,
+    on_chunk: Optional[Callable[[int, int, List[Dict[str, Any]]], None]] = None
+) -> List[List[List[Dict[str, Any]]]]:
+    """
+    Generates questions for the chunks of several documents through one
+    shared queue with at most `concurrency` requests in flight.
+    If `on_chunk(doc, index, questions)` is given, it is called as each
+    chunk finishes.
+
+    Returns, per document, the questions of each chunk in chunk order.
+    """
+    if concurrency < 1:
+        concurrency = 1
+    return asyncio.run(_generate_many(streams, question_type, char_limit, model, concurrency, on_chunk))
@@ -0,0 +1,98 @@
+from typing import List, Dict, Any, Iterator, Callable
+
+from common.manifest import PageManifest, manifest_path_for, hash_pages, document_order
+from common.dedupe import dedupe_questions
+from processor import iter_pdf_pages, stream_page_chunks
+from supervisor import supervise_quiz
+
+MODEL = "llama3.1:8b"
+# Reduced chunk size to 800 to force more granular extraction and higher question count
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+
+class DocumentJob:
+    """
+    Question generation state for one PDF.
+
+    Page hashes are compared with the manifest from the previous run, so
+    chunks over unchanged pages keep their questions and only the changed
+    page spans are streamed into chunks (see common.manifest).
+    """
+
+    def __init__(self, pdf_path: str, question_type: str, char_limit: int, full: bool = False):
+        self.pdf_path = pdf_path
+        self.manifest = PageManifest(
+            manifest_path_for(pdf_path, "qna"),
+            settings={"model": MODEL, "type": question_type, "limit": char_limit, "chunk_size": CHUNK_SIZE, "overlap": CHUNK_OVERLAP},
+            enabled=not full
+        )
+        self.page_hashes = hash_pages(iter_pdf_pages(pdf_path))
+        self.reused, self.spans = self.manifest.plan(self.page_hashes)
+        self.fresh_ranges = []
+        self.fresh_questions: Dict[int, List[Dict[str, Any]]] = {}
+        self.chunk_entries: List[Dict[str, Any]] = []
+
+    def fresh_chunks(self) -> Iterator[str]:
+        """
+        Lazily yields the text of every chunk that has to be regenerated.
+        """
+        for span in self.spans:
+            for text, start, end in stream_page_chunks(self.pdf_path, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP, page_range=span):
+                self.fresh_ranges.append(("", start, end, len(self.fresh_ranges)))
+                yield text
+
+    def on_chunk(self, index: int, questions: List[Dict[str, Any]]):
+        self.fresh_questions[index] = questions
+
+    @property
+    def fresh_count(self) -> int:
+        return len(self.fresh_ranges)
+
+    def chunk_questions(self) -> List[Dict[str, Any]]:
+        """
+        Reused and regenerated chunk questions, back in document order.
+        """
+        chunks, reuse = document_order(self.reused, self.fresh_ranges)
+        self.chunk_entries = []
+        questions = []
+        for i, chunk in enumerate(chunks):
+            result = reuse[i] if i in reuse else self.fresh_questions.get(chunk[3], [])
+            self.chunk_entries.append({"start_page": chunk[1], "end_page": chunk[2], "result": result})
+            questions.extend(result)
+        return questions
+
+    def finalize(
+        self,
+        questions: List[Dict[str, Any]],
+        question_type: str,
+        char_limit: int,
+        dedupe_threshold: float,
+        prescreen_threshold: float,
+        on_final: Callable[[List[int], List[Dict[str, Any]]], None] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Dedupes and supervises the document's questions, then stores the
+        manifest for the next run.
+        """
+        # Drop restated duplicates before they each cost supervisor calls
+        if dedupe_threshold:
+            before = len(questions)
+            questions = dedupe_questions(questions, dedupe_threshold)
+            print(f"Removed {before - len(questions)} duplicate questions ({len(questions)} remaining).")
+
+        print("Applying AI Supervision (fixing incomplete sentences)...")
+        final_questions = supervise_quiz(
+            questions,
+            model=MODEL,
+            threshold=prescreen_threshold,
+            char_limit=char_limit,
+            on_final=on_final,
+            question_type=question_type,
+            known_fixes=self.manifest.fixes
+        )
+
+        try:
+            self.manifest.save(self.page_hashes, self.chunk_entries)
+        except Exception as e:
+            print(f"Error saving page manifest: {e}")
+        return final_questions
@@ -1,17 +1,17 @@
-import ollama
 import json
-from typing import List, Dict, Any
+import asyncio
+import ollama
+from typing import List, Dict, Any, Optional, Callable
 
-def generate_questions(
-    chunk_text: str, 
-    question_type: str, 
-    char_limit: int, 
-    model: str = "llama3.1:8b"
-) -> List[Dict[str, Any]]:
+from common.llm_cache import cached_chat, cached_achat
+from common.ollama_client import get_async_client, request_limiter
+from common.tokens import batch_by_tokens, estimate_tokens
+from common.dedupe import normalize
+
+def build_chunk_messages(chunk_text: str, question_type: str, char_limit: int) -> List[Dict[str, str]]:
     """
-    Generates questions and answers from a text chunk using Ollama.
+    Chat messages asking for questions from one text chunk.
     """
-    
     prompt = f"""
 You are an expert educational content generator. Analyze the provided text and generate as many {question_type} questions as possible.
     
@@ -47,61 +47,51 @@ You are an expert educational content generator. Analyze the provided text and g
     ]
     """
 
-    try:
-        response = ollama.chat(
-            model=model,
-            messages=[
-                {'role': 'system', 'content': prompt},
-                {'role': 'user', 'content': f"Generate questions from this text:\n\n{chunk_text}"}
-            ],
-            format='json',
-        )
-        
-        content = response['message']['content']
-        data = json.loads(content)
-        
-        # Ensure it's a list (Ollama might sometimes return a dict wrapping the list)
-        if isinstance(data, dict):
-            # Try to find a list value if the root is a dict
-            for key, value in data.items():
-                if isinstance(value, list):
-                    return value
-            return [data] # Return the dict as a single item list if no list found
-            
-        return data
+    return [
+        {'role': 'system', 'content': prompt},
+        {'role': 'user', 'content': f"Generate questions from this text:\n\n{chunk_text}"}
+    ]
 
-    except Exception as e:
-        print(f"Error generating questions: {e}")
-        return []
+# Notes text per shard; with the prompt and the generated questions this
+# stays well inside llama3.1's default context
+NOTES_SHARD_TOKENS = 1000
 
-def generate_questions_from_notes(
-    notes_data: Dict[str, Any],
-    question_type: str,
-    char_limit: int,
-    model: str = "llama3.1:8b"
-) -> List[Dict[str, Any]]:
+def note_lines(notes_data: Dict[str, Any]) -> List[str]:
     """
-    Generates questions based on the structured data from CheatSheet (definitions, concepts, etc.).
+    Flattens every note into one line of text, ordered so related items sit
+    together: lines are sorted by their normalized subject, which keeps e.g.
+    "Pandas", "Pandas DataFrame" and "Pandas vs NumPy" next to each other.
     """
-    # Flatten important notes into a string context
-    context_parts = []
-    
-    if "definitions" in notes_data:
-        for item in notes_data["definitions"][:20]: # Limit to top 20 to avoid context overflow
-            context_parts.append(f"Definition: {item.get('term')} - {item.get('definition')}")
-            
-    if "concepts" in notes_data:
-        for item in notes_data["concepts"][:10]:
-            context_parts.append(f"Concept: {item.get('name')} - {item.get('explanation')}")
-            
-    if "comparisons" in notes_data:
-        for item in notes_data["comparisons"][:10]:
-            context_parts.append(f"Comparison: {item.get('subject_a')} vs {item.get('subject_b')} - {item.get('difference_or_similarity')}")
-
-    if not context_parts:
-        return []
+    keyed = []
+    for item in notes_data.get("definitions", []):
+        keyed.append((item.get('term'), f"Definition: {item.get('term')} - {item.get('definition')}"))
+    for item in notes_data.get("concepts", []):
+        keyed.append((item.get('name'), f"Concept: {item.get('name')} - {item.get('explanation')}"))
+    for item in notes_data.get("comparisons", []):
+        keyed.append((item.get('subject_a'), f"Comparison: {item.get('subject_a')} vs {item.get('subject_b')} - {item.get('difference_or_similarity')}"))
+    for item in notes_data.get("timelines", []):
+        keyed.append((item.get('event'), f"Timeline: {item.get('date')} - {item.get('event')}"))
+
+    # sorted() is stable, so items with the same subject keep their category order
+    keyed.sort(key=lambda pair: normalize(pair[0] or ""))
+    return [line for _, line in keyed]
+
+def shard_notes(notes_data: Dict[str, Any], shard_tokens: int = NOTES_SHARD_TOKENS) -> List[List[str]]:
+    """
+    Splits all notes into shards of about `shard_tokens` tokens each, so
+    every note is covered without any single request overflowing the context.
+    """
+    return batch_by_tokens(note_lines(notes_data), shard_tokens, cost=estimate_tokens)
+
+def build_notes_messages(context_lines: List[str], question_type: str, char_limit: int) -> Optional[List[Dict[str, str]]]:
+    """
+    Chat messages asking for questions from one shard of CheatSheet notes,
+    or None if the shard is empty.
+    """
+    if not context_lines:
+        return None
 
-    context_text = "\n".join(context_parts)
+    context_text = "\n".join(context_lines)
     
     prompt = f"""
 You are an expert quiz generator. Using ONLY the provided notes, generate a set of {question_type} questions.
@@ -129,27 +119,134 @@ You are an expert quiz generator. Using ONLY the provided notes, generate a set
     ]
     """
 
-    try:
-        response = ollama.chat(
-            model=model,
-            messages=[
-                {'role': 'system', 'content': "You are a quiz generator."},
-                {'role': 'user', 'content': prompt}
-            ],
-            format='json',
-        )
-        
-        content = response['message']['content']
-        data = json.loads(content)
+    return [
+        {'role': 'system', 'content': "You are a quiz generator."},
+        {'role': 'user', 'content': prompt}
+    ]
+
+def _tag_shard(questions: List[Dict[str, Any]], shard_index: int, shard_count: int) -> List[Dict[str, Any]]:
+    # Provenance tag so merged note questions can be traced back to their shard
+    for q in questions:
+        if isinstance(q, dict):
+            q["source"] = f"notes:{shard_index + 1}/{shard_count}"
+    return questions
+
+def parse_questions(content: str) -> List[Dict[str, Any]]:
+    """
+    Parses the model's JSON reply into a list of question dicts.
+    """
+    data = json.loads(content)
+    
+    # Ensure it's a list (Ollama might sometimes return a dict wrapping the list)
+    if isinstance(data, dict):
+        # Try to find a list value if the root is a dict
+        for key, value in data.items():
+            if isinstance(value, list):
+                return value
+        return [data] # Return the dict as a single item list if no list found
         
-        if isinstance(data, dict):
-            for key, value in data.items():
-                if isinstance(value, list):
-                    return value
-            return [data]
-            
-        return data
+    return data
+
+def generate_questions(
+    chunk_text: str, 
+    question_type: str, 
+    char_limit: int, 
+    model: str = "llama3.1:8b"
+) -> List[Dict[str, Any]]:
+    """
+    Generates questions and answers from a text chunk using Ollama.
+    """
+    try:
+        content = cached_chat(model, build_chunk_messages(chunk_text, question_type, char_limit), format='json', stage="questions")
+        return parse_questions(content)
 
+    except Exception as e:
+        print(f"Error generating questions: {e}")
+        return []
+
+def generate_questions_from_notes(
+    notes_data: Dict[str, Any],
+    question_type: str,
+    char_limit: int,
+    model: str = "llama3.1:8b",
+    concurrency: int = 4
+) -> List[Dict[str, Any]]:
+    """
+    Generates questions based on the structured data from CheatSheet (definitions, concepts, etc.).
+    All notes are covered: they are split into token-budgeted shards that
+    are generated concurrently (at most `concurrency` at a time).
+    """
+    async def run():
+        semaphore = request_limiter(concurrency)
+        return await generate_questions_from_notes_async(notes_data, question_type, char_limit, model=model, semaphore=semaphore)
+
+    return asyncio.run(run())
+
+async def generate_questions_async(
+    chunk_text: str,
+    question_type: str,
+    char_limit: int,
+    model: str = "llama3.1:8b",
+    client: ollama.AsyncClient = None,
+    on_item: Optional[Callable[[Optional[str], Dict[str, Any]], None]] = None,
+    label: str = None
+) -> List[Dict[str, Any]]:
+    """
+    Async version of generate_questions() built on the Ollama async client.
+    `on_item(key, question)` is called for each question as it streams in;
+    `label` identifies the chunk in watchdog logs.
+    """
+    if client is None:
+        client = get_async_client()
+
+    try:
+        content = await cached_achat(client, model, build_chunk_messages(chunk_text, question_type, char_limit), format='json', stage="questions", on_item=on_item, label=label)
+        return parse_questions(content)
+
+    except Exception as e:
+        print(f"Error generating questions: {e}")
+        return []
+
+async def generate_questions_from_notes_async(
+    notes_data: Dict[str, Any],
+    question_type: str,
+    char_limit: int,
+    model: str = "llama3.1:8b",
+    client: ollama.AsyncClient = None,
+    semaphore: asyncio.Semaphore = None
+) -> List[Dict[str, Any]]:
+    """
+    Async version of generate_questions_from_notes(). Shards are generated
+    concurrently; pass the caller's `semaphore` so they share its request limit.
+    Questions are returned in shard order, each tagged with its shard.
+    """
+    if client is None:
+        client = get_async_client()
+
+    try:
+        # Built inside the try: it runs alongside chunk jobs, and malformed
+        # notes must not take those down with it
+        shards = shard_notes(notes_data)
     except Exception as e:
         print(f"Error generating questions from notes: {e}")
         return []
+
+    async def run_shard(shard_index: int, lines: List[str]) -> List[Dict[str, Any]]:
+        messages = build_notes_messages(lines, question_type, char_limit)
+        if not messages:
+            return []
+        label = f"notes shard {shard_index + 1}/{len(shards)}"
+        try:
+            if semaphore:
+                async with semaphore:
+                    content = await cached_achat(client, model, messages, format='json', stage="notes-questions", label=label)
+            else:
+                content = await cached_achat(client, model, messages, format='json', stage="notes-questions", label=label)
+            return _tag_shard(parse_questions(content), shard_index, len(shards))
+
+        except Exception as e:
+            print(f"Error generating questions from notes (shard {shard_index + 1}/{len(shards)}): {e}")
+            return []
+
+    results = await asyncio.gather(*(run_shard(i, lines) for i, lines in enumerate(shards)))
+    return [q for questions in results for q in questions]
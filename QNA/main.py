@@ -1,10 +1,25 @@
 import os
+import sys
 import json
+import glob
+import time
 import argparse
-from tqdm import tqdm
-from processor import extract_text_from_pdf, create_word_chunks
-from llm_client import generate_questions
-from supervisor import supervise_quiz
+from typing import List
+
+# Make the shared `common` package importable when run from this directory
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _repo_root not in sys.path:
+    sys.path.append(_repo_root)
+
+from common.llm_cache import configure_cache
+from common.prescreen import DEFAULT_THRESHOLD
+from common.ndjson import NDJSONWriter
+from common.dedupe import QUESTION_DEDUPE_THRESHOLD
+from common.ollama_client import warm_model, release_model, set_streaming, set_adaptive, concurrency_report
+from common.json_repair import repair_stats
+from common.telemetry import call_telemetry
+from engine import generate_all, generate_many
+from jobs import DocumentJob, MODEL, CHUNK_SIZE
 
 def get_user_input():
     print("--- PDF Question Generator Setup ---")
@@ -26,14 +41,136 @@ def get_user_input():
     
     return pdf_path, question_type, char_limit
 
+def save_questions(output_file: str, questions) -> bool:
+    try:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(questions, f, indent=4, ensure_ascii=False)
+        return True
+    except Exception as e:
+        print(f"Error saving output: {e}")
+        return False
+
+def collect_pdfs(input_dir: str = None, pattern: str = None) -> List[str]:
+    """
+    PDFs in `input_dir` plus any matching the (recursive) glob `pattern`,
+    sorted and without duplicates.
+    """
+    paths = []
+    if input_dir:
+        try:
+            paths += [os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.lower().endswith(".pdf")]
+        except FileNotFoundError:
+            print(f"Error: Directory not found at {input_dir}")
+    if pattern:
+        paths += [p for p in glob.glob(pattern, recursive=True) if p.lower().endswith(".pdf")]
+
+    unique = {}
+    for path in paths:
+        unique.setdefault(os.path.abspath(path), path)
+    return sorted(unique.values(), key=lambda p: p.lower())
+
+def run_batch(args, question_type: str, char_limit: int):
+    """
+    Generates a quiz for every PDF in --input-dir / --glob. The chunks of all
+    documents share one bounded request queue; each document's questions are
+    deduped, supervised and written to --output-dir separately.
+    """
+    pdfs = collect_pdfs(args.input_dir, args.glob)
+    if not pdfs:
+        print("No PDF files found.")
+        return
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # Output names from the PDF names, numbered if two PDFs share one
+    names = []
+    for path in pdfs:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name = stem
+        while name in names:
+            name = f"{stem}-{names.count(name) + 1}"
+        names.append(name)
+
+    print(f"\nBatch: {len(pdfs)} PDFs -> {os.path.abspath(args.output_dir)}")
+    print(f"Settings: Type={question_type}, Limit={char_limit} chars")
+
+    jobs = []
+    for path in pdfs:
+        print(f"  - {path}")
+        jobs.append(DocumentJob(path, question_type, char_limit, full=args.full))
+
+    print("Extracting text and generating questions with Llama 3.1...")
+    started = time.perf_counter()
+    generate_many(
+        [job.fresh_chunks() for job in jobs],
+        question_type,
+        char_limit,
+        model=MODEL,
+        concurrency=args.concurrency,
+        on_chunk=lambda doc, index, questions: jobs[doc].on_chunk(index, questions)
+    )
+    generation_seconds = time.perf_counter() - started
+
+    summary = []
+    for job, name in zip(jobs, names):
+        print(f"\n--- {name} ---")
+        questions = job.chunk_questions()
+        final_questions = job.finalize(
+            questions,
+            question_type,
+            char_limit,
+            dedupe_threshold=args.dedupe_threshold,
+            prescreen_threshold=args.prescreen_threshold
+        )
+        output_file = os.path.join(args.output_dir, f"{name}.json")
+        saved = save_questions(output_file, final_questions)
+        summary.append((name, len(job.chunk_entries), job.fresh_count, len(final_questions), saved))
+    total_seconds = time.perf_counter() - started
+
+    regenerated = sum(row[2] for row in summary)
+    total_questions = sum(row[3] for row in summary)
+    width = max(len("Document"), *(len(name) for name in names))
+    print(f"\n{'Document':<{width}}  Chunks  Regenerated  Questions")
+    for name, chunks, fresh, count, saved in summary:
+        print(f"{name:<{width}}  {chunks:>6}  {fresh:>11}  {count:>9}{'' if saved else '  (not saved)'}")
+    print(f"\n{total_questions} questions from {len(pdfs)} PDFs in {total_seconds:.1f}s")
+    if generation_seconds > 0:
+        print(f"Generation: {regenerated} chunks in {generation_seconds:.1f}s "
+              f"({regenerated / generation_seconds:.2f} chunks/s, {total_questions / total_seconds * 60:.1f} questions/min overall)")
+
 def main():
     # Allow for optional command line args for automation, otherwise ask interactively
     parser = argparse.ArgumentParser(description="PDF QA Generator")
     parser.add_argument("--pdf", help="Path to PDF")
     parser.add_argument("--type", help="Question type (MCQ, True/False, Long Answer)")
     parser.add_argument("--limit", type=int, help="Character limit for answers")
+    parser.add_argument("--concurrency", "-c", type=int, default=6, help="Upper bound on LLM requests in flight; the adaptive limit settles below it")
+    parser.add_argument("--fixed-concurrency", action="store_true", help="Always keep --concurrency requests in flight instead of adapting to observed latency")
+    parser.add_argument("--ndjson", help="Also stream final questions to this NDJSON file as soon as they are ready")
+    parser.add_argument("--dedupe-threshold", type=float, default=QUESTION_DEDUPE_THRESHOLD, help="Similarity above which questions are treated as duplicates (0 = keep all)")
+    parser.add_argument("--prescreen-threshold", type=float, default=DEFAULT_THRESHOLD, help="Only send questions scoring at least this on the local repair check to the supervisor (0 = send all)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk LLM response cache")
+    parser.add_argument("--clear-cache", action="store_true", help="Clear the LLM response cache before running")
+    parser.add_argument("--full", action="store_true", help="Ignore the page manifest from the previous run and reprocess every page")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for complete replies instead of streaming them item by item")
+    parser.add_argument("--input-dir", help="Generate a quiz for every PDF in this directory (batch mode)")
+    parser.add_argument("--glob", help="Generate a quiz for every PDF matching this pattern, e.g. 'lectures/**/*.pdf' (batch mode)")
+    parser.add_argument("--output-dir", default="quizzes", help="Where batch mode writes one <pdf name>.json per document")
     
     args = parser.parse_args()
+    set_streaming(not args.no_stream)
+    set_adaptive(not args.fixed_concurrency)
+
+    if args.input_dir or args.glob:
+        cache = configure_cache(enabled=not args.no_cache, clear=args.clear_cache)
+        warm_model(MODEL)
+        run_batch(args, args.type or "Long Answer", args.limit or 200)
+        release_model(MODEL)
+        print(cache.report())
+        print(repair_stats.report())
+        print(call_telemetry.report())
+        if concurrency_report():
+            print(concurrency_report())
+        return
     
     if args.pdf:
         pdf_path = args.pdf
@@ -42,60 +179,86 @@ def main():
     else:
         pdf_path, question_type, char_limit = get_user_input()
 
+    cache = configure_cache(enabled=not args.no_cache, clear=args.clear_cache)
+
     if not os.path.exists(pdf_path):
         print(f"Error: File not found at {pdf_path}")
         return
 
-    print(f"\nProcessing '{pdf_path}'...")
-    print(f"Settings: Type={question_type}, Limit={char_limit} chars")
-
-    # 1. Extract and Chunk
-    print("Extracting text and creating chunks...")
-    full_text = extract_text_from_pdf(pdf_path)
-    if not full_text:
-        print("No text extracted.")
-        return
+    # Created (and truncated) up front so readers never see a previous run's records
+    stream = NDJSONWriter(args.ndjson) if args.ndjson else None
 
-    # Reduced chunk size to 800 to force more granular extraction and higher question count
-    chunks = create_word_chunks(full_text, chunk_size=800, overlap=100)
-    print(f"Created {len(chunks)} chunks (800 words each).")
+    # Loads in the background while the PDF is read
+    warm_model(MODEL)
 
-    # 2. Generate Questions from Text Chunks
-    all_questions = []
-    
-    print("Generating questions with Llama 3.1...")
-    for i, chunk in enumerate(tqdm(chunks, unit="chunk")):
-        questions = generate_questions(chunk, question_type, char_limit)
-        all_questions.extend(questions)
+    print(f"\nProcessing '{pdf_path}'...")
+    print(f"Settings: Type={question_type}, Limit={char_limit} chars")
 
-    # 2.5 Generate Questions from Notes (if available)
+    # 1. Load CheatSheet notes (if available) so their questions can be
+    #    generated alongside the chunk jobs
+    notes_data = None
     cheatsheet_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CheatSheet", "output.json")
     if os.path.exists(cheatsheet_path):
         print("Found existing CheatSheet notes. Generating additional questions from notes...")
         try:
-            from llm_client import generate_questions_from_notes
             with open(cheatsheet_path, "r", encoding="utf-8") as f:
                 notes_data = json.load(f)
-            
-            note_questions = generate_questions_from_notes(notes_data, question_type, char_limit)
-            print(f"  + Generated {len(note_questions)} questions from notes.")
-            all_questions.extend(note_questions)
         except Exception as e:
             print(f"  ! Could not generate questions from notes: {e}")
 
-    # 3. AI Supervision
-    print("Applying AI Supervision (fixing incomplete sentences)...")
-    final_questions = supervise_quiz(all_questions)
+    # 2. Compare page hashes with the previous run; chunks over unchanged
+    #    pages keep their questions and only the rest are regenerated
+    job = DocumentJob(pdf_path, question_type, char_limit, full=args.full)
 
-    # 4. Save Results
+    # 3. Stream the changed pages into 800-word chunks and generate questions
+    #    with up to --concurrency requests in flight; the whole document is never held in memory.
+    print("Extracting text and generating questions with Llama 3.1...")
+    _, note_questions, _ = generate_all(
+        job.fresh_chunks(),
+        question_type,
+        char_limit,
+        model=MODEL,
+        concurrency=args.concurrency,
+        notes_data=notes_data,
+        on_chunk=job.on_chunk
+    )
+
+    chunk_questions = job.chunk_questions()
+    if not job.chunk_entries:
+        print("No text extracted.")
+        release_model(MODEL)
+        return
+    print(f"Processed {len(job.chunk_entries)} chunks ({CHUNK_SIZE} words each, {job.fresh_count} regenerated).")
+    if notes_data is not None:
+        print(f"  + Generated {len(note_questions)} questions from notes.")
+
+    # 4. Dedupe and AI Supervision
+    on_final = None
+    if stream:
+        on_final = lambda indices, items: stream.write_many({"index": i, "item": q} for i, q in zip(indices, items))
+    final_questions = job.finalize(
+        chunk_questions + note_questions,
+        question_type,
+        char_limit,
+        dedupe_threshold=args.dedupe_threshold,
+        prescreen_threshold=args.prescreen_threshold,
+        on_final=on_final
+    )
+    if stream:
+        stream.close()
+
+    # 5. Save Results
     output_file = "final_questions.json"
-    try:
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(final_questions, f, indent=4, ensure_ascii=False)
+    if save_questions(output_file, final_questions):
         print(f"\nSuccess! Generated {len(final_questions)} questions.")
         print(f"Saved to: {os.path.abspath(output_file)}")
-    except Exception as e:
-        print(f"Error saving output: {e}")
+
+    release_model(MODEL)
+    print(cache.report())
+    print(repair_stats.report())
+    print(call_telemetry.report())
+    if concurrency_report():
+        print(concurrency_report())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,16 +1,102 @@
 import fitz  # PyMuPDF
-from typing import List
+from collections import deque
+from typing import List, Iterator, Iterable, Tuple, Callable
+
+def iter_pdf_pages(pdf_path: str, page_range: Tuple[int, int] = None) -> Iterator[str]:
+    """
+    Lazily yields the text of each page, so only one page is held at a time.
+    `page_range` optionally limits this to 1-based inclusive (first, last) pages.
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        first, last = (page_range[0] - 1, min(page_range[1], len(doc))) if page_range else (0, len(doc))
+        for i in range(first, last):
+            yield doc.load_page(i).get_text()
+    finally:
+        doc.close()
+
+def iter_words(pages: Iterable[str]) -> Iterator[str]:
+    """
+    Yields whitespace-separated words across pages, one page at a time.
+    """
+    for page_text in pages:
+        yield from page_text.split()
+
+def iter_word_chunks(
+    words: Iterable,
+    chunk_size: int = 2500,
+    overlap: int = 100,
+    join: Callable = " ".join
+) -> Iterator:
+    """
+    Streaming version of create_word_chunks(): words flow through a
+    sliding-window deque and each chunk of `chunk_size` words (with `overlap`
+    words shared with the previous chunk) is yielded as soon as it is full.
+    Peak memory is one chunk, not the whole document.
+    Each window is turned into a chunk with `join`.
+    """
+    step = chunk_size - overlap
+    if step < 1:
+        step = 1
+
+    window = deque()
+    # Words still to consume before the window reaches the next chunk start
+    skip = 0
+    emitted_end = False
+
+    for word in words:
+        if skip:
+            skip -= 1
+            continue
+        window.append(word)
+        if len(window) == chunk_size:
+            yield join(window)
+            emitted_end = True
+            # Slide forward by `step` words; when step > chunk_size the
+            # extra words fall between chunks and are skipped
+            for _ in range(min(step, chunk_size)):
+                window.popleft()
+            skip = max(0, step - chunk_size)
+        else:
+            emitted_end = False
+
+    # Remaining words form the final chunk, unless it is only the overlap
+    # already covered by the previous chunk
+    if window and not emitted_end:
+        yield join(window)
+
+def stream_page_chunks(
+    pdf_path: str,
+    chunk_size: int = 2500,
+    overlap: int = 100,
+    page_range: Tuple[int, int] = None
+) -> Iterator[Tuple[str, int, int]]:
+    """
+    Reads the PDF lazily and yields word chunks one at a time as
+    (text, start_page, end_page), with the 1-based pages of the chunk's
+    first and last word, optionally only over `page_range`.
+    """
+    first_page = page_range[0] if page_range else 1
+    paged_words = (
+        (page_num, word)
+        for page_num, page_text in enumerate(iter_pdf_pages(pdf_path, page_range), first_page)
+        for word in page_text.split()
+    )
+
+    def join(window):
+        return " ".join(word for _, word in window), window[0][0], window[-1][0]
+
+    try:
+        yield from iter_word_chunks(paged_words, chunk_size, overlap, join=join)
+    except Exception as e:
+        print(f"Error reading PDF: {e}")
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     """
     Extracts all text from a PDF file.
     """
     try:
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text() + "\n"
-        return text
+        return "".join(page_text + "\n" for page_text in iter_pdf_pages(pdf_path))
     except Exception as e:
         print(f"Error reading PDF: {e}")
         return ""
@@ -19,26 +105,4 @@ def create_word_chunks(text: str, chunk_size: int = 2500, overlap: int = 100) ->
     """
     Splits text into chunks of `chunk_size` words with `overlap` words.
     """
-    words = text.split()
-    chunks = []
-    
-    if not words:
-        return []
-
-    step = chunk_size - overlap
-    if step < 1:
-        step = 1
-
-    for i in range(0, len(words), step):
-        # Slice the list of words
-        chunk_words = words[i : i + chunk_size]
-        
-        # Join back into a string
-        chunk_str = " ".join(chunk_words)
-        chunks.append(chunk_str)
-        
-        # Break if we've reached the end of the text
-        if i + chunk_size >= len(words):
-            break
-            
-    return chunks
+    return list(iter_word_chunks(iter_words([text]), chunk_size, overlap))
@@ -1,6 +1,10 @@
-import ollama
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable
+
+from common.llm_cache import cached_chat
+from common.prescreen import needs_repair, DEFAULT_THRESHOLD
+from common.quiz_schema import normalize_question
+from common.manifest import item_hash
 
 SUPERVISOR_PROMPT = """
 You are an expert editor. Your task is to review the provided list of questions and answers.
@@ -10,30 +14,104 @@ You are an expert editor. Your task is to review the provided list of questions
 4. Return the output in the EXACT same JSON structure (list of objects).
 """
 
-def supervise_quiz(questions: List[Dict[str, Any]], model: str = "llama3.1:8b") -> List[Dict[str, Any]]:
+# Field kinds used by the local pre-screen (see common.prescreen.score_text)
+QUESTION_FIELDS = {"question": "question", "answer": "sentence", "context_snippet": "snippet"}
+# MCQ and True/False answers are an option label or a bare "True", not prose
+SHORT_ANSWER_FIELDS = {"question": "question", "answer": "phrase", "context_snippet": "snippet"}
+SHORT_ANSWER_TYPES = {"MCQ", "TRUE/FALSE"}
+
+def _needs_repair(item: Dict[str, Any], question_type: str, threshold: float, char_limit: int) -> bool:
+    """
+    Pre-screen for one normalized question. Short-answer types skip the
+    sentence checks and the char_limit length rule on the answer.
+    """
+    if str(item.get("type") or question_type or "").upper() in SHORT_ANSWER_TYPES:
+        return needs_repair(item, SHORT_ANSWER_FIELDS, threshold)
+    return needs_repair(item, QUESTION_FIELDS, threshold, char_limit)
+
+def supervise_quiz(
+    questions: List[Dict[str, Any]],
+    model: str = "llama3.1:8b",
+    threshold: float = DEFAULT_THRESHOLD,
+    char_limit: int = None,
+    on_final: Callable[[List[int], List[Dict[str, Any]]], None] = None,
+    question_type: str = None,
+    known_fixes: Dict[str, Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
     """
     Refines the list of questions/answers.
+    Every question is first normalized locally to the quiz schema (see
+    common.quiz_schema); only questions that still fail validation or are
+    flagged by the local pre-screen (score >= `threshold`) are sent to the
+    LLM; threshold=0 sends every question. Questions that are still invalid
+    after the LLM pass are dropped.
+    `on_final(indices, questions)` is called as soon as questions are final,
+    with their positions in the input list.
+    `known_fixes` maps item_hash() of a normalized question to its repair
+    from a previous run; matching questions skip the LLM. It is updated in
+    place to hold exactly the repairs that apply to this run's questions.
     """
     print("  - Running AI Supervision on Quiz...")
     
+    previous_fixes = {}
+    if known_fixes is not None:
+        previous_fixes = dict(known_fixes)
+        known_fixes.clear()
+
     refined_questions = []
+    flagged = []
+    invalid = 0
+    reused_fixes = 0
+    for i, q in enumerate(questions):
+        normalized, problems = normalize_question(q, question_type)
+        refined_questions.append(normalized if normalized is not None else q)
+        if problems:
+            invalid += 1
+        elif not _needs_repair(normalized, question_type, threshold, char_limit):
+            continue
+
+        # Questions repaired in a previous run (unchanged pages) reuse that repair
+        key = item_hash(refined_questions[i])
+        if key in previous_fixes:
+            known_fixes[key] = previous_fixes[key]
+            refined_questions[i] = previous_fixes[key]
+            reused_fixes += 1
+        else:
+            flagged.append(i)
     
     # Process in batches
     batch_size = 5 # Questions can be long, keep batch small
-    for i in range(0, len(questions), batch_size):
-        batch = questions[i : i + batch_size] 
+    calls_without_prescreen = (len(questions) + batch_size - 1) // batch_size
+    calls = (len(flagged) + reused_fixes + batch_size - 1) // batch_size
+    print(f"  - Schema check: {len(questions) - invalid} of {len(questions)} questions valid after local normalization")
+    print(f"  - Pre-screen: {len(flagged) + reused_fixes} of {len(questions)} questions need repair, "
+          f"{calls_without_prescreen - calls} of {calls_without_prescreen} LLM calls saved")
+    if reused_fixes:
+        print(f"  - Reused {reused_fixes} repairs from the previous run")
+
+    if on_final:
+        # Questions that skip the LLM are already final
+        flagged_set = set(flagged)
+        passed = [i for i in range(len(questions)) if i not in flagged_set]
+        on_final(passed, [refined_questions[i] for i in passed])
+
+    dropped = set()
+    for i in range(0, len(flagged), batch_size):
+        indices = flagged[i : i + batch_size]
+        batch = [refined_questions[j] for j in indices]
         
         try:
-            response = ollama.chat(
-                model=model,
-                messages=[
+            content = cached_chat(
+                model,
+                [
                     {'role': 'system', 'content': SUPERVISOR_PROMPT},
                     {'role': 'user', 'content': f"Fix and complete sentences in this JSON list:\n\n{json.dumps(batch, ensure_ascii=False)}"}
                 ],
                 format='json',
+                stage="supervise",
+                label=f"quiz batch {i // batch_size + 1}",
             )
             
-            content = response['message']['content']
             fixed_batch = json.loads(content)
             
             # Robust extraction of list from response
@@ -45,7 +123,7 @@ def supervise_quiz(questions: List[Dict[str, Any]], model: str = "llama3.1:8b")
                         break
                 else:
                     # If still a dict and matches the schema of a single question, wrap it
-                    if "question" in fixed_batch:
+                    if normalize_question(fixed_batch)[0].get("question"):
                          fixed_batch = [fixed_batch]
                     # fallback: try values
                     elif any(isinstance(v, list) for v in fixed_batch.values()):
@@ -54,13 +132,29 @@ def supervise_quiz(questions: List[Dict[str, Any]], model: str = "llama3.1:8b")
                                  fixed_batch = v
                                  break
 
-            if isinstance(fixed_batch, list):
-                refined_questions.extend(fixed_batch)
-            else:
-                refined_questions.extend(batch)
+            # Put repaired questions back in their original positions
+            if isinstance(fixed_batch, list) and len(fixed_batch) == len(indices):
+                for j, original, item in zip(indices, batch, fixed_batch):
+                    normalized, problems = normalize_question(item, question_type)
+                    if not problems:
+                        refined_questions[j] = normalized
+                        if known_fixes is not None:
+                            known_fixes[item_hash(original)] = normalized
                 
         except Exception as e:
             print(f"    ! Error supervising batch: {e}")
-            refined_questions.extend(batch)
+
+        # Whatever is still off-schema after the LLM pass is not worth showing
+        final = []
+        for j in indices:
+            if normalize_question(refined_questions[j], question_type)[1]:
+                dropped.add(j)
+            else:
+                final.append(j)
+        if on_final:
+            on_final(final, [refined_questions[j] for j in final])
+
+    if dropped:
+        print(f"  - Dropped {len(dropped)} questions that failed schema validation after repair")
             
-    return refined_questions
+    return [q for j, q in enumerate(refined_questions) if j not in dropped]
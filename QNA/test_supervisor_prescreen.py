@@ -0,0 +1,25 @@
+import supervisor
+from supervisor import supervise_quiz
+
+def _no_llm(*args, **kwargs):
+    raise AssertionError("the LLM should not be called")
+
+def test_short_answers_pass_the_prescreen(monkeypatch):
+    monkeypatch.setattr(supervisor, "cached_chat", _no_llm)
+    questions = [
+        {"question": "Which planet is largest?", "answer": "B", "type": "MCQ", "options": ["A. Mars", "B. Jupiter"], "context_snippet": "Jupiter is the largest."},
+        {"question": "Water boils at 100 C at sea level.", "answer": "True", "type": "True/False", "context_snippet": "Water boils at 100 C."},
+    ]
+    refined = supervise_quiz(questions, char_limit=300)
+    assert [q["answer"] for q in refined] == ["B", "True"]
+
+def test_question_type_applies_when_items_have_none(monkeypatch):
+    monkeypatch.setattr(supervisor, "cached_chat", _no_llm)
+    refined = supervise_quiz([{"question": "Is ice cold?", "answer": False, "context_snippet": "Ice is cold."}], question_type="True/False", char_limit=300)
+    assert refined[0]["answer"] == "False"
+
+def test_long_answers_still_get_sentence_checks():
+    item = {"question": "What is a cell?", "answer": "The basic unit", "type": "Long Answer", "context_snippet": "Cells..."}
+    assert supervisor._needs_repair(item, None, supervisor.DEFAULT_THRESHOLD, None)
+    item["answer"] = "The basic unit of life."
+    assert not supervisor._needs_repair(item, None, supervisor.DEFAULT_THRESHOLD, 300)
@@ -0,0 +1,198 @@
+import os
+import time
+import asyncio
+import collections
+from typing import Any, Dict, List, Optional
+
+from common.ndjson import NDJSONWriter
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_METRICS_DIR = os.environ.get(
+    "LUMINARA_METRICS_DIR", os.path.join(_repo_root, ".cache", "metrics")
+)
+
+# A request counts as queued when it took this much longer than the server's
+# own load + prompt + generation time: at least QUEUE_DELAY_LIMIT seconds, or
+# QUEUE_DELAY_SHARE of that service time for long requests
+QUEUE_DELAY_LIMIT = 1.0
+QUEUE_DELAY_SHARE = 0.25
+# Parallel decoding costs a little per-token speed; more than this factor
+# over the best observed per-token latency counts as overload
+TOKEN_LATENCY_TOLERANCE = 1.5
+# The best per-token latency creeps up by this factor per sample, so a host
+# that got slower for everyone is eventually accepted as the new baseline
+BASELINE_DRIFT = 1.02
+BACKOFF = 0.7
+FAILURE_BACKOFF = 0.5
+INITIAL_LIMIT = 2
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on LLM requests in flight, used like an asyncio.Semaphore
+    (`async with limiter:`); waiters are served first come, first served.
+
+    Every finished request reports Ollama's timing stats via record(). The
+    limit doubles after each window of `limit` clean requests until the
+    first sign of congestion (slow start), then grows by one per window.
+    Queueing delay, per-token latency rising above the baseline, or a failed
+    request cut it multiplicatively, at most once per window of requests
+    started at the previous limit. Every change of the limit is appended to
+    an NDJSON metrics file.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, initial: int = INITIAL_LIMIT, metrics_path: str = None):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = max(self.min_limit, min(initial, self.max_limit))
+        self.initial_limit = self.limit
+        self.peak_limit = self.limit
+        self.in_flight = 0
+        self.slow_start = True
+        self.baseline_token: Optional[float] = None
+        self.completed = 0
+        self.failures = 0
+        self.decisions: List[Dict[str, Any]] = []
+        self.metrics_path = metrics_path or os.path.join(DEFAULT_METRICS_DIR, "concurrency.ndjson")
+        self._writer: Optional[NDJSONWriter] = None
+        self._waiters = collections.deque()
+        self._clean = 0
+        self._created = time.perf_counter()
+        self._last_change = self._created
+        # Time-weighted in-flight count, for the mean in report()
+        self._busy_area = 0.0
+        self._busy_since = self._created
+        self._busy_start: Optional[float] = None
+
+    def set_max_limit(self, max_limit: int):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = min(self.min_limit, self.max_limit)
+        self.limit = min(self.limit, self.max_limit)
+
+    def _account(self):
+        now = time.perf_counter()
+        if self.in_flight:
+            self._busy_area += self.in_flight * (now - self._busy_since)
+            if self._busy_start is None:
+                self._busy_start = self._busy_since
+        self._busy_since = now
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._account()
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def acquire(self) -> bool:
+        if self.in_flight < self.limit and not self._waiters:
+            self._account()
+            self.in_flight += 1
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        return True
+
+    def release(self):
+        self._account()
+        self.in_flight -= 1
+        self._wake()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+    def record(self, started: float, elapsed: float, stats: Dict[str, Any]):
+        """
+        Feedback from one finished request: `started` is its perf_counter()
+        start, `elapsed` its wall time and `stats` the *_duration (ns) and
+        *_count fields of Ollama's final message.
+        """
+        self.completed += 1
+        eval_count = stats.get("eval_count") or 0
+        eval_seconds = (stats.get("eval_duration") or 0) / 1e9
+        service = eval_seconds + ((stats.get("load_duration") or 0) + (stats.get("prompt_eval_duration") or 0)) / 1e9
+        if not eval_count or not eval_seconds:
+            return
+
+        queue_delay = max(0.0, elapsed - service)
+        token_latency = eval_seconds / eval_count
+        baseline = self.baseline_token
+        if baseline is None or token_latency < baseline:
+            self.baseline_token = token_latency
+        else:
+            self.baseline_token = min(token_latency, baseline * BASELINE_DRIFT)
+
+        sample = {"queue_delay": round(queue_delay, 3), "token_ms": round(token_latency * 1000, 2)}
+        if queue_delay > max(QUEUE_DELAY_LIMIT, QUEUE_DELAY_SHARE * service):
+            self._decrease(started, BACKOFF, "queueing delay", sample)
+        elif baseline is not None and token_latency > baseline * TOKEN_LATENCY_TOLERANCE:
+            self._decrease(started, BACKOFF, "per-token latency up", sample)
+        else:
+            self._clean += 1
+            if self._clean >= self.limit:
+                self._clean = 0
+                grown = self.limit * 2 if self.slow_start else self.limit + 1
+                self._set(min(self.max_limit, grown), "increase", "latency flat", sample)
+
+    def record_failure(self, started: float, error: BaseException):
+        self.failures += 1
+        self._decrease(started, FAILURE_BACKOFF, f"request failed ({type(error).__name__})", {})
+
+    def _decrease(self, started: float, factor: float, reason: str, sample: Dict[str, Any]):
+        self._clean = 0
+        # Requests sent before the last change say nothing about the current limit
+        if started < self._last_change:
+            return
+        self.slow_start = False
+        self._set(max(self.min_limit, int(self.limit * factor)), "decrease", reason, sample)
+
+    def _set(self, limit: int, event: str, reason: str, sample: Dict[str, Any]):
+        if limit == self.limit:
+            return
+        now = time.perf_counter()
+        self._last_change = now
+        decision = {
+            "time": round(now - self._created, 3),
+            "event": event,
+            "reason": reason,
+            "from": self.limit,
+            "limit": limit,
+            "in_flight": self.in_flight,
+            "baseline_token_ms": round(self.baseline_token * 1000, 2) if self.baseline_token else None,
+        }
+        decision.update(sample)
+        self.decisions.append(decision)
+        self.limit = limit
+        self.peak_limit = max(self.peak_limit, limit)
+        try:
+            if self._writer is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.metrics_path)), exist_ok=True)
+                self._writer = NDJSONWriter(self.metrics_path)
+            self._writer.write(decision)
+        except OSError as e:
+            print(f"  ! Could not write concurrency metrics: {e}")
+        self._wake()
+
+    def report(self) -> str:
+        self._account()
+        busy = self._busy_since - self._busy_start if self._busy_start is not None else 0.0
+        mean = self._busy_area / busy if busy else 0.0
+        increases = sum(1 for d in self.decisions if d["event"] == "increase")
+        decreases = len(self.decisions) - increases
+        text = (f"Concurrency: limit {self.initial_limit} -> {self.limit} (peak {self.peak_limit}, ceiling {self.max_limit}), "
+                f"{increases} increases, {decreases} backoffs, {mean:.1f} requests in flight on average")
+        if self.decisions:
+            text += f"; decisions in {self.metrics_path}"
+        return text
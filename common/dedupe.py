@@ -0,0 +1,196 @@
+import re
+import zlib
+from typing import List, Dict, Any, Callable, Optional, Set, Tuple
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+NUM_BINS = 64       # MinHash signature length
+BAND_ROWS = 4       # Rows per LSH band -> 16 bands, ~90% recall at Jaccard 0.6
+SHINGLE_SIZE = 4    # Byte n-gram size
+MAX_BUCKET_COMPARES = 50
+
+# question+answer Jaccard similarity above which two quiz questions count as restatements
+QUESTION_DEDUPE_THRESHOLD = 0.7
+# Question types whose answer is a label ("B", "True") that must match exactly
+SHORT_ANSWER_TYPES = {"MCQ", "TRUE/FALSE"}
+
+def normalize(text: str) -> str:
+    """
+    Lowercases and strips punctuation and repeated whitespace, so
+    "Pandas", " pandas " and "Pandas." all normalize to "pandas".
+    """
+    text = _PUNCT_RE.sub(" ", str(text).lower())
+    return _SPACE_RE.sub(" ", text).strip()
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """
+    Byte n-grams of the normalized text, hashed with CRC32 so the
+    result is stable across runs (unlike the built-in hash()).
+    """
+    data = text.encode("utf-8")
+    if len(data) <= size:
+        return {zlib.crc32(data)} if data else set()
+    crc32 = zlib.crc32
+    return {crc32(data[i : i + size]) for i in range(len(data) - size + 1)}
+
+def minhash(shingle_set: Set[int], num_bins: int = NUM_BINS) -> Tuple:
+    """
+    One-permutation MinHash: every shingle is hashed once and the minimum is
+    kept per bin, so signatures cost O(shingles) rather than O(shingles * bins).
+    Empty bins stay None.
+    """
+    bins = [None] * num_bins
+    for h in shingle_set:
+        b = h % num_bins
+        v = h // num_bins
+        if bins[b] is None or v < bins[b]:
+            bins[b] = v
+    return tuple(bins)
+
+def _subject_words(text: str) -> Set[str]:
+    # Plural and singular subjects count as the same word
+    return {w[:-1] if len(w) > 3 and w.endswith("s") else w for w in normalize(text).split()}
+
+def same_subject(a: str, b: str) -> bool:
+    """
+    True if every word of one subject also appears in the other, e.g.
+    "Pandas" / "Pandas library", but not "Supervised learning" /
+    "Unsupervised learning" or "Python list" / "Python tuple".
+    """
+    words_a, words_b = _subject_words(a), _subject_words(b)
+    if not words_a or not words_b:
+        return False
+    return words_a <= words_b or words_b <= words_a
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # Keep the earliest item as root so cluster order is stable
+            if rb < ra:
+                ra, rb = rb, ra
+            self.parent[rb] = ra
+
+def collapse_near_duplicates(
+    items: List[Dict[str, Any]],
+    key: Callable[[Dict[str, Any]], str],
+    text: Callable[[Dict[str, Any]], str],
+    threshold: float = 0.6,
+    subject: Optional[Callable[[Dict[str, Any]], str]] = None,
+    same: Optional[Callable[[Dict[str, Any], Dict[str, Any]], bool]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Clusters items whose normalized key matches exactly or whose n-gram
+    Jaccard similarity over `text` reaches `threshold`, and keeps the
+    richest (longest text) member of each cluster.
+
+    With `subject`, similar text alone is not enough: the two subjects must
+    also pass same_subject(), so "Supervised learning" and "Unsupervised
+    learning" stay apart even though their definitions read alike. `same(a, b)`
+    is a further check on such pairs, e.g. that two questions share an answer.
+
+    Candidate pairs come from MinHash LSH buckets, so the cost stays roughly
+    linear in the number of items instead of comparing every pair.
+    Survivors are returned in order of their cluster's first appearance.
+    """
+    n = len(items)
+    if n < 2:
+        return list(items)
+
+    uf = _UnionFind(n)
+    texts = [normalize(text(item)) for item in items]
+    sets = [shingles(t) for t in texts]
+    subjects = [subject(item) for item in items] if subject else None
+
+    # 1. Exact match after normalization
+    by_key: Dict[str, int] = {}
+    for i, item in enumerate(items):
+        k = normalize(key(item))
+        if not k:
+            continue
+        if k in by_key:
+            uf.union(by_key[k], i)
+        else:
+            by_key[k] = i
+
+    # 2. MinHash LSH candidates, verified with the exact Jaccard
+    buckets: Dict[Tuple, List[int]] = {}
+    for i in range(n):
+        if not sets[i]:
+            continue
+        signature = minhash(sets[i])
+        for band in range(0, NUM_BINS, BAND_ROWS):
+            band_key = (band,) + signature[band : band + BAND_ROWS]
+            members = buckets.setdefault(band_key, [])
+            for j in members[:MAX_BUCKET_COMPARES]:
+                if uf.find(i) == uf.find(j) or jaccard(sets[i], sets[j]) < threshold:
+                    continue
+                if subjects is not None and not same_subject(subjects[i], subjects[j]):
+                    continue
+                if same is None or same(items[i], items[j]):
+                    uf.union(i, j)
+            members.append(i)
+
+    # 3. Keep the richest member of each cluster
+    best: Dict[int, int] = {}
+    for i in range(n):
+        root = uf.find(i)
+        if root not in best or len(texts[i]) > len(texts[best[root]]):
+            best[root] = i
+
+    return [items[best[root]] for root in sorted(best)]
+
+def _question_key(q) -> str:
+    return q.get("question", "") if isinstance(q, dict) else str(q)
+
+def _question_text(q) -> str:
+    if not isinstance(q, dict):
+        return str(q)
+    return f"{q.get('question', '')} {q.get('answer', '')}"
+
+def _same_answer(a, b, threshold: float) -> bool:
+    """
+    Whether two similar questions also agree on the answer: "1918" and
+    "1945", or "True" and "False", make them different questions. MCQ and
+    True/False answers must match exactly; longer answers must be at
+    least `threshold` similar on their own.
+    """
+    if not isinstance(a, dict) or not isinstance(b, dict):
+        return True
+    answer_a, answer_b = normalize(a.get("answer", "")), normalize(b.get("answer", ""))
+    if answer_a == answer_b:
+        return True
+    types = {str(q.get("type", "")).upper() for q in (a, b)}
+    if types & SHORT_ANSWER_TYPES:
+        return False
+    return jaccard(shingles(answer_a), shingles(answer_b)) >= threshold
+
+def dedupe_questions(questions: List[Any], threshold: float = QUESTION_DEDUPE_THRESHOLD) -> List[Any]:
+    """
+    Drops restated quiz questions: those whose normalized question text
+    matches exactly, or whose question+answer similarity reaches `threshold`
+    and whose answers agree (see _same_answer()).
+    The most detailed version of each is kept, in original order.
+    """
+    return collapse_near_duplicates(
+        questions,
+        key=_question_key,
+        text=_question_text,
+        threshold=threshold,
+        same=lambda a, b: _same_answer(a, b, threshold)
+    )
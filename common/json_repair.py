@@ -0,0 +1,141 @@
+import re
+import json
+from typing import Any, List, Optional
+
+# Prefix cut points tried per reply; replies are a few thousand characters
+MAX_PREFIX_ATTEMPTS = 200
+
+_FENCE_RE = re.compile(r"```[\w-]*[ \t]*\n?(.*?)(?:```|$)", re.S)
+_decoder = json.JSONDecoder()
+
+class RepairStats:
+    """
+    Per-run counts of malformed JSON replies: repaired locally, retried
+    because repair recovered nothing, and lost after the retry too.
+    """
+
+    def __init__(self):
+        self.repaired = 0
+        self.retried = 0
+        self.lost = 0
+
+    def report(self) -> str:
+        return f"JSON repair: {self.repaired} replies repaired, {self.retried} retried, {self.lost} lost"
+
+repair_stats = RepairStats()
+
+def strip_fences(text: str) -> str:
+    """
+    The body of the first ```json fenced block, or the text itself.
+    """
+    match = _FENCE_RE.search(text)
+    return match.group(1) if match else text
+
+def _strip_trailing_commas(text: str) -> str:
+    out = []
+    in_string = escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == ",":
+            rest = text[i + 1:].lstrip()
+            if not rest or rest[0] in "}]":
+                continue
+        out.append(ch)
+    return "".join(out)
+
+def _scan(text: str):
+    """
+    Returns (open containers, inside a string, prefix cut points). A cut
+    point is an offset right after a complete value: after a closing
+    bracket, or just before a comma.
+    """
+    stack: List[str] = []
+    cuts: List[int] = []
+    in_string = escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            cuts.append(i + 1)
+        elif ch == ",":
+            cuts.append(i)
+    return stack, in_string, cuts
+
+def _close(text: str) -> str:
+    """
+    Terminates an open string and closes every open bracket.
+    """
+    stack, in_string, _ = _scan(text)
+    if in_string:
+        if text.endswith("\\") and not text.endswith("\\\\"):
+            text = text[:-1]
+        text += '"'
+    text = text.rstrip()
+    while text.endswith(","):
+        text = text[:-1].rstrip()
+    return text + "".join("}" if ch == "{" else "]" for ch in reversed(stack))
+
+def _loads(text: str) -> Optional[Any]:
+    try:
+        # raw_decode ignores anything after the first complete value
+        value, _ = _decoder.raw_decode(text)
+        return value
+    except ValueError:
+        return None
+
+def repair_json(content: str) -> Optional[Any]:
+    """
+    Best-effort parse of a malformed JSON reply: strips markdown fences and
+    any prose before the first bracket, drops trailing commas, closes an
+    unterminated string and open brackets, and otherwise falls back to the
+    longest prefix that ends on a complete value. Returns None if nothing
+    can be recovered.
+    """
+    if not content:
+        return None
+    text = strip_fences(content)
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return None
+    text = _strip_trailing_commas(text[min(starts):].strip())
+
+    for candidate in (text, _close(text)):
+        value = _loads(candidate)
+        if value is not None:
+            return value
+
+    _, _, cuts = _scan(text)
+    for cut in reversed(cuts[-MAX_PREFIX_ATTEMPTS:]):
+        value = _loads(_close(text[:cut]))
+        if value is not None:
+            return value
+    return None
+
+def is_empty(value: Any) -> bool:
+    """
+    True for a reply without a single item, e.g. {"definitions": [], "concepts": []}.
+    """
+    if isinstance(value, list):
+        return not value
+    if isinstance(value, dict):
+        return all(isinstance(v, (list, dict)) and is_empty(v) for v in value.values())
+    return value is None or value == ""
@@ -0,0 +1,178 @@
+import json
+import time
+import statistics
+from typing import Any, Callable, List, Optional, Tuple
+
+class IncrementalJSONParser:
+    """
+    Scans a JSON reply as it streams in and emits every completed list
+    element as soon as its closing brace arrives.
+
+    Elements are objects inside either a top-level list (key None) or a list
+    held directly by the top-level object, e.g. {"definitions": [...]}
+    (key "definitions"). If the stream is cut off or turns malformed, every
+    element completed before that point is still available via salvage().
+    """
+
+    def __init__(self, on_item: Optional[Callable[[Optional[str], Any], None]] = None):
+        self.on_item = on_item
+        self.buffer = ""
+        self.items: List[Tuple[Optional[str], Any]] = []
+        self.root = None
+        self.broken = False
+        # One entry per open container: [kind, pending key, key of this container in its parent]
+        self._stack: List[list] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._element_start = None
+        self._pos = 0
+
+    def feed(self, text: str):
+        self.buffer += text
+        if self.broken:
+            return
+        buf = self.buffer
+        while self._pos < len(buf):
+            ch = buf[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    top = self._stack[-1] if self._stack else None
+                    # A string directly inside an object, before its colon, is a key
+                    if top and top[0] == "{" and top[1] is None:
+                        try:
+                            top[1] = json.loads(buf[self._string_start:self._pos + 1])
+                        except ValueError:
+                            top[1] = ""
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif ch in "{[":
+                self._open(ch)
+            elif ch in "}]":
+                if not self._close(ch):
+                    self.broken = True
+                    return
+            elif ch == ",":
+                top = self._stack[-1] if self._stack else None
+                if top and top[0] == "{":
+                    top[1] = None
+            self._pos += 1
+
+    def _element_key(self) -> Tuple[bool, Optional[str]]:
+        """
+        Whether a value opening now is a list element we emit, and its key.
+        """
+        if not self._stack or self._stack[-1][0] != "[":
+            return False, None
+        if len(self._stack) == 1:
+            return True, None
+        if len(self._stack) == 2 and self._stack[0][0] == "{":
+            return True, self._stack[-1][2]
+        return False, None
+
+    def _open(self, ch: str):
+        if not self._stack:
+            self.root = ch
+        elif ch == "{" and self._element_start is None:
+            emit, _ = self._element_key()
+            if emit:
+                self._element_start = self._pos
+        parent_key = self._stack[-1][1] if self._stack and self._stack[-1][0] == "{" else None
+        self._stack.append([ch, None, parent_key])
+
+    def _close(self, ch: str) -> bool:
+        if not self._stack or self._stack[-1][0] != ("{" if ch == "}" else "["):
+            return False
+        self._stack.pop()
+        if ch == "}" and self._element_start is not None:
+            emit, key = self._element_key()
+            if emit:
+                text = self.buffer[self._element_start:self._pos + 1]
+                self._element_start = None
+                try:
+                    item = json.loads(text)
+                except ValueError:
+                    return True
+                self.items.append((key, item))
+                if self.on_item:
+                    self.on_item(key, item)
+        if self._stack and self._stack[-1][0] == "{":
+            self._stack[-1][1] = None
+        return True
+
+    def complete(self) -> bool:
+        return not self.broken and self.root is not None and not self._stack
+
+    def salvage(self, items: List[Tuple[Optional[str], Any]] = None) -> Any:
+        """
+        The completed elements (or the given subset of (key, item) pairs) in
+        the shape of the reply: a list for a top-level list, otherwise a
+        dict of key -> list.
+        """
+        items = self.items if items is None else items
+        if self.root == "[":
+            return [item for _, item in items]
+        result = {}
+        for key, item in items:
+            result.setdefault(key, []).append(item)
+        return result
+
+def parse_items(content: str, on_item: Optional[Callable[[Optional[str], Any], None]] = None) -> IncrementalJSONParser:
+    """
+    Runs a complete reply through the parser, e.g. to replay a cached response.
+    """
+    parser = IncrementalJSONParser(on_item)
+    parser.feed(content)
+    return parser
+
+class RequestTimer:
+    """
+    Time to the first streamed item and to the full reply of one request.
+    """
+
+    def __init__(self, on_item: Optional[Callable[[Optional[str], Any], None]] = None):
+        self.started = time.perf_counter()
+        self.first_item: Optional[float] = None
+        self.total: Optional[float] = None
+        self.items = 0
+        self._on_item = on_item
+
+    def on_item(self, key: Optional[str], item: Any):
+        if self.first_item is None:
+            self.first_item = time.perf_counter() - self.started
+        self.items += 1
+        if self._on_item:
+            self._on_item(key, item)
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+class StreamTimings:
+    """
+    Collects RequestTimers for an end-of-stage time-to-first-item summary.
+    """
+
+    def __init__(self):
+        self.first_items: List[float] = []
+        self.totals: List[float] = []
+
+    def record(self, timer: RequestTimer):
+        if timer.total is None:
+            timer.finish()
+        self.totals.append(timer.total)
+        if timer.first_item is not None:
+            self.first_items.append(timer.first_item)
+
+    def report(self) -> str:
+        if not self.totals:
+            return "Streaming: no requests"
+        first = statistics.median(self.first_items) if self.first_items else 0.0
+        total = statistics.median(self.totals)
+        return (f"Streaming: first item after {first:.1f}s, full reply after {total:.1f}s "
+                f"(median of {len(self.totals)} requests)")
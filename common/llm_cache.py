@@ -0,0 +1,345 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import ollama
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from common.ollama_client import chat, achat, achat_stream, stage_options, streaming_enabled
+from common.json_stream import IncrementalJSONParser, parse_items
+from common.watchdog import GenerationWatchdog
+from common.json_repair import repair_json, is_empty, repair_stats
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "LUMINARA_LLM_CACHE", os.path.join(_repo_root, ".cache", "llm_cache.sqlite")
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB of stored responses
+# Extra generations for a JSON reply that local repair cannot salvage
+JSON_RETRIES = 1
+
+def cache_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    format: Optional[str] = "json",
+    options: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Content-addressed key: hash of model name, system prompt, user content,
+    format and (if given) the generation options.
+    """
+    system = "\n".join(m["content"] for m in messages if m.get("role") == "system")
+    user = "\n".join(m["content"] for m in messages if m.get("role") != "system")
+    parts = [model, system, user, format or ""]
+    if options:
+        parts.append(options)
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    On-disk LLM response cache stored in a single SQLite file.
+    Entries are evicted least-recently-used first once the total stored size
+    exceeds `max_bytes`.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES, enabled: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str):
+        if not self.enabled:
+            return
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time())
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop the least recently used entries until we are back under budget
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            conn.execute("VACUUM")
+
+    def report(self) -> str:
+        if not self.enabled:
+            return "LLM cache: disabled"
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return f"LLM cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)"
+
+_cache: Optional[ResponseCache] = None
+
+def get_cache() -> ResponseCache:
+    """
+    Returns the process-wide cache, creating it with defaults on first use.
+    """
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
+
+def configure_cache(enabled: bool = True, clear: bool = False, path: str = None) -> ResponseCache:
+    """
+    Sets up the process-wide cache from CLI flags (--no-cache / --clear-cache).
+    """
+    global _cache
+    _cache = ResponseCache(path=path or DEFAULT_CACHE_PATH, enabled=enabled)
+    if clear:
+        _cache.clear()
+        print("LLM cache cleared.")
+    return _cache
+
+def _is_cacheable(content: str, format: Optional[str]) -> bool:
+    # Never persist a response the caller is going to reject anyway
+    if format != "json":
+        return bool(content)
+    try:
+        json.loads(content)
+        return True
+    except (ValueError, TypeError):
+        return False
+
+def _recover(content: str, where: str) -> Optional[str]:
+    # A malformed reply is repaired locally before it costs another generation
+    repaired = repair_json(content)
+    if repaired is None or is_empty(repaired):
+        return None
+    repair_stats.repaired += 1
+    print(f"  ! Repaired malformed JSON reply{where}")
+    return json.dumps(repaired, ensure_ascii=False)
+
+def _emit_once(on_item: Callable[[Optional[str], Any], None]) -> Callable[[Optional[str], Any], None]:
+    # A retried generation repeats items already passed on by the failed attempt
+    seen = set()
+
+    def emit(item_key, item):
+        fingerprint = (item_key, json.dumps(item, ensure_ascii=False, sort_keys=True))
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            on_item(item_key, item)
+    return emit
+
+def _without_repeats(parser: IncrementalJSONParser, kept: List[Tuple[Optional[str], Any]]) -> str:
+    """
+    The streamed reply with the items the watchdog dropped as repeats taken
+    out of their lists, so the cache does not keep them either.
+    """
+    if len(kept) == len(parser.items):
+        return parser.buffer
+    try:
+        data = json.loads(parser.buffer)
+    except ValueError:
+        # Left to local repair, like any other malformed reply
+        return parser.buffer
+    filtered = parser.salvage(kept)
+    if isinstance(data, dict):
+        for item_key in {item_key for item_key, _ in parser.items}:
+            data[item_key] = filtered.get(item_key, [])
+    else:
+        data = filtered
+    return json.dumps(data, ensure_ascii=False)
+
+def _unusable(attempt: int, where: str):
+    if attempt < JSON_RETRIES:
+        repair_stats.retried += 1
+        print(f"  ! Unusable JSON reply{where}, nothing to repair; retrying")
+        return
+    repair_stats.lost += 1
+    raise ValueError("unusable JSON reply, nothing could be repaired")
+
+def cached_chat(model: str, messages: List[Dict[str, str]], format: Optional[str] = "json", stage: str = None, label: str = None) -> str:
+    """
+    Chat request on the shared client (common.ollama_client) with the
+    options for `stage`; returns the message content, served from the
+    cache when possible. `label` (e.g. "chunk 12") tags the call in logs
+    and telemetry.
+
+    Malformed JSON replies are repaired locally (common.json_repair); the
+    request is only retried if repair recovers nothing.
+    """
+    cache = get_cache()
+    key = cache_key(model, messages, format, stage_options(stage))
+    content = cache.get(key)
+    if content is not None:
+        return content
+
+    where = f" ({label})" if label else ""
+    for attempt in range(JSON_RETRIES + 1):
+        response = chat(model, messages, format=format, stage=stage, label=label)
+        content = response['message']['content']
+        if _is_cacheable(content, format):
+            cache.put(key, content)
+            return content
+        if format != "json":
+            return content
+        recovered = _recover(content, where)
+        if recovered is not None:
+            return recovered
+        _unusable(attempt, where)
+
+async def _request_async(
+    client: Optional[ollama.AsyncClient],
+    model: str,
+    messages: List[Dict[str, str]],
+    format: Optional[str],
+    stage: Optional[str],
+    on_item: Optional[Callable[[Optional[str], Any], None]],
+    label: Optional[str]
+) -> Tuple[str, bool]:
+    """
+    One generation; returns (content, partial). A partial reply holds the
+    items completed before the stream was cut off or aborted.
+    """
+    where = f" ({label})" if label else ""
+    if not streaming_enabled() or format != "json":
+        response = await achat(client, model, messages, format=format, stage=stage, label=label)
+        content = response['message']['content']
+        if on_item and format == "json":
+            parse_items(content, on_item)
+        return content, False
+
+    watchdog = GenerationWatchdog(stage, max_tokens=stage_options(stage).get("num_predict"))
+    kept = []
+
+    def emit(item_key, item):
+        # Items the model repeats are dropped here, not just at dedupe time
+        if watchdog.add_item(item_key, item):
+            kept.append((item_key, item))
+            if on_item:
+                on_item(item_key, item)
+
+    parser = IncrementalJSONParser(emit)
+    stream = achat_stream(client, model, messages, format=format, stage=stage, label=label)
+    try:
+        async for piece in stream:
+            parser.feed(piece)
+            if parser.broken:
+                # Nothing after a malformed token can be trusted; stop generating
+                break
+            if watchdog.check(piece):
+                break
+    except Exception as e:
+        if not kept:
+            raise
+        print(f"  ! Reply cut off{where} ({e}), keeping {len(kept)} completed items")
+        return json.dumps(parser.salvage(kept), ensure_ascii=False), True
+    finally:
+        await stream.aclose()
+
+    if watchdog.reason:
+        print(f"  ! Aborted {stage or 'LLM'} request{where} after {watchdog.tokens} tokens / "
+              f"{watchdog.elapsed:.1f}s: {watchdog.reason}; keeping {len(kept)} items")
+        if not kept:
+            raise RuntimeError(f"degenerate generation ({watchdog.reason})")
+        return json.dumps(parser.salvage(kept), ensure_ascii=False), True
+    return _without_repeats(parser, kept), False
+
+async def cached_achat(
+    client: Optional[ollama.AsyncClient],
+    model: str,
+    messages: List[Dict[str, str]],
+    format: Optional[str] = "json",
+    stage: str = None,
+    on_item: Optional[Callable[[Optional[str], Any], None]] = None,
+    label: str = None
+) -> str:
+    """
+    Async counterpart of cached_chat(); `client` defaults to the pooled
+    AsyncClient of the running loop.
+
+    With streaming enabled, JSON replies are parsed as they arrive and
+    `on_item(key, item)` is called for every completed list element (see
+    common.json_stream). If the stream breaks off, the completed elements
+    are returned as JSON instead of failing the request; such partial
+    replies are not cached. Cached replies are replayed through `on_item` too.
+    Each distinct item reaches `on_item` once per call, even when a
+    malformed reply is generated again.
+
+    Streamed replies are watched by a GenerationWatchdog: a repetition
+    loop or a blown token/time budget aborts the request, keeping the
+    items that are not repeats; repeats are not cached either. `label` (e.g. "chunk 12") goes into the log
+    and the call telemetry.
+
+    Malformed JSON replies are repaired locally, and only retried when
+    repair recovers nothing (see cached_chat()).
+    """
+    cache = get_cache()
+    key = cache_key(model, messages, format, stage_options(stage))
+    content = cache.get(key)
+    if content is not None:
+        if on_item and format == "json":
+            parse_items(content, on_item)
+        return content
+
+    where = f" ({label})" if label else ""
+    if on_item:
+        on_item = _emit_once(on_item)
+    for attempt in range(JSON_RETRIES + 1):
+        content, partial = await _request_async(client, model, messages, format, stage, on_item, label)
+        if partial:
+            return content
+        if _is_cacheable(content, format):
+            cache.put(key, content)
+            return content
+        if format != "json":
+            return content
+        recovered = _recover(content, where)
+        if recovered is not None:
+            return recovered
+        _unusable(attempt, where)
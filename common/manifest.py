@@ -0,0 +1,230 @@
+import os
+import json
+import difflib
+import hashlib
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+from common.ndjson import NDJSONWriter, iter_ndjson
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MANIFEST_DIR = os.environ.get(
+    "LUMINARA_MANIFEST_DIR", os.path.join(_repo_root, ".cache", "manifests")
+)
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def hash_pages(pages: Iterable[str]) -> List[str]:
+    return [hash_text(page) for page in pages]
+
+def item_hash(item: Any) -> str:
+    return hash_text(json.dumps(item, ensure_ascii=False, sort_keys=True))
+
+def manifest_path_for(pdf_path: str, stage: str) -> str:
+    """
+    One manifest per source PDF and pipeline stage, e.g.
+    .cache/manifests/lecture3-1a2b3c4d5e6f.cheatsheet.json
+    """
+    source = os.path.abspath(pdf_path)
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(DEFAULT_MANIFEST_DIR, f"{name}-{hash_text(source)[:12]}.{stage}.json")
+
+def document_order(
+    reused: List[Dict[str, Any]],
+    fresh: List[Tuple]
+) -> Tuple[List[Tuple], Dict[int, Any]]:
+    """
+    Interleaves reused chunk entries and freshly cut chunks by page range.
+    Returns (chunks, reused results by index); reused chunks appear as
+    ("", start_page, end_page) placeholders since their text is not needed.
+    """
+    entries = [((c["start_page"], c["end_page"]), ("", c["start_page"], c["end_page"]), c["result"]) for c in reused]
+    entries += [((c[1], c[2]), c, None) for c in fresh]
+    # Stable sort: reused pieces of a split page keep their original order
+    entries.sort(key=lambda e: e[0])
+
+    chunks = [chunk for _, chunk, _ in entries]
+    results = {i: result for i, (_, _, result) in enumerate(entries) if result is not None}
+    return chunks, results
+
+def _is_empty(result: Any) -> bool:
+    if isinstance(result, dict):
+        return not any(result.values())
+    return not result
+
+def match_pages(old: List[str], new: List[str]) -> List[Tuple[int, int]]:
+    """
+    0-based (old, new) positions of unchanged pages, in increasing order.
+
+    Pages are matched by position first: the common prefix and suffix, and
+    inside the remaining middle the pages at the same offset when it has
+    the same length on both sides. difflib only aligns the middle when it
+    matches more pages, i.e. when pages were inserted or removed. A diff
+    alone can align repeated hashes (blank pages) with the wrong copy and
+    report a one-page edit as many pages added and removed.
+    """
+    prefix = 0
+    while prefix < min(len(old), len(new)) and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < min(len(old), len(new)) - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+
+    mid_old = old[prefix:len(old) - suffix]
+    mid_new = new[prefix:len(new) - suffix]
+    middle = []
+    if mid_old and mid_new:
+        matcher = difflib.SequenceMatcher(None, mid_old, mid_new, autojunk=False)
+        middle = [(block.a + k, block.b + k) for block in matcher.get_matching_blocks() for k in range(block.size)]
+        if len(mid_old) == len(mid_new):
+            positional = [(k, k) for k in range(len(mid_old)) if mid_old[k] == mid_new[k]]
+            if len(positional) >= len(middle):
+                middle = positional
+
+    pairs = [(k, k) for k in range(prefix)]
+    pairs += [(prefix + a, prefix + b) for a, b in middle]
+    pairs += [(len(old) - suffix + k, len(new) - suffix + k) for k in range(suffix)]
+    return pairs
+
+class PageManifest:
+    """
+    Per-PDF record of page content hashes and the result of every chunk
+    from the last run, so a re-run after a few pages were edited only
+    redoes the chunks that touch those pages.
+
+    Manifests are only reused when `settings` (model, chunking, ...) match
+    the previous run; otherwise the run starts from scratch.
+
+    Chunk results of the current run can be handed over one at a time with
+    record_chunk(); they are kept in a side file next to the manifest until
+    save(), not in memory.
+    """
+
+    def __init__(self, path: str, settings: Dict[str, Any], enabled: bool = True):
+        self.path = path
+        self.settings = settings
+        self.pages: List[str] = []
+        self.chunks: List[Dict[str, Any]] = []
+        # Supervisor repairs from the last run, keyed by item_hash() of the input item
+        self.fixes: Dict[str, Any] = {}
+        self._pending: Optional[NDJSONWriter] = None
+
+        if enabled and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"  ! Could not read page manifest ({e}), reprocessing every page.")
+            return
+
+        if data.get("settings") != self.settings:
+            print("  ! Settings changed since the last run, reprocessing every page.")
+            return
+
+        self.pages = data.get("pages", [])
+        self.chunks = data.get("chunks", [])
+        self.fixes = data.get("fixes", {})
+
+    def plan(self, page_hashes: List[str]) -> Tuple[List[Dict[str, Any]], List[Tuple[int, int]]]:
+        """
+        Compares the new page hashes with the stored ones.
+
+        Returns (reused, spans):
+            reused: stored chunk entries whose pages are all unchanged, with
+                start_page/end_page renumbered to the new page positions.
+            spans: 1-based inclusive page ranges that have to be chunked and
+                processed again.
+        """
+        old_to_new = {}
+        changed = added = removed = 0
+        last_old = last_new = -1
+        # A sentinel pair past both ends closes the trailing gap
+        for i, j in match_pages(self.pages, page_hashes) + [(len(self.pages), len(page_hashes))]:
+            old_gap, new_gap = i - last_old - 1, j - last_new - 1
+            changed += min(old_gap, new_gap)
+            added += max(0, new_gap - old_gap)
+            removed += max(0, old_gap - new_gap)
+            old_to_new[i + 1] = j + 1
+            last_old, last_new = i, j
+        old_to_new.pop(len(self.pages) + 1)
+
+        reused = []
+        covered = set()
+        dirty = set()
+        for chunk in self.chunks:
+            old_pages = range(chunk["start_page"], chunk["end_page"] + 1)
+            new_pages = [old_to_new[p] for p in old_pages if p in old_to_new]
+            if len(new_pages) == len(old_pages) and new_pages == list(range(new_pages[0], new_pages[-1] + 1)):
+                reused.append(dict(chunk, start_page=new_pages[0], end_page=new_pages[-1]))
+                covered.update(new_pages)
+            else:
+                # Surviving pages of a stale chunk are redone, even where a
+                # neighbouring reused chunk shares the boundary page
+                dirty.update(new_pages)
+
+        dirty.update(p for p in range(1, len(page_hashes) + 1) if p not in covered)
+
+        spans = []
+        for page in sorted(dirty):
+            if spans and spans[-1][1] == page - 1:
+                spans[-1] = (spans[-1][0], page)
+            else:
+                spans.append((page, page))
+
+        if self.pages:
+            print(f"  - Pages: {len(page_hashes) - changed - added} unchanged, {changed} changed, "
+                  f"{added} added, {removed} removed; reusing {len(reused)} of {len(self.chunks)} stored chunks")
+        return reused, spans
+
+    @property
+    def _pending_path(self) -> str:
+        return self.path + ".chunks.tmp"
+
+    def record_chunk(self, start_page: int, end_page: int, result: Any):
+        """
+        Stores one chunk's result for the next save(); call it in document order.
+        """
+        if _is_empty(result):
+            return
+        if self._pending is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._pending = NDJSONWriter(self._pending_path)
+        self._pending.write({"start_page": start_page, "end_page": end_page, "result": result})
+
+    def save(self, page_hashes: List[str], chunks: Optional[List[Dict[str, Any]]] = None, fixes: Optional[Dict[str, Any]] = None):
+        """
+        `chunks` are {"start_page", "end_page", "result"} entries in document
+        order; without them, the entries passed to record_chunk() are used.
+        Chunks with an empty result (failed or nothing found) are not
+        stored, so their pages are retried next time.
+        """
+        recorded = chunks is None and self._pending is not None
+        if recorded:
+            self._pending.close()
+            self._pending = None
+            chunks = iter_ndjson(self._pending_path)
+
+        header = {
+            "settings": self.settings,
+            "pages": page_hashes,
+            "fixes": self.fixes if fixes is None else fixes,
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        # Written entry by entry so the chunk results never have to be in memory at once
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "chunks": [')
+            first = True
+            for chunk in chunks or []:
+                if _is_empty(chunk["result"]):
+                    continue
+                f.write(("" if first else ", ") + json.dumps(chunk, ensure_ascii=False))
+                first = False
+            f.write("]}")
+        os.replace(tmp_path, self.path)
+        if recorded:
+            os.remove(self._pending_path)
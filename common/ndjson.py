@@ -0,0 +1,81 @@
+import os
+import json
+import threading
+from typing import Dict, Any, Iterator, List, Iterable
+
+class NDJSONWriter:
+    """
+    Appends one JSON record per line and flushes immediately, so readers
+    (e.g. the GUI) can pick up records while the pipeline is still running.
+    The file is truncated when the writer is created.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._f = open(path, "w", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]):
+        self.write_many([record])
+
+    def write_many(self, records: Iterable[Dict[str, Any]]):
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        if not lines:
+            return
+        with self._lock:
+            self._f.write(lines)
+            self._f.flush()
+            self.count += lines.count("\n")
+
+    def close(self):
+        with self._lock:
+            self._f.close()
+
+def iter_ndjson(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yields records from an NDJSON file, one line at a time.
+    A partially written last line (the producer is still running) is skipped.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+class NDJSONTail:
+    """
+    Incremental reader for a file that is still being written: each call to
+    read_new() returns only the complete records added since the last call.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+
+    def read_new(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return []
+        if os.path.getsize(self.path) < self.offset:
+            # The file was truncated by a new run
+            self.offset = 0
+
+        records = []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                self.offset += len(raw)
+                line = raw.decode("utf-8").strip()
+                if line:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        return records
@@ -0,0 +1,224 @@
+import os
+import time
+import asyncio
+import weakref
+import threading
+import ollama
+from typing import Dict, Any, List, Optional, AsyncIterator, Union
+
+from common.concurrency import AdaptiveLimiter
+from common.telemetry import call_telemetry
+
+# Every request of a run carries this keep_alive so the model is not evicted
+# between the extract and supervise stages
+RUN_KEEP_ALIVE = os.environ.get("LUMINARA_KEEP_ALIVE", "30m")
+# Once a run is finished the model stays warm this long and is then unloaded
+IDLE_KEEP_ALIVE = os.environ.get("LUMINARA_IDLE_KEEP_ALIVE", "5m")
+
+# One context size for every stage: a request with a different num_ctx makes
+# Ollama reload the model. 4096 fits a 1500-token chunk, the prompt and the reply.
+NUM_CTX = int(os.environ.get("LUMINARA_NUM_CTX", "4096"))
+
+# Timing fields of Ollama's final reply message (durations in nanoseconds)
+STAT_FIELDS = ["load_duration", "prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration", "total_duration"]
+
+# Per-stage generation options (see https://github.com/ollama/ollama/blob/main/docs/modelfile.md)
+STAGE_OPTIONS: Dict[str, Dict[str, Any]] = {
+    "extract": {"temperature": 0.2, "num_predict": 1536},
+    "questions": {"temperature": 0.4, "num_predict": 1536},
+    # Same options as "questions" (and so the same cache keys); a separate
+    # stage only so telemetry can tell note questions from chunk questions
+    "notes-questions": {"temperature": 0.4, "num_predict": 1536},
+    "fused": {"temperature": 0.3, "num_predict": 2560},
+    "supervise": {"temperature": 0.1, "num_predict": 1536},
+}
+
+# Async requests stream their reply so list items arrive as they are generated
+_streaming = os.environ.get("LUMINARA_STREAM", "1") != "0"
+
+# Requests in flight are limited by an AdaptiveLimiter unless turned off
+# (--fixed-concurrency); --concurrency is then only its ceiling
+_adaptive = os.environ.get("LUMINARA_ADAPTIVE", "1") != "0"
+_limiter: Optional[AdaptiveLimiter] = None
+
+def set_streaming(enabled: bool):
+    """
+    Turns streamed replies on or off (--no-stream).
+    """
+    global _streaming
+    _streaming = enabled
+
+def streaming_enabled() -> bool:
+    return _streaming
+
+def set_adaptive(enabled: bool):
+    """
+    Turns the adaptive concurrency limit on or off (--fixed-concurrency).
+    """
+    global _adaptive
+    _adaptive = enabled
+
+def request_limiter(concurrency: int) -> Union[AdaptiveLimiter, asyncio.Semaphore]:
+    """
+    Limit on LLM requests in flight for one stage. With adaptive concurrency
+    this is the process-wide AdaptiveLimiter, so later stages start from the
+    limit earlier ones settled on, and `concurrency` is its ceiling;
+    otherwise a plain semaphore of `concurrency`.
+    """
+    global _limiter
+    if not _adaptive:
+        return asyncio.Semaphore(max(1, concurrency))
+    if _limiter is None:
+        _limiter = AdaptiveLimiter(concurrency)
+    else:
+        _limiter.set_max_limit(concurrency)
+    return _limiter
+
+def concurrency_report() -> Optional[str]:
+    return _limiter.report() if _limiter else None
+
+def _record(started: float, stats: Any, model: str, stage: Optional[str], label: Optional[str]):
+    # Every finished call feeds both the concurrency limiter and the run telemetry
+    elapsed = time.perf_counter() - started
+    stats = {k: stats.get(k) for k in STAT_FIELDS}
+    if _limiter:
+        _limiter.record(started, elapsed, stats)
+    call_telemetry.record(stage, label, model, elapsed, stats)
+
+def _record_failure(started: float, error: BaseException, model: str, stage: Optional[str], label: Optional[str]):
+    if _limiter:
+        _limiter.record_failure(started, error)
+    call_telemetry.record(stage, label, model, time.perf_counter() - started, None, status="failed")
+
+def stage_options(stage: Optional[str]) -> Dict[str, Any]:
+    """
+    Options for one pipeline stage, always with the shared num_ctx.
+    """
+    options = {"num_ctx": NUM_CTX}
+    options.update(STAGE_OPTIONS.get(stage, {}))
+    return options
+
+_client: Optional[ollama.Client] = None
+# AsyncClient connections belong to one event loop, and every asyncio.run()
+# starts a new one, so there is one pooled client per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ollama.AsyncClient]" = weakref.WeakKeyDictionary()
+_warm_threads: List[threading.Thread] = []
+
+def get_client() -> ollama.Client:
+    """
+    Process-wide synchronous client; its HTTP connections are reused across calls.
+    """
+    global _client
+    if _client is None:
+        _client = ollama.Client()
+    return _client
+
+def get_async_client() -> ollama.AsyncClient:
+    """
+    Pooled AsyncClient for the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = ollama.AsyncClient()
+        _async_clients[loop] = client
+    return client
+
+def chat(model: str, messages: List[Dict[str, str]], format: Optional[str] = "json", stage: str = None, label: str = None):
+    started = time.perf_counter()
+    try:
+        response = get_client().chat(model=model, messages=messages, format=format, options=stage_options(stage), keep_alive=RUN_KEEP_ALIVE)
+    except Exception as e:
+        _record_failure(started, e, model, stage, label)
+        raise
+    _record(started, response, model, stage, label)
+    return response
+
+async def achat(
+    client: ollama.AsyncClient,
+    model: str,
+    messages: List[Dict[str, str]],
+    format: Optional[str] = "json",
+    stage: str = None,
+    label: str = None
+):
+    client = client or get_async_client()
+    started = time.perf_counter()
+    try:
+        response = await client.chat(model=model, messages=messages, format=format, options=stage_options(stage), keep_alive=RUN_KEEP_ALIVE)
+    except Exception as e:
+        _record_failure(started, e, model, stage, label)
+        raise
+    _record(started, response, model, stage, label)
+    return response
+
+async def achat_stream(
+    client: ollama.AsyncClient,
+    model: str,
+    messages: List[Dict[str, str]],
+    format: Optional[str] = "json",
+    stage: str = None,
+    label: str = None
+) -> AsyncIterator[str]:
+    """
+    Yields the reply content piece by piece as the model generates it.
+    A stream the caller closes early is not reported to the limiter, and
+    goes into the telemetry with its wall time only.
+    """
+    client = client or get_async_client()
+    started = time.perf_counter()
+    reported = False
+    try:
+        stream = await client.chat(
+            model=model, messages=messages, format=format, options=stage_options(stage), keep_alive=RUN_KEEP_ALIVE, stream=True
+        )
+        async for part in stream:
+            if part.get('done'):
+                _record(started, part, model, stage, label)
+                reported = True
+            yield part['message']['content']
+    except Exception as e:
+        _record_failure(started, e, model, stage, label)
+        reported = True
+        raise
+    finally:
+        if not reported:
+            call_telemetry.record(stage, label, model, time.perf_counter() - started, None, status="incomplete")
+
+def _load(model: str, keep_alive):
+    # An empty prompt only loads the model (or resets its keep-alive timer)
+    get_client().generate(model=model, prompt="", options={"num_ctx": NUM_CTX}, keep_alive=keep_alive)
+
+def warm_model(model: str, background: bool = True):
+    """
+    Loads `model` at pipeline start and holds it resident for the run.
+    By default this happens in a background thread, so PDF reading and
+    cache lookups are not held up by the load.
+    """
+    def load():
+        started = time.perf_counter()
+        try:
+            _load(model, RUN_KEEP_ALIVE)
+            print(f"Model {model} loaded in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            print(f"  ! Could not preload {model}: {e}")
+
+    if not background:
+        load()
+        return
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+    _warm_threads.append(thread)
+
+def release_model(model: str):
+    """
+    Ends the run's hold on `model`: it stays loaded for IDLE_KEEP_ALIVE and
+    is then unloaded by Ollama unless another run picks it up.
+    """
+    for thread in _warm_threads:
+        thread.join()
+    _warm_threads.clear()
+    try:
+        _load(model, IDLE_KEEP_ALIVE)
+    except Exception as e:
+        print(f"  ! Could not set idle unload for {model}: {e}")
@@ -0,0 +1,82 @@
+import re
+from typing import Dict, Any
+
+# Items scoring at or above this are sent to the LLM supervisor.
+# 0 sends everything (the old behaviour); values near 1 only send empty/broken items.
+DEFAULT_THRESHOLD = 0.6
+
+# How strongly each problem suggests the item needs an LLM repair
+SCORE_EMPTY = 1.0
+SCORE_UNBALANCED = 0.9
+SCORE_TRUNCATED = 0.9
+SCORE_NO_TERMINAL_PUNCT = 0.6
+SCORE_TOO_SHORT = 0.5
+
+# Words a complete sentence practically never ends on
+_DANGLING_WORDS = {
+    "a", "an", "the", "and", "or", "but", "nor", "of", "to", "in", "on", "at",
+    "by", "for", "with", "from", "as", "is", "are", "was", "were", "be", "that",
+    "which", "who", "whose", "than", "such"
+}
+_LAST_WORD_RE = re.compile(r"(\w+)\W*$")
+_TERMINAL = (".", "!", "?", "\"", "'", ")", "]", "”", "’", "…")
+_PAIRS = [("(", ")"), ("[", "]"), ("{", "}")]
+
+def _is_unbalanced(text: str) -> bool:
+    for open_ch, close_ch in _PAIRS:
+        if text.count(open_ch) != text.count(close_ch):
+            return True
+    return text.count('"') % 2 == 1
+
+def _is_truncated(text: str) -> bool:
+    if text.endswith(_TERMINAL):
+        return False
+    if text.endswith(("-", ",", ":", ";", "(")):
+        return True
+    match = _LAST_WORD_RE.search(text)
+    return bool(match) and match.group(1).lower() in _DANGLING_WORDS
+
+def score_text(text: Any, kind: str, char_limit: int = None) -> float:
+    """
+    Scores one field value from 0 (looks fine) to 1 (certainly broken).
+
+    kind:
+        "sentence" - prose that should be a complete sentence (definitions, answers)
+        "question" - like "sentence", but a question mark also counts as terminal
+        "phrase"   - short labels (terms, names, dates); only checked for emptiness/truncation
+        "snippet"  - quoted source excerpts; only checked for emptiness and brackets
+    """
+    if not isinstance(text, str):
+        return SCORE_EMPTY if text is None else 0.0
+    text = text.strip()
+    if not text:
+        return SCORE_EMPTY
+
+    score = 0.0
+    if _is_unbalanced(text):
+        score = max(score, SCORE_UNBALANCED)
+    if kind == "snippet":
+        return score
+
+    if _is_truncated(text):
+        score = max(score, SCORE_TRUNCATED)
+    if kind in ("sentence", "question") and not text.endswith(_TERMINAL):
+        score = max(score, SCORE_NO_TERMINAL_PUNCT)
+    if kind == "sentence" and char_limit and len(text) < 0.3 * char_limit:
+        score = max(score, SCORE_TOO_SHORT)
+    return score
+
+def score_item(item: Dict[str, Any], fields: Dict[str, str], char_limit: int = None) -> float:
+    """
+    Repair score for a whole item: the worst of its fields.
+    `fields` maps field name -> kind (see score_text). Missing fields count as empty.
+    """
+    if not isinstance(item, dict):
+        return SCORE_EMPTY
+    return max(
+        (score_text(item.get(name), kind, char_limit if name == "answer" else None) for name, kind in fields.items()),
+        default=0.0
+    )
+
+def needs_repair(item: Dict[str, Any], fields: Dict[str, str], threshold: float = DEFAULT_THRESHOLD, char_limit: int = None) -> bool:
+    return score_item(item, fields, char_limit) >= threshold
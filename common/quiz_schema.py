@@ -0,0 +1,109 @@
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+# Canonical quiz item keys and the variants the model sometimes uses instead
+KEY_ALIASES = {
+    "question": ["question", "Question", "QUESTION", "q", "Q", "question_text", "prompt"],
+    "answer": ["answer", "Answer", "ANSWER", "a", "A", "correct_answer", "correctAnswer", "solution"],
+    "type": ["type", "Type", "question_type", "questionType"],
+    "context_snippet": ["context_snippet", "contextSnippet", "context", "Context", "snippet", "source_text"],
+    "options": ["options", "Options", "choices", "Choices"],
+}
+
+# "A) foo B) bar", "a. foo b. bar", "(A) foo (B) bar"
+_INLINE_OPTION_RE = re.compile(r"(?:^|\s)\(?([A-Ha-h])[\).:]\s+")
+
+def _first_present(item: Dict[str, Any], aliases: List[str]):
+    for key in aliases:
+        if key in item and item[key] not in (None, ""):
+            return item[key]
+    return None
+
+def _as_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "True" if value else "False"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, str):
+        return value.strip()
+    return ""
+
+def coerce_options(value) -> Optional[List[str]]:
+    """
+    Normalizes MCQ options to a list of "A. text" strings. Accepts lists of
+    strings, lists of {"label"/"option"/"text": ...} dicts, {"A": "text"}
+    dicts and inline strings like "A) foo B) bar". Returns None if nothing
+    usable is found.
+    """
+    if value is None:
+        return None
+
+    labelled: List[Tuple[str, str]] = []
+    if isinstance(value, dict):
+        labelled = [(str(k), _as_text(v)) for k, v in value.items()]
+    elif isinstance(value, list):
+        for i, opt in enumerate(value):
+            if isinstance(opt, dict):
+                label = _as_text(opt.get("label") or opt.get("key") or opt.get("letter")) or chr(ord("A") + i)
+                text = _as_text(opt.get("text") or opt.get("option") or opt.get("value") or opt.get("answer"))
+                labelled.append((label, text))
+            else:
+                labelled.append((chr(ord("A") + i), _as_text(opt)))
+    elif isinstance(value, str):
+        parts = _INLINE_OPTION_RE.split(value.strip())
+        # split() gives [prefix, label, text, label, text, ...]
+        labelled = [(parts[i].upper(), parts[i + 1].strip()) for i in range(1, len(parts) - 1, 2)]
+        if not labelled:
+            labelled = [("", p.strip()) for p in re.split(r"\n|;", value) if p.strip()]
+
+    options = []
+    for i, (label, text) in enumerate(labelled):
+        if not text:
+            continue
+        if label and not re.match(r"^\(?[A-Ha-h][\).:]\s", text):
+            text = f"{label.upper()}. {text}"
+        options.append(text)
+    return options or None
+
+def normalize_question(item: Any, default_type: str = None) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    Maps a raw model item onto the quiz schema:
+    {"question", "answer", "type", "context_snippet", optional "options"}.
+
+    Returns (normalized item or None, list of problems). An item with no
+    problems is valid and needs no LLM repair.
+    """
+    if not isinstance(item, dict):
+        return None, ["not an object"]
+
+    problems = []
+    normalized = {
+        "question": _as_text(_first_present(item, KEY_ALIASES["question"])),
+        "answer": _as_text(_first_present(item, KEY_ALIASES["answer"])),
+        "type": _as_text(_first_present(item, KEY_ALIASES["type"])) or (default_type or ""),
+        "context_snippet": _as_text(_first_present(item, KEY_ALIASES["context_snippet"])),
+    }
+
+    if not normalized["question"]:
+        problems.append("missing question")
+    if not normalized["answer"]:
+        problems.append("missing answer")
+    if not normalized["type"]:
+        problems.append("missing type")
+
+    raw_options = _first_present(item, KEY_ALIASES["options"])
+    options = coerce_options(raw_options)
+    if options:
+        normalized["options"] = options
+    elif normalized["type"].upper() == "MCQ":
+        problems.append("MCQ without options")
+
+    # Keep any extra keys (e.g. the notes "source" tag) that are not aliases
+    known = {alias for aliases in KEY_ALIASES.values() for alias in aliases}
+    for key, value in item.items():
+        if key not in known and key not in normalized:
+            normalized[key] = value
+
+    return normalized, problems
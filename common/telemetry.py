@@ -0,0 +1,102 @@
+import os
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+from common.ndjson import NDJSONWriter
+from common.concurrency import DEFAULT_METRICS_DIR
+
+# Slowest calls listed in the end-of-run report
+SLOWEST_CALLS = 5
+
+def _seconds(ns: Optional[int]) -> float:
+    return (ns or 0) / 1e9
+
+def _rate(tokens: int, seconds: float) -> str:
+    return f"{tokens / seconds:.1f} tok/s" if seconds else "n/a"
+
+class CallTelemetry:
+    """
+    Token counts and timings of every LLM call in a run, tagged with stage,
+    chunk label and model. Each call is appended to an NDJSON metrics file
+    as it finishes; report() summarizes the run.
+
+    Calls closed early (watchdog abort) or failed have no Ollama stats and
+    only record their wall time.
+    """
+
+    def __init__(self, metrics_path: str = None):
+        self.metrics_path = metrics_path or os.path.join(DEFAULT_METRICS_DIR, "calls.ndjson")
+        self.calls: List[Dict[str, Any]] = []
+        self._writer: Optional[NDJSONWriter] = None
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def record(self, stage: Optional[str], label: Optional[str], model: str, wall: float, stats: Optional[Dict[str, Any]], status: str = "ok"):
+        stats = stats or {}
+        call = {
+            "time": round(time.perf_counter() - self._started, 3),
+            "stage": stage,
+            "chunk": label,
+            "model": model,
+            "status": status,
+            "wall": round(wall, 3),
+            "prompt_eval_count": stats.get("prompt_eval_count"),
+            "eval_count": stats.get("eval_count"),
+            "load_duration": stats.get("load_duration"),
+            "prompt_eval_duration": stats.get("prompt_eval_duration"),
+            "eval_duration": stats.get("eval_duration"),
+            "total_duration": stats.get("total_duration"),
+        }
+        with self._lock:
+            self.calls.append(call)
+            try:
+                if self._writer is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.metrics_path)), exist_ok=True)
+                    self._writer = NDJSONWriter(self.metrics_path)
+                self._writer.write(call)
+            except OSError as e:
+                print(f"  ! Could not write call metrics: {e}")
+
+    def report(self) -> str:
+        if not self.calls:
+            return "LLM calls: none"
+        ok = [c for c in self.calls if c["status"] == "ok"]
+        prompt_tokens = sum(c["prompt_eval_count"] or 0 for c in ok)
+        eval_tokens = sum(c["eval_count"] or 0 for c in ok)
+        load = sum(_seconds(c["load_duration"]) for c in ok)
+        prompt = sum(_seconds(c["prompt_eval_duration"]) for c in ok)
+        generation = sum(_seconds(c["eval_duration"]) for c in ok)
+        wall = sum(c["wall"] for c in self.calls)
+        # Whatever the server did not account for was spent waiting for a slot or on the wire
+        waiting = max(0.0, sum(c["wall"] for c in ok) - load - prompt - generation)
+        model_time = (load + prompt + generation + waiting) or 1.0
+
+        lines = [
+            f"LLM calls: {len(self.calls)} ({len(ok)} complete, {len(self.calls) - len(ok)} aborted or failed), "
+            f"{wall:.1f}s of request time; metrics in {self.metrics_path}",
+            f"  Tokens: {prompt_tokens} prompt at {_rate(prompt_tokens, prompt)}, "
+            f"{eval_tokens} generated at {_rate(eval_tokens, generation)}",
+            f"  Time: load {load:.1f}s ({load / model_time:.0%}), prompt eval {prompt:.1f}s ({prompt / model_time:.0%}), "
+            f"generation {generation:.1f}s ({generation / model_time:.0%}), queued/other {waiting:.1f}s ({waiting / model_time:.0%})",
+        ]
+
+        stages: Dict[str, List[Dict[str, Any]]] = {}
+        for call in ok:
+            stages.setdefault(call["stage"] or "other", []).append(call)
+        for stage, calls in stages.items():
+            tokens = sum(c["eval_count"] or 0 for c in calls)
+            seconds = sum(_seconds(c["eval_duration"]) for c in calls)
+            lines.append(f"  {stage}: {len(calls)} calls, {sum(c['wall'] for c in calls):.1f}s, "
+                         f"{tokens} tokens generated at {_rate(tokens, seconds)}")
+
+        slowest = sorted(self.calls, key=lambda c: c["wall"], reverse=True)[:SLOWEST_CALLS]
+        lines.append("  Slowest calls:")
+        for call in slowest:
+            where = f" ({call['chunk']})" if call["chunk"] else ""
+            tokens = f", {call['eval_count']} tokens" if call["eval_count"] else ""
+            lines.append(f"    {call['wall']:.1f}s {call['stage'] or 'other'}{where}{tokens}"
+                         f"{'' if call['status'] == 'ok' else ', ' + call['status']}")
+        return "\n".join(lines)
+
+call_telemetry = CallTelemetry()
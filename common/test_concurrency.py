@@ -0,0 +1,83 @@
+import time
+import asyncio
+
+from common.concurrency import AdaptiveLimiter
+
+def _stats(eval_seconds=1.0, tokens=100):
+    return {"eval_count": tokens, "eval_duration": int(eval_seconds * 1e9), "load_duration": 0, "prompt_eval_duration": 0}
+
+def _limiter(tmp_path, max_limit=16, initial=2):
+    return AdaptiveLimiter(max_limit, initial=initial, metrics_path=str(tmp_path / "concurrency.ndjson"))
+
+def _clean(limiter, count):
+    for _ in range(count):
+        limiter.record(time.perf_counter(), 1.0, _stats())
+
+def test_slow_start_doubles_then_queueing_backs_off(tmp_path):
+    limiter = _limiter(tmp_path)
+    _clean(limiter, 2)
+    assert limiter.limit == 4
+    _clean(limiter, 4)
+    assert limiter.limit == 8
+
+    limiter.record(time.perf_counter(), 5.0, _stats())
+    assert limiter.limit == 5
+    assert not limiter.slow_start
+    assert limiter.decisions[-1]["reason"] == "queueing delay"
+
+    # Congestion avoidance: one more slot per window of clean requests
+    _clean(limiter, 5)
+    assert limiter.limit == 6
+
+def test_rising_token_latency_backs_off(tmp_path):
+    limiter = _limiter(tmp_path, initial=4)
+    _clean(limiter, 1)
+    limiter.record(time.perf_counter(), 2.0, _stats(eval_seconds=2.0))
+    assert limiter.limit == 2
+    assert limiter.decisions[-1]["reason"] == "per-token latency up"
+
+def test_one_backoff_per_window(tmp_path):
+    limiter = _limiter(tmp_path, initial=8)
+    started = time.perf_counter()
+    limiter.record_failure(started, TimeoutError())
+    assert limiter.limit == 4
+    # Requests started before that change do not cut the limit again
+    limiter.record_failure(started, TimeoutError())
+    assert limiter.limit == 4
+    limiter.record_failure(time.perf_counter(), TimeoutError())
+    assert limiter.limit == 2
+    assert limiter.failures == 3
+
+def test_limit_stays_within_bounds(tmp_path):
+    limiter = _limiter(tmp_path, max_limit=3)
+    _clean(limiter, 20)
+    assert limiter.limit == 3
+    for _ in range(5):
+        limiter.record_failure(time.perf_counter(), TimeoutError())
+    assert limiter.limit == 1
+    limiter.set_max_limit(2)
+    assert limiter.max_limit == 2
+
+def test_requests_in_flight_never_exceed_the_limit(tmp_path):
+    limiter = _limiter(tmp_path, initial=3)
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        async with limiter:
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.001)
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(20)))
+
+    asyncio.run(run())
+    assert peak == 3
+    assert limiter.in_flight == 0
+    assert "Concurrency: limit 3 -> 3" in limiter.report()
+
+def test_decisions_are_written_to_the_metrics_file(tmp_path):
+    limiter = _limiter(tmp_path)
+    _clean(limiter, 2)
+    with open(limiter.metrics_path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
@@ -0,0 +1,89 @@
+from common.dedupe import collapse_near_duplicates, dedupe_questions, jaccard, normalize, same_subject, shingles
+
+def _definitions(items):
+    return collapse_near_duplicates(
+        [{"term": t, "definition": d} for t, d in items],
+        key=lambda x: x["term"],
+        text=lambda x: f"{x['term']} {x['definition']}",
+        subject=lambda x: x["term"]
+    )
+
+def test_normalize():
+    assert normalize(" Pandas. ") == "pandas"
+    assert normalize("Python's   list!") == "python s list"
+
+def test_exact_key_match_keeps_the_richer_item():
+    kept = _definitions([("Pandas", "A library."), ("pandas.", "A data analysis library for Python.")])
+    assert kept == [{"term": "pandas.", "definition": "A data analysis library for Python."}]
+
+def test_near_duplicate_with_the_same_subject_is_merged():
+    kept = _definitions([
+        ("Pandas", "A Python library for data analysis and manipulation."),
+        ("Pandas library", "A Python library for data analysis and manipulation."),
+    ])
+    assert len(kept) == 1
+    assert kept[0]["term"] == "Pandas library"
+
+def test_opposite_terms_with_similar_definitions_stay_apart():
+    items = [("Supervised learning", "Learning from labeled data."), ("Unsupervised learning", "Learning from unlabeled data.")]
+    assert jaccard(shingles(normalize(" ".join(items[0]))), shingles(normalize(" ".join(items[1])))) >= 0.6
+    assert len(_definitions(items)) == 2
+
+def test_sibling_terms_with_similar_definitions_stay_apart():
+    items = [("Python list", "An ordered collection of items."), ("Python tuple", "An ordered collection of items that cannot change.")]
+    assert len(_definitions(items)) == 2
+
+def test_without_subject_similar_text_is_enough():
+    items = [{"t": "Learning from labeled data, supervised."}, {"t": "Learning from labeled data, unsupervised."}]
+    kept = collapse_near_duplicates(items, key=lambda x: x["t"], text=lambda x: x["t"])
+    assert len(kept) == 1
+
+def test_same_subject():
+    assert same_subject("Pandas", "pandas library")
+    assert same_subject("Neural networks", "neural network")
+    assert not same_subject("Supervised learning", "Unsupervised learning")
+    assert not same_subject("Python list", "Python tuple")
+    assert not same_subject("", "anything")
+
+def test_order_follows_first_appearance():
+    kept = _definitions([("B", "Second letter."), ("A", "First letter."), ("b", "The second letter of the alphabet.")])
+    assert [x["term"] for x in kept] == ["b", "A"]
+
+def test_restated_questions_are_dropped():
+    questions = [
+        {"question": "What is photosynthesis?", "answer": "How plants turn light into sugar."},
+        {"question": "What is photosynthesis ?", "answer": "The process by which plants turn light into sugar."},
+        {"question": "What is respiration?", "answer": "How cells release energy from sugar."},
+    ]
+    kept = dedupe_questions(questions)
+    assert [q["question"] for q in kept] == ["What is photosynthesis ?", "What is respiration?"]
+
+def test_similar_questions_with_different_answers_are_kept():
+    questions = [
+        {"question": "In which year did World War I end?", "answer": "1918", "type": "Long Answer"},
+        {"question": "In which year did World War II end?", "answer": "1945", "type": "Long Answer"},
+    ]
+    assert dedupe_questions(questions) == questions
+
+def test_true_false_pair_with_opposite_answers_is_kept():
+    questions = [
+        {"question": "Supervised learning uses labeled training data.", "answer": "True", "type": "True/False"},
+        {"question": "Unsupervised learning uses labeled training data.", "answer": "False", "type": "True/False"},
+    ]
+    assert dedupe_questions(questions) == questions
+
+def test_mcq_answers_must_match_exactly():
+    questions = [
+        {"question": "Which planet is the largest in the solar system?", "answer": "B", "type": "MCQ"},
+        {"question": "Which planet is the largest in our solar system?", "answer": "C", "type": "MCQ"},
+    ]
+    assert dedupe_questions(questions) == questions
+    questions[1]["answer"] = "B"
+    assert len(dedupe_questions(questions)) == 1
+
+def test_restated_long_answers_are_merged():
+    questions = [
+        {"question": "What does photosynthesis produce in plants?", "answer": "Glucose and oxygen from light, water and CO2.", "type": "Long Answer"},
+        {"question": "What does photosynthesis produce in a plant?", "answer": "Glucose and oxygen, from light, water and CO2.", "type": "Long Answer"},
+    ]
+    assert len(dedupe_questions(questions)) == 1
@@ -0,0 +1,34 @@
+from common.json_repair import is_empty, repair_json, strip_fences
+
+def test_valid_json_is_returned_as_is():
+    assert repair_json('{"definitions": [{"term": "a"}]}') == {"definitions": [{"term": "a"}]}
+
+def test_fences_and_leading_prose_are_stripped():
+    assert strip_fences('```json\n[1, 2]\n```') == "[1, 2]\n"
+    assert repair_json('Here you go:\n```json\n[{"question": "Q?"}]\n```') == [{"question": "Q?"}]
+    assert repair_json('Sure! {"concepts": []} Hope this helps.') == {"concepts": []}
+
+def test_trailing_commas_are_dropped():
+    assert repair_json('{"a": [1, 2, ], "b": 3,}') == {"a": [1, 2], "b": 3}
+    assert repair_json('{"text": "a, ]"}') == {"text": "a, ]"}
+
+def test_truncated_reply_is_closed():
+    assert repair_json('{"definitions": [{"term": "a", "definition": "cut of') == {
+        "definitions": [{"term": "a", "definition": "cut of"}]
+    }
+    assert repair_json('[{"question": "Q1?"}, {"question": "Q2?"') == [{"question": "Q1?"}, {"question": "Q2?"}]
+
+def test_falls_back_to_the_last_complete_value():
+    assert repair_json('[{"question": "Q1?"}, {"question": "Q2?", "answer": tru') == [{"question": "Q1?"}, {"question": "Q2?"}]
+    assert repair_json('{"a": [1, 2], "b": [3, @') == {"a": [1, 2], "b": [3]}
+
+def test_nothing_to_recover():
+    assert repair_json("") is None
+    assert repair_json("I could not find anything.") is None
+
+def test_is_empty():
+    assert is_empty([])
+    assert is_empty({"definitions": [], "concepts": []})
+    assert is_empty({"questions": {}})
+    assert not is_empty({"definitions": [], "concepts": [{"name": "x"}]})
+    assert not is_empty([{}])
@@ -0,0 +1,50 @@
+import json
+
+from common.json_stream import IncrementalJSONParser, parse_items
+
+REPLY = json.dumps({
+    "definitions": [{"term": "a", "definition": "x {not a bracket}"}, {"term": "b", "definition": "y \"quoted\""}],
+    "concepts": [{"name": "c", "explanation": "nested", "tags": [{"k": 1}]}],
+    "note": {"ignored": True},
+})
+
+def _feed(reply, size):
+    items = []
+    parser = IncrementalJSONParser(lambda key, item: items.append((key, item)))
+    for i in range(0, len(reply), size):
+        parser.feed(reply[i:i + size])
+    return parser, items
+
+def test_items_are_emitted_whatever_the_piece_size():
+    expected = [(key, item) for key, values in json.loads(REPLY).items() if isinstance(values, list) for item in values]
+    for size in (1, 3, 17, len(REPLY)):
+        parser, items = _feed(REPLY, size)
+        assert items == expected
+        assert parser.complete()
+
+def test_each_item_is_emitted_when_its_brace_closes():
+    items = []
+    parser = IncrementalJSONParser(lambda key, item: items.append(item))
+    parser.feed('[{"question": "Q1?"}, {"question": "Q')
+    assert items == [{"question": "Q1?"}]
+    parser.feed('2?"}]')
+    assert items == [{"question": "Q1?"}, {"question": "Q2?"}]
+    assert parser.root == "["
+
+def test_cut_off_reply_is_salvaged():
+    parser, items = _feed('{"definitions": [{"term": "a", "definition": "x"}, {"term": "b", "defin', 5)
+    assert not parser.complete()
+    assert parser.salvage() == {"definitions": [{"term": "a", "definition": "x"}]}
+
+def test_mismatched_bracket_marks_the_reply_broken():
+    parser = parse_items('[{"question": "Q1?"}}, {"question": "Q2?"}]')
+    assert parser.broken
+    assert parser.salvage() == [{"question": "Q1?"}]
+
+def test_salvage_of_a_subset():
+    parser = parse_items(REPLY)
+    kept = [item for item in parser.items if item[1].get("term") != "b"]
+    assert parser.salvage(kept) == {
+        "definitions": [{"term": "a", "definition": "x {not a bracket}"}],
+        "concepts": [{"name": "c", "explanation": "nested", "tags": [{"k": 1}]}],
+    }
@@ -0,0 +1,65 @@
+import json
+import asyncio
+
+import pytest
+
+import common.llm_cache as llm_cache
+from common.llm_cache import cache_key, cached_achat, configure_cache
+from common.ollama_client import stage_options
+
+MESSAGES = [{"role": "system", "content": "Extract."}, {"role": "user", "content": "Some text."}]
+
+@pytest.fixture
+def cache(tmp_path):
+    return configure_cache(path=str(tmp_path / "cache.sqlite"))
+
+def _stream(*replies):
+    # One reply per generation, streamed a few characters at a time
+    replies = list(replies)
+
+    async def achat_stream(client, model, messages, format=None, stage=None, label=None):
+        reply = replies.pop(0)
+        for i in range(0, len(reply), 7):
+            yield reply[i:i + 7]
+    return achat_stream
+
+def _run(on_item=None, stage="extract"):
+    return asyncio.run(cached_achat(None, "m", MESSAGES, stage=stage, on_item=on_item))
+
+def test_streamed_items_reach_on_item_and_the_cache(monkeypatch, cache):
+    reply = json.dumps({"definitions": [{"term": "a", "definition": "x"}, {"term": "b", "definition": "y"}]})
+    monkeypatch.setattr(llm_cache, "achat_stream", _stream(reply))
+    items = []
+    assert _run(lambda key, item: items.append((key, item["term"]))) == reply
+    assert items == [("definitions", "a"), ("definitions", "b")]
+
+    # Served from the cache the second time, and replayed through on_item
+    items.clear()
+    assert _run(lambda key, item: items.append((key, item["term"]))) == reply
+    assert items == [("definitions", "a"), ("definitions", "b")]
+
+def test_repeated_items_are_not_cached(monkeypatch, cache):
+    item = {"term": "a", "definition": "x"}
+    reply = json.dumps({"definitions": [item, item, {"term": "b", "definition": "y"}], "note": "kept"})
+    monkeypatch.setattr(llm_cache, "achat_stream", _stream(reply))
+    items = []
+    content = _run(lambda key, item: items.append(item["term"]))
+    assert items == ["a", "b"]
+    expected = {"definitions": [item, {"term": "b", "definition": "y"}], "note": "kept"}
+    assert json.loads(content) == expected
+    stored = cache.get(cache_key("m", MESSAGES, "json", stage_options("extract")))
+    assert json.loads(stored) == expected
+
+def test_retry_does_not_emit_items_twice(monkeypatch, cache):
+    broken = '[{"question": "Q1?"}, {"question": oops'
+    fixed = '[{"question": "Q1?"}, {"question": "Q2?"}]'
+    monkeypatch.setattr(llm_cache, "achat_stream", _stream(broken, fixed))
+    monkeypatch.setattr(llm_cache, "_recover", lambda content, where: None)
+    items = []
+    assert _run(lambda key, item: items.append(item["question"]), stage="questions") == fixed
+    assert items == ["Q1?", "Q2?"]
+
+def test_unusable_replies_raise_after_the_retry(monkeypatch, cache):
+    monkeypatch.setattr(llm_cache, "achat_stream", _stream("not json", "still not json"))
+    with pytest.raises(ValueError):
+        _run()
@@ -0,0 +1,91 @@
+import json
+
+from common.manifest import PageManifest, document_order, match_pages
+
+BLANK = "blank"
+
+def _book(pages):
+    # Text pages separated by blank pages, like chapter ends in a slide deck
+    return [p for i in range(pages) for p in (f"page {i}", BLANK)]
+
+def _manifest(tmp_path, pages, chunk_pages=2):
+    manifest = PageManifest(str(tmp_path / "doc.cheatsheet.json"), settings={"model": "m"})
+    for start in range(1, len(pages) + 1, chunk_pages):
+        end = min(start + chunk_pages - 1, len(pages))
+        manifest.record_chunk(start, end, {"definitions": [{"term": f"t{start}", "definition": "d"}]})
+    manifest.save(pages)
+    return PageManifest(manifest.path, settings={"model": "m"})
+
+def test_unchanged_document_reuses_everything(tmp_path):
+    pages = _book(10)
+    reused, spans = _manifest(tmp_path, pages).plan(pages)
+    assert spans == []
+    assert len(reused) == 10
+
+def test_one_edited_page_among_repeated_blanks(tmp_path, capsys):
+    old = _book(18)
+    new = list(old)
+    new[10] = "page 5, edited"
+    manifest = _manifest(tmp_path, old)
+    capsys.readouterr()
+    reused, spans = manifest.plan(new)
+    assert spans == [(11, 12)]
+    assert len(reused) == 17
+    assert "35 unchanged, 1 changed, 0 added, 0 removed" in capsys.readouterr().out
+
+def test_edits_inside_a_run_of_blank_pages(tmp_path, capsys):
+    old = [f"page {i}" for i in range(8)] + [BLANK] * 20 + ["page 8", "page 9"]
+    new = list(old)
+    new[14] = "figure"
+    new[20] = "table"
+    manifest = _manifest(tmp_path, old)
+    capsys.readouterr()
+    reused, spans = manifest.plan(new)
+    assert spans == [(15, 16), (21, 22)]
+    assert len(reused) == 13
+    assert "28 unchanged, 2 changed, 0 added, 0 removed" in capsys.readouterr().out
+
+def test_edits_far_apart_keep_pages_in_place():
+    old = _book(10)
+    new = list(old)
+    new[2] = "page 1, edited"
+    new[17] = BLANK + " with a footnote"
+    assert match_pages(old, new) == [(k, k) for k in range(20) if k not in (2, 17)]
+
+def test_inserted_page_shifts_later_chunks(tmp_path):
+    old = _book(5)
+    new = old[:4] + ["inserted"] + old[4:]
+    reused, spans = _manifest(tmp_path, old).plan(new)
+    assert spans == [(5, 5)]
+    assert [(c["start_page"], c["end_page"]) for c in reused] == [(1, 2), (3, 4), (6, 7), (8, 9), (10, 11)]
+
+def test_removed_page_redoes_its_chunk(tmp_path):
+    old = _book(5)
+    new = old[:3] + old[4:]
+    reused, spans = _manifest(tmp_path, old).plan(new)
+    assert spans == [(3, 3)]
+    assert [(c["start_page"], c["end_page"]) for c in reused] == [(1, 2), (4, 5), (6, 7), (8, 9)]
+
+def test_recorded_chunks_are_saved_without_empty_results(tmp_path):
+    manifest = PageManifest(str(tmp_path / "doc.qna.json"), settings={"model": "m"})
+    manifest.record_chunk(1, 2, [{"question": "Q?"}])
+    manifest.record_chunk(3, 4, [])
+    manifest.save(["a", "b", "c", "d"], fixes={"k": {"question": "Q."}})
+    with open(manifest.path, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["chunks"] == [{"start_page": 1, "end_page": 2, "result": [{"question": "Q?"}]}]
+    assert data["fixes"] == {"k": {"question": "Q."}}
+    assert not (tmp_path / "doc.qna.json.chunks.tmp").exists()
+
+def test_settings_change_starts_fresh(tmp_path):
+    pages = _book(2)
+    path = _manifest(tmp_path, pages).path
+    reused, spans = PageManifest(path, settings={"model": "other"}).plan(pages)
+    assert reused == []
+    assert spans == [(1, 4)]
+
+def test_document_order_interleaves_reused_and_fresh():
+    reused = [{"start_page": 1, "end_page": 2, "result": "r1"}, {"start_page": 5, "end_page": 6, "result": "r2"}]
+    chunks, results = document_order(reused, [("text", 3, 4)])
+    assert chunks == [("", 1, 2), ("text", 3, 4), ("", 5, 6)]
+    assert results == {0: "r1", 2: "r2"}
@@ -0,0 +1,49 @@
+from common.quiz_schema import coerce_options, normalize_question
+
+def test_aliased_keys_are_mapped_to_the_schema():
+    item, problems = normalize_question({"Question": "What is a cell?", "correct_answer": "The unit of life.", "Type": "Long Answer", "context": "Cells..."})
+    assert problems == []
+    assert item == {"question": "What is a cell?", "answer": "The unit of life.", "type": "Long Answer", "context_snippet": "Cells..."}
+
+def test_notes_source_tag_is_kept():
+    item, problems = normalize_question({"question": "Q?", "answer": "A.", "type": "Long Answer", "source": "notes:2/3"})
+    assert problems == []
+    assert item["source"] == "notes:2/3"
+    assert item["context_snippet"] == ""
+
+def test_source_tag_is_not_used_as_snippet():
+    item, _ = normalize_question({"question": "Q?", "answer": "A.", "context_snippet": "from the text", "source": "notes:1/1"})
+    assert item["context_snippet"] == "from the text"
+    assert item["source"] == "notes:1/1"
+
+def test_unknown_keys_are_kept():
+    item, _ = normalize_question({"question": "Q?", "answer": "A.", "type": "MCQ", "options": ["x", "y"], "difficulty": "easy"})
+    assert item["difficulty"] == "easy"
+
+def test_boolean_answer_becomes_text():
+    item, problems = normalize_question({"question": "The sky is blue.", "answer": True}, default_type="True/False")
+    assert problems == []
+    assert item["answer"] == "True"
+    assert item["type"] == "True/False"
+
+def test_missing_fields_are_reported():
+    item, problems = normalize_question({"question": "", "answer": None})
+    assert "missing question" in problems
+    assert "missing answer" in problems
+    assert "missing type" in problems
+
+def test_mcq_without_options_is_a_problem():
+    _, problems = normalize_question({"question": "Q?", "answer": "A", "type": "MCQ"})
+    assert problems == ["MCQ without options"]
+
+def test_non_object_is_rejected():
+    assert normalize_question("just text") == (None, ["not an object"])
+
+def test_coerce_options_shapes():
+    assert coerce_options(["foo", "bar"]) == ["A. foo", "B. bar"]
+    assert coerce_options({"A": "foo", "B": "bar"}) == ["A. foo", "B. bar"]
+    assert coerce_options([{"label": "A", "text": "foo"}, {"label": "B", "text": "bar"}]) == ["A. foo", "B. bar"]
+    assert coerce_options("A) foo B) bar") == ["A. foo", "B. bar"]
+    assert coerce_options(["A. foo", "B. bar"]) == ["A. foo", "B. bar"]
+    assert coerce_options([]) is None
+    assert coerce_options(None) is None
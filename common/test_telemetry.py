@@ -0,0 +1,15 @@
+from common.telemetry import CallTelemetry
+
+def test_report_without_calls(tmp_path):
+    assert CallTelemetry(str(tmp_path / "calls.ndjson")).report() == "LLM calls: none"
+
+def test_report_sums_complete_and_failed_calls(tmp_path):
+    telemetry = CallTelemetry(str(tmp_path / "calls.ndjson"))
+    telemetry.record("extract", "pages 1-3", "m", 2.0, {"prompt_eval_count": 100, "eval_count": 50, "eval_duration": 1_000_000_000})
+    telemetry.record("questions", "pages 1-3", "m", 1.0, None, status="failed")
+    report = telemetry.report()
+    assert report.startswith("LLM calls: 2 (1 complete, 1 aborted or failed), 3.0s of request time")
+    assert "50 generated at 50.0 tok/s" in report
+    assert "extract: 1 calls" in report
+    with open(telemetry.metrics_path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
@@ -0,0 +1,44 @@
+from common.watchdog import GenerationWatchdog, find_loop
+
+def test_find_loop():
+    assert find_loop(("is a thing " * 20).split()) == (3, 16)
+    assert find_loop("the the the".split()) is None
+    assert find_loop("a perfectly ordinary sentence with no repeats at all in it".split()) is None
+
+def test_repeated_items_are_filtered_and_abort_the_reply():
+    watchdog = GenerationWatchdog("extract")
+    item = {"term": "A", "definition": "x"}
+    assert watchdog.add_item("definitions", item)
+    assert watchdog.add_item("concepts", item)
+    assert not watchdog.add_item("definitions", dict(item))
+    assert not watchdog.add_item("definitions", dict(item))
+    assert watchdog.reason is None
+    assert not watchdog.add_item("definitions", dict(item))
+    assert watchdog.reason == "3 repeated items in a row"
+    assert watchdog.check("x") == watchdog.reason
+
+def test_a_new_item_resets_the_repeat_count():
+    watchdog = GenerationWatchdog("extract")
+    for i in range(5):
+        watchdog.add_item(None, {"n": i})
+        watchdog.add_item(None, {"n": i})
+    assert watchdog.reason is None
+
+def test_token_budget():
+    watchdog = GenerationWatchdog("extract", max_tokens=10)
+    assert all(watchdog.check(" word") is None for _ in range(10))
+    assert watchdog.check(" word") == "over the 10-token budget"
+
+def test_time_budget():
+    watchdog = GenerationWatchdog("supervise", max_seconds=0)
+    assert watchdog.check(" word") == "over the 0s budget"
+
+def test_text_loop_is_caught_while_streaming():
+    watchdog = GenerationWatchdog("questions")
+    reason = None
+    for piece in [" and", " so", " on"] * 40:
+        reason = watchdog.check(piece)
+        if reason:
+            break
+    assert reason == "3-word sequence repeated 16 times"
+    assert watchdog.tokens < 120
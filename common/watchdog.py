@@ -0,0 +1,97 @@
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Wall-clock budget per request and stage, in seconds. A healthy reply takes
+# well under a minute on llama3.1:8b; a repetition loop runs until num_predict.
+STAGE_TIME_LIMITS: Dict[str, float] = {
+    "extract": 120.0,
+    "questions": 120.0,
+    "notes-questions": 120.0,
+    "fused": 180.0,
+    "supervise": 90.0,
+}
+DEFAULT_TIME_LIMIT = 120.0
+
+# A loop is a word n-gram (n <= MAX_LOOP_WORDS) repeated back to back
+# until it covers at least LOOP_WORDS words, or this many repeated items in a row
+MAX_LOOP_WORDS = 40
+LOOP_WORDS = 48
+MIN_LOOP_REPEATS = 4
+ITEM_REPEATS = 3
+CHECK_EVERY = 16  # streamed pieces between text checks
+
+def _item_key(item: Any) -> str:
+    return " ".join(json.dumps(item, ensure_ascii=False, sort_keys=True).lower().split())
+
+def find_loop(words: List[str]) -> Optional[Tuple[int, int]]:
+    """
+    Returns (n, repeats) if the text ends in one n-word sequence repeated
+    back to back, e.g. "... is a thing is a thing is a thing is a thing".
+    """
+    for n in range(1, MAX_LOOP_WORDS + 1):
+        repeats = max(MIN_LOOP_REPEATS, -(-LOOP_WORDS // n))
+        if len(words) < n * repeats:
+            break
+        tail = words[-n:]
+        if all(words[-(k + 1) * n:len(words) - k * n] == tail for k in range(1, repeats)):
+            return n, repeats
+    return None
+
+class GenerationWatchdog:
+    """
+    Watches one streamed reply for degenerate generation: a word n-gram
+    loop in the text, the same item generated over and over, more pieces
+    than the stage's num_predict, or a blown wall-clock budget.
+
+    check() returns an abort reason (or None) after every streamed piece;
+    add_item() filters repeated items so only the unique ones are kept.
+    """
+
+    def __init__(self, stage: str = None, max_tokens: int = None, max_seconds: float = None):
+        self.stage = stage
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds if max_seconds is not None else STAGE_TIME_LIMITS.get(stage, DEFAULT_TIME_LIMIT)
+        self.started = time.perf_counter()
+        self.tokens = 0
+        self.reason: Optional[str] = None
+        self._seen = set()
+        self._repeats_in_row = 0
+        self._text = []
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def add_item(self, key: Optional[str], item: Any) -> bool:
+        """
+        Records a completed item; returns False if it repeats an earlier one.
+        """
+        fingerprint = f"{key}:{_item_key(item)}"
+        if fingerprint in self._seen:
+            self._repeats_in_row += 1
+            if self._repeats_in_row >= ITEM_REPEATS and not self.reason:
+                self.reason = f"{self._repeats_in_row} repeated items in a row"
+            return False
+        self._seen.add(fingerprint)
+        self._repeats_in_row = 0
+        return True
+
+    def check(self, piece: str) -> Optional[str]:
+        # Ollama streams roughly one token per piece
+        self.tokens += 1
+        self._text.append(piece)
+        if self.reason:
+            return self.reason
+
+        if self.max_tokens and self.tokens > self.max_tokens:
+            self.reason = f"over the {self.max_tokens}-token budget"
+        elif self.elapsed > self.max_seconds:
+            self.reason = f"over the {self.max_seconds:.0f}s budget"
+        elif self.tokens % CHECK_EVERY == 0:
+            # Only the recent tail can contain a loop that is still running
+            words = "".join(self._text[-(MAX_LOOP_WORDS * LOOP_WORDS):]).split()
+            loop = find_loop(words[-(MAX_LOOP_WORDS * MIN_LOOP_REPEATS + LOOP_WORDS):])
+            if loop:
+                self.reason = f"{loop[0]}-word sequence repeated {loop[1]} times"
+        return self.reason
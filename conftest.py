@@ -0,0 +1,3 @@
+# Tests import the CheatSheet and QNA modules by bare name, like the entry
+# points do; pytest puts this directory (the repo root) on sys.path so their
+# `common` imports resolve without the entry points' path setup.
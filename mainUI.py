@@ -18,6 +18,9 @@ _repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")
 if _repo_root not in sys.path:
     sys.path.insert(0, _repo_root)
 
+from common.ndjson import NDJSONTail
+from common.quiz_schema import normalize_question
+
 ProductivityTimer = None
 try:
     # preferred: package import (requires __init__.py in Jashn and Jashn/PomodoroTimer)
@@ -36,11 +39,13 @@ except Exception:
 
 class Worker(QThread):
     finished = pyqtSignal(bool, str)
+    records = pyqtSignal(list)  # Partial results read from the NDJSON stream
 
-    def __init__(self, command, work_dir):
+    def __init__(self, command, work_dir, ndjson_path=None):
         super().__init__()
         self.command = command
         self.work_dir = work_dir
+        self.ndjson_path = ndjson_path
 
     def run(self):
         try:
@@ -52,7 +57,20 @@ class Worker(QThread):
                 stderr=subprocess.PIPE,
                 text=True
             )
-            stdout, stderr = process.communicate()
+
+            tail = None
+            if self.ndjson_path:
+                tail = NDJSONTail(os.path.join(self.work_dir, self.ndjson_path))
+
+            while True:
+                try:
+                    # With a timeout we wake up periodically to forward new records;
+                    # retrying communicate() after TimeoutExpired loses no output
+                    stdout, stderr = process.communicate(timeout=0.5 if tail else None)
+                    break
+                except subprocess.TimeoutExpired:
+                    self._emit_new_records(tail)
+            self._emit_new_records(tail)
 
             if process.returncode == 0:
                 self.finished.emit(True, "Success")
@@ -61,7 +79,95 @@ class Worker(QThread):
         except Exception as e:
             self.finished.emit(False, str(e))
 
+    def _emit_new_records(self, tail):
+        if tail is None:
+            return
+        new_records = tail.read_new()
+        if new_records:
+            self.records.emit(new_records)
+
 # ---------- Helpers ----------
+def format_cheat_sheet_markdown(data) -> str:
+    """Renders cheat-sheet JSON (output.json shape) as Markdown."""
+    text = ""
+    if isinstance(data, dict):
+        # Custom formatting for known keys
+        if "definitions" in data and data["definitions"]:
+            text += "# Definitions\n"
+            for item in data["definitions"]:
+                term = item.get("term", "Term")
+                defn = item.get("definition", "")
+                text += f"- **{term}**: {defn}\n"
+            text += "\n"
+
+        if "comparisons" in data and data["comparisons"]:
+            text += "# Comparisons\n"
+            for item in data["comparisons"]:
+                sub_a = item.get("subject_a", "")
+                sub_b = item.get("subject_b", "")
+                diff = item.get("difference_or_similarity", "")
+                text += f"- **{sub_a} vs {sub_b}**: {diff}\n"
+            text += "\n"
+
+        if "timelines" in data and data["timelines"]:
+            text += "# Timelines\n"
+            for item in data["timelines"]:
+                date = item.get("date", "")
+                event = item.get("event", "")
+                text += f"- **{date}**: {event}\n"
+            text += "\n"
+
+        if "concepts" in data and data["concepts"]:
+            text += "# Concepts\n"
+            for item in data["concepts"]:
+                name = item.get("name", "")
+                expl = item.get("explanation", "")
+                text += f"- **{name}**: {expl}\n"
+            text += "\n"
+
+        # Fallback for other keys
+        for k, v in data.items():
+            if k in ["definitions", "comparisons", "timelines", "concepts"]:
+                continue
+            text += f"# {k.replace('_', ' ').title()}\n"
+            if isinstance(v, list):
+                for item in v:
+                    if isinstance(item, dict):
+                        for sub_k, sub_v in item.items():
+                            text += f"- **{sub_k}**: {sub_v}\n"
+                    else:
+                        text += f"- {item}\n"
+            else:
+                text += f"{v}\n"
+            text += "\n"
+    else:
+        text = json.dumps(data, indent=2, ensure_ascii=False)
+    return text
+
+
+def format_quiz_markdown(data) -> str:
+    """Renders a list of quiz questions as Markdown."""
+    text = ""
+    if isinstance(data, list):
+        # Old or hand-edited files may use other key names; non-objects are skipped
+        items = [q for q in (normalize_question(item)[0] for item in data) if q is not None]
+        for i, q in enumerate(items, 1):
+            text += f"**Q{i}: {q['question'] or 'Question'}**\n"
+            for opt in q.get("options", []):
+                text += f"- {opt}\n"
+            if q["answer"]:
+                text += f"*Answer: {q['answer']}*\n"
+
+            context = q.get("context_snippet")
+            if context:
+                text += f"> *Context: {context}*\n"
+
+            text += "\n"
+    else:
+        text = json.dumps(data, indent=2, ensure_ascii=False)
+    return text
+
+
 def base_dir() -> str:
     """Folder where this main.py is located (src/)."""
     return os.path.dirname(os.path.abspath(__file__))
@@ -1306,13 +1412,30 @@ class MainWindow(QMainWindow):
 
         cs_dir = os.path.join(base_dir(), "CheatSheet")
         
-        # Command: python app.py <pdf_path> --output output.json
-        cmd = [sys.executable, "app.py", pdf_path, "--output", "output.json"]
+        # Command: python app.py <pdf_path> --output output.json --ndjson output.ndjson
+        cmd = [sys.executable, "app.py", pdf_path, "--output", "output.json", "--ndjson", "output.ndjson"]
         
-        self.worker = Worker(cmd, cs_dir)
+        self.cs_partial = {"definitions": [], "comparisons": [], "timelines": [], "concepts": []}
+        self.worker = Worker(cmd, cs_dir, ndjson_path="output.ndjson")
+        self.worker.records.connect(self.on_cheat_sheet_records)
         self.worker.finished.connect(self.on_cheat_sheet_finished)
         self.worker.start()
 
+    def on_cheat_sheet_records(self, records):
+        # Items streamed while the pipeline is still running
+        for rec in records:
+            self.cs_partial.setdefault(rec.get("category", "notes"), []).append(rec.get("item"))
+        self.notes_editor.setMarkdown(format_cheat_sheet_markdown(self._sorted_cheat_sheet(self.cs_partial)))
+
+    @staticmethod
+    def _sorted_cheat_sheet(data):
+        # Same ordering as CheatSheet/merger.py so partial and final views match
+        data = {k: list(v) for k, v in data.items()}
+        data["definitions"].sort(key=lambda x: x.get("term", ""))
+        data["timelines"].sort(key=lambda x: x.get("date", ""))
+        data["concepts"].sort(key=lambda x: x.get("name", ""))
+        return data
+
     def on_cheat_sheet_finished(self, success, message):
         self.gen_btn.setText("✨ GENERATE")
         self.gen_btn.setEnabled(True)
@@ -1330,62 +1453,15 @@ class MainWindow(QMainWindow):
              return
              
         try:
-            with open(output_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            text = ""
-            if isinstance(data, dict):
-                # Custom formatting for known keys
-                if "definitions" in data and data["definitions"]:
-                    text += "# Definitions\n"
-                    for item in data["definitions"]:
-                        term = item.get("term", "Term")
-                        defn = item.get("definition", "")
-                        text += f"- **{term}**: {defn}\n"
-                    text += "\n"
-
-                if "comparisons" in data and data["comparisons"]:
-                    text += "# Comparisons\n"
-                    for item in data["comparisons"]:
-                        sub_a = item.get("subject_a", "")
-                        sub_b = item.get("subject_b", "")
-                        diff = item.get("difference_or_similarity", "")
-                        text += f"- **{sub_a} vs {sub_b}**: {diff}\n"
-                    text += "\n"
-
-                if "timelines" in data and data["timelines"]:
-                    text += "# Timelines\n"
-                    for item in data["timelines"]:
-                        date = item.get("date", "")
-                        event = item.get("event", "")
-                        text += f"- **{date}**: {event}\n"
-                    text += "\n"
-
-                if "concepts" in data and data["concepts"]:
-                    text += "# Concepts\n"
-                    for item in data["concepts"]:
-                        name = item.get("name", "")
-                        expl = item.get("explanation", "")
-                        text += f"- **{name}**: {expl}\n"
-                    text += "\n"
-
-                # Fallback for other keys
-                for k, v in data.items():
-                    if k in ["definitions", "comparisons", "timelines", "concepts"]:
-                        continue
-                    text += f"# {k.replace('_', ' ').title()}\n"
-                    if isinstance(v, list):
-                        for item in v:
-                            if isinstance(item, dict):
-                                for sub_k, sub_v in item.items():
-                                    text += f"- **{sub_k}**: {sub_v}\n"
-                            else:
-                                text += f"- {item}\n"
-                    else:
-                        text += f"{v}\n"
-                    text += "\n"
+            if any(self.cs_partial.values()):
+                # Everything already arrived through the NDJSON stream; no need
+                # to parse the whole output file on the UI thread
+                data = self._sorted_cheat_sheet(self.cs_partial)
             else:
-                text = json.dumps(data, indent=2, ensure_ascii=False)
+                with open(output_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            
+            text = format_cheat_sheet_markdown(data)
                 
             self.notes_editor.setMarkdown(text)
             self.save_note_to_history()
@@ -1416,12 +1492,21 @@ class MainWindow(QMainWindow):
         self.quiz_area.setPlainText("Generating Quiz... Please wait.")
 
         qna_dir = os.path.join(base_dir(), "QNA")
-        cmd = [sys.executable, "main.py", "--pdf", pdf_path, "--type", q_type, "--limit", str(limit)]
+        cmd = [sys.executable, "main.py", "--pdf", pdf_path, "--type", q_type, "--limit", str(limit), "--ndjson", "final_questions.ndjson"]
         
-        self.worker_q = Worker(cmd, qna_dir)
+        self.quiz_partial = {}
+        self.worker_q = Worker(cmd, qna_dir, ndjson_path="final_questions.ndjson")
+        self.worker_q.records.connect(self.on_quiz_records)
         self.worker_q.finished.connect(self.on_quiz_finished)
         self.worker_q.start()
 
+    def on_quiz_records(self, records):
+        # Questions streamed while the pipeline is still running, keyed by position
+        for rec in records:
+            if rec.get("item") is not None:
+                self.quiz_partial[rec.get("index", len(self.quiz_partial))] = rec["item"]
+        self.quiz_area.setMarkdown(format_quiz_markdown([self.quiz_partial[i] for i in sorted(self.quiz_partial)]))
+
     def on_quiz_finished(self, success, message):
         if hasattr(self, "quiz_gen_btn"):
             self.quiz_gen_btn.setText("🚀 GENERATE QUIZ")
@@ -1440,31 +1525,14 @@ class MainWindow(QMainWindow):
              return
 
         try:
-            with open(output_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                
-            text = ""
-            if isinstance(data, list):
-                for i, q in enumerate(data, 1):
-                    # Robust key extraction
-                    question = q.get("question") or q.get("Question") or q.get("q") or "Question"
-                    answer = q.get("answer") or q.get("Answer") or q.get("a") or ""
-                    options = q.get("options")
-                    
-                    text += f"**Q{i}: {question}**\n"
-                    if options and isinstance(options, list):
-                        for opt in options:
-                             text += f"- {opt}\n"
-                    if answer:
-                        text += f"*Answer: {answer}*\n"
-                    
-                    context = q.get("context_snippet")
-                    if context:
-                        text += f"> *Context: {context}*\n"
-                    
-                    text += "\n"
+            if self.quiz_partial:
+                # Everything already arrived through the NDJSON stream
+                data = [self.quiz_partial[i] for i in sorted(self.quiz_partial)]
             else:
-                text = json.dumps(data, indent=2, ensure_ascii=False)
+                with open(output_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                
+            text = format_quiz_markdown(data)
                 
             self.quiz_area.setMarkdown(text)
 
@@ -0,0 +1,477 @@
+import os
+import re
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Offline stand-in for the parts of the Ollama HTTP API the pipelines use
+# (/api/chat, streamed or not, and the /api/generate model loads), so
+# CheatSheet/app.py, QNA/main.py and pipeline.py can be benchmarked and
+# regression-tested without a GPU or a real model:
+#
+#   python ollama_stub.py --mode synth --latency 0.5 --jitter 0.2 --error-rate 0.05
+#   OLLAMA_HOST=127.0.0.1:11435 python CheatSheet/app.py notes.pdf --no-cache
+#
+# Modes:
+#   synth   answer every chat request with schema-valid JSON built from the prompt
+#   replay  answer from responses recorded earlier, keyed by request hash
+#   record  forward to a real Ollama server and store every reply for replay
+#
+# Run the pipelines with --no-cache, otherwise the LLM response cache answers
+# repeated requests before they ever reach the stand-in.
+_repo_root = os.path.dirname(os.path.abspath(__file__))
+
+from common.llm_cache import cache_key
+
+DEFAULT_PORT = 11435
+DEFAULT_STORE = os.path.join(_repo_root, ".cache", "ollama_replay")
+DEFAULT_UPSTREAM = "http://127.0.0.1:11434"
+
+CATEGORIES = ["definitions", "comparisons", "timelines", "concepts"]
+
+def request_key(body):
+    """
+    Same content hash as the LLM response cache: model, messages, format and options.
+    """
+    return cache_key(body.get("model", ""), body.get("messages", []), body.get("format"), body.get("options") or None)
+
+class ReplayStore:
+    """
+    One JSON file per recorded request: {"request": ..., "content": ..., "stats": ...}.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._file(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, record):
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            tmp = self._file(key) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(record, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self._file(key))
+
+    def __len__(self):
+        if not os.path.isdir(self.path):
+            return 0
+        return sum(1 for name in os.listdir(self.path) if name.endswith(".json"))
+
+def _sentences(text):
+    # Prompt scaffolding (schemas, rules) is skipped; source sentences are kept
+    lines = [line for line in text.splitlines() if '"' not in line and "{" not in line]
+    parts = re.split(r"(?<=[.!?])\s+", " ".join(" ".join(lines).split()))
+    return [p for p in parts if len(p.split()) >= 5]
+
+def _words(sentence, n):
+    return " ".join(re.sub(r"[^\w\s-]", "", sentence).split()[:n]) or "Topic"
+
+def _question(sentence, question_type, char_limit, rng):
+    answer = sentence[:char_limit]
+    item = {
+        "question": f"What does the text say about {_words(sentence, 4)}?",
+        "answer": answer,
+        "type": question_type,
+        "context_snippet": sentence[:80],
+    }
+    if question_type == "MCQ":
+        distractors = [f"Not stated in the text ({i})" for i in range(1, 4)]
+        options = [answer[:80]] + distractors
+        rng.shuffle(options)
+        item["options"] = [f"{'ABCD'[i]}. {option}" for i, option in enumerate(options)]
+        item["answer"] = item["options"][options.index(answer[:80])]
+    elif question_type == "True/False":
+        item["question"] = f"True or false: {sentence}"
+        item["answer"] = "True"
+    return item
+
+def _knowledge(sentences, rng):
+    result = {category: [] for category in CATEGORIES}
+    for i, sentence in enumerate(sentences):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        if category == "definitions":
+            result[category].append({"term": _words(sentence, 3), "definition": sentence})
+        elif category == "comparisons":
+            words = _words(sentence, 2).split() + ["Topic"]
+            result[category].append({"subject_a": words[0], "subject_b": words[1], "difference_or_similarity": sentence})
+        elif category == "timelines":
+            result[category].append({"date": str(rng.randint(1800, 2024)), "event": sentence})
+        else:
+            result[category].append({"name": _words(sentence, 3), "explanation": sentence})
+    return result
+
+def synthesize(body, rng, items):
+    """
+    A reply in the shape the prompt asks for: supervision requests get their
+    JSON payload echoed back, extraction prompts the four knowledge
+    categories, question prompts a list of questions, fused prompts both.
+    """
+    messages = body.get("messages", [])
+    system = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    user = "\n".join(m.get("content", "") for m in messages if m.get("role") != "system")
+    prompt = system + "\n" + user
+
+    sentences = _sentences(user) or [f"Stub sentence number {i + 1} for offline runs." for i in range(items)]
+    start = rng.randrange(len(sentences))
+    picked = [sentences[(start + i) % len(sentences)] for i in range(min(items, len(sentences)))]
+
+    if body.get("format") != "json":
+        return " ".join(picked)
+
+    # Supervision: "Fix ... this JSON list ...:\n\n[...]" comes back unchanged
+    payload = user.rsplit("\n\n", 1)[-1].strip()
+    if payload and payload[0] in "[{":
+        try:
+            return json.dumps(json.loads(payload), ensure_ascii=False)
+        except ValueError:
+            pass
+
+    type_match = re.search(r"""type['"]? (?:field must be|\(always) ['"]([^'"]+)['"]""", prompt)
+    question_type = type_match.group(1) if type_match else "Long Answer"
+    limit_match = re.search(r"approximately \{?(\d+)\}? characters", prompt)
+    char_limit = int(limit_match.group(1)) if limit_match else 200
+
+    if '"definitions"' in prompt:
+        result = _knowledge(picked, rng)
+        if '"questions"' in prompt:
+            result["questions"] = [_question(s, question_type, char_limit, rng) for s in picked]
+        return json.dumps(result, ensure_ascii=False)
+    if '"question"' in prompt:
+        return json.dumps([_question(s, question_type, char_limit, rng) for s in picked], ensure_ascii=False)
+    return "{}"
+
+def split_tokens(content):
+    """
+    Roughly one Ollama token per streamed piece: a word with its leading space, or punctuation.
+    """
+    return re.findall(r"\s*[\w']+|\s*[^\w\s]|\s+", content) or [content]
+
+class StubState:
+    def __init__(self, args):
+        self.args = args
+        self.store = ReplayStore(args.store)
+        self.attempts = {}
+        self.counts = {"requests": 0, "errors": 0, "misses": 0}
+        # Like OLLAMA_NUM_PARALLEL: requests beyond this many wait for a slot
+        self.slots = threading.Semaphore(args.parallel) if args.parallel else None
+        self._lock = threading.Lock()
+
+    def rng_for(self, key):
+        # Seeded per request and attempt, so a run is reproducible regardless
+        # of the order concurrent requests arrive in, and retries can succeed
+        with self._lock:
+            attempt = self.attempts.get(key, 0)
+            self.attempts[key] = attempt + 1
+            self.counts["requests"] += 1
+        return random.Random(f"{self.args.seed}:{key}:{attempt}")
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: StubState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _log(self, message):
+        if not self.state.args.quiet:
+            print(message, flush=True)
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        try:
+            return json.loads(raw or b"{}")
+        except ValueError:
+            return None
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "":
+            data = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif self.path == "/api/version":
+            self._send_json(200, {"version": "0.0.0-stub"})
+        elif self.path in ("/api/tags", "/api/ps"):
+            self._send_json(200, {"models": []})
+        else:
+            self._send_json(404, {"error": f"{self.path} is not supported by the stand-in"})
+
+    def do_POST(self):
+        body = self._read_body()
+        if body is None:
+            self._send_json(400, {"error": "invalid JSON body"})
+        elif self.path == "/api/chat":
+            self._chat(body)
+        elif self.path == "/api/generate":
+            self._generate(body)
+        else:
+            self._send_json(404, {"error": f"{self.path} is not supported by the stand-in"})
+
+    def _generate(self, body):
+        # The pipelines only call /api/generate with an empty prompt to load or
+        # unload the model; in record mode that goes to the real server
+        if self.state.args.mode == "record":
+            self._proxy(body, "/api/generate")
+            return
+        self._send_json(200, {
+            "model": body.get("model", ""),
+            "created_at": _now(),
+            "response": "",
+            "done": True,
+            "done_reason": "load",
+        })
+
+    def _chat(self, body):
+        args = self.state.args
+        key = request_key(body)
+        rng = self.state.rng_for(key)
+        started = time.perf_counter()
+
+        if args.mode == "record":
+            content = self._record(body, key)
+            self._log(f"[record] {key[:12]} {body.get('model', '')} -> {len(content or '')} chars "
+                      f"in {time.perf_counter() - started:.2f}s")
+            return
+
+        if rng.random() < args.error_rate:
+            self.state.count("errors")
+            time.sleep(max(0.0, rng.uniform(0, args.latency)))
+            self._send_json(500, {"error": "injected failure (ollama_stub --error-rate)"})
+            self._log(f"[{args.mode}] {key[:12]} -> injected error")
+            return
+
+        source = args.mode
+        record = self.state.store.get(key) if args.mode == "replay" else None
+        if record is not None:
+            content = record["content"]
+        elif args.mode == "replay" and not args.fallback_synth:
+            self.state.count("misses")
+            self._send_json(404, {"error": f"no recorded response for request {key}"})
+            self._log(f"[replay] {key[:12]} -> miss")
+            return
+        else:
+            if args.mode == "replay":
+                self.state.count("misses")
+                source = "replay miss, synth"
+            content = synthesize(body, rng, args.items)
+
+        if self.state.slots:
+            self.state.slots.acquire()
+        try:
+            # Time to first token, then a steady generation rate
+            served = time.perf_counter()
+            time.sleep(max(0.0, args.latency + rng.uniform(-args.jitter, args.jitter)))
+            tokens = split_tokens(content)
+            times = (started, served, time.perf_counter())
+            if body.get("stream", True):
+                self._stream_content(body, tokens, rng, times)
+            else:
+                if args.tokens_per_second:
+                    time.sleep(len(tokens) / args.tokens_per_second)
+                self._send_json(200, _final_message(body, content, len(tokens), times))
+        finally:
+            if self.state.slots:
+                self.state.slots.release()
+        self._log(f"[{source}] {key[:12]} {body.get('model', '')} -> {len(tokens)} tokens "
+                  f"in {time.perf_counter() - started:.2f}s")
+
+    def _stream_content(self, body, tokens, rng, times):
+        args = self.state.args
+        # A cut-off stream ends mid-reply without the final done message
+        cut_at = int(len(tokens) * rng.uniform(0.2, 0.8)) if rng.random() < args.cut_rate else None
+        self._start_stream()
+        try:
+            for i, token in enumerate(tokens):
+                if cut_at is not None and i == cut_at:
+                    self.state.count("errors")
+                    self._end_stream()
+                    return
+                if args.tokens_per_second:
+                    time.sleep(1.0 / args.tokens_per_second)
+                self._write_chunk(_line({
+                    "model": body.get("model", ""),
+                    "created_at": _now(),
+                    "message": {"role": "assistant", "content": token},
+                    "done": False,
+                }))
+            final = _final_message(body, "", len(tokens), times)
+            self._write_chunk(_line(final))
+            self._end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client aborted the request (e.g. the generation watchdog)
+            pass
+
+    def _record(self, body, key):
+        """
+        Forwards one chat request to the real server and stores its reply.
+        """
+        url = self.state.args.upstream.rstrip("/") + "/api/chat"
+        request = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"})
+        try:
+            upstream = urllib.request.urlopen(request)
+        except urllib.error.HTTPError as e:
+            self._send_json(e.code, {"error": e.read().decode("utf-8", "replace")})
+            return None
+        except OSError as e:
+            self._send_json(502, {"error": f"upstream {url} unreachable: {e}"})
+            return None
+
+        pieces = []
+        final = {}
+        with upstream:
+            if body.get("stream", True):
+                self._start_stream()
+                for line in upstream:
+                    if not line.strip():
+                        continue
+                    self._write_chunk(line if line.endswith(b"\n") else line + b"\n")
+                    part = json.loads(line)
+                    pieces.append(part.get("message", {}).get("content", ""))
+                    if part.get("done"):
+                        final = part
+                self._end_stream()
+            else:
+                raw = upstream.read()
+                final = json.loads(raw)
+                pieces.append(final.get("message", {}).get("content", ""))
+                self._send_json(200, final)
+
+        content = "".join(pieces)
+        if final.get("done"):
+            stats = {k: v for k, v in final.items() if k.endswith("_count") or k.endswith("_duration")}
+            self.state.store.put(key, {
+                "request": {k: body.get(k) for k in ("model", "messages", "format", "options")},
+                "content": content,
+                "stats": stats,
+            })
+        return content
+
+    def _proxy(self, body, path):
+        url = self.state.args.upstream.rstrip("/") + path
+        body = dict(body, stream=False)
+        request = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request) as upstream:
+                self._send_json(upstream.status, json.loads(upstream.read()))
+        except urllib.error.HTTPError as e:
+            self._send_json(e.code, {"error": e.read().decode("utf-8", "replace")})
+        except OSError as e:
+            self._send_json(502, {"error": f"upstream {url} unreachable: {e}"})
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+def _line(payload):
+    return (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+
+def _final_message(body, content, eval_count, times):
+    """
+    The closing message of a reply, with Ollama's timing fields in nanoseconds.
+    `times` are when the request arrived, got a slot and finished its prompt;
+    as with Ollama, the wait for a slot is only part of total_duration.
+    """
+    started, served, prompt_done = times
+    now = time.perf_counter()
+    prompt = sum(len(m.get("content", "")) for m in body.get("messages", []))
+    return {
+        "model": body.get("model", ""),
+        "created_at": _now(),
+        "message": {"role": "assistant", "content": content},
+        "done": True,
+        "done_reason": "stop",
+        "total_duration": int((now - started) * 1e9),
+        "load_duration": 0,
+        "prompt_eval_count": max(1, prompt // 4),
+        "prompt_eval_duration": int((prompt_done - served) * 1e9),
+        "eval_count": eval_count,
+        "eval_duration": int((now - prompt_done) * 1e9),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Ollama stand-in for benchmarking the pipelines without a model")
+    parser.add_argument("--mode", choices=["synth", "replay", "record"], default="synth", help="How chat requests are answered")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on (point OLLAMA_HOST here)")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="Directory of recorded responses (replay/record)")
+    parser.add_argument("--upstream", default=DEFAULT_UPSTREAM, help="Real Ollama server to record from")
+    parser.add_argument("--fallback-synth", action="store_true", help="In replay mode, synthesize a reply for unrecorded requests instead of failing")
+    parser.add_argument("--items", type=int, default=4, help="Items per synthesized reply")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first token of every reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds added to --latency")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation speed of streamed replies (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of chat requests that fail with HTTP 500")
+    parser.add_argument("--parallel", type=int, default=0, help="Requests served at once, the rest queue like OLLAMA_NUM_PARALLEL (0 = no limit)")
+    parser.add_argument("--cut-rate", type=float, default=0.0, help="Fraction of streamed replies that stop partway through")
+    parser.add_argument("--seed", default="0", help="Seed for synthesized content and injected faults")
+    parser.add_argument("--quiet", "-q", action="store_true", help="Do not log every request")
+    args = parser.parse_args()
+
+    StubHandler.state = StubState(args)
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+
+    print(f"Ollama stand-in ({args.mode}) listening on http://{args.host}:{args.port}")
+    if args.mode in ("replay", "record"):
+        print(f"Replay store: {args.store} ({len(StubHandler.state.store)} recorded responses)")
+    print(f"Run the pipelines with OLLAMA_HOST={args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        counts = StubHandler.state.counts
+        print(f"\n{counts['requests']} chat requests, {counts['errors']} injected faults, {counts['misses']} replay misses")
+
+if __name__ == "__main__":
+    main()
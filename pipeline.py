@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+import importlib.util
+from tqdm import tqdm
+
+# Combined cheat-sheet + quiz pipeline: the PDF is read and chunked once, and
+# both extraction and question generation run over the same chunk stream.
+_repo_root = os.path.dirname(os.path.abspath(__file__))
+_cheatsheet_dir = os.path.join(_repo_root, "CheatSheet")
+_qna_dir = os.path.join(_repo_root, "QNA")
+if _cheatsheet_dir not in sys.path:
+    sys.path.append(_cheatsheet_dir)
+
+from common.llm_cache import configure_cache, cached_achat
+from common.ollama_client import get_async_client, request_limiter, warm_model, release_model, set_streaming, set_adaptive, concurrency_report
+from common.json_repair import repair_stats
+from common.telemetry import call_telemetry
+from common.prescreen import DEFAULT_THRESHOLD
+from common.dedupe import dedupe_questions, QUESTION_DEDUPE_THRESHOLD
+from pdf_processor import extract_context_chunks
+from extractor import SYSTEM_PROMPT, CONTEXT_PREFIX, build_messages, empty_result
+from merger import KnowledgeAccumulator
+from engine import InOrderEmitter
+from supervisor import supervise_cheatsheet
+
+def _load_qna_module(name: str):
+    """
+    QNA and CheatSheet both have a supervisor.py, so QNA modules are loaded by path.
+    """
+    spec = importlib.util.spec_from_file_location(f"qna_{name}", os.path.join(_qna_dir, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+qna_llm_client = _load_qna_module("llm_client")
+qna_supervisor = _load_qna_module("supervisor")
+
+CATEGORIES = ["definitions", "comparisons", "timelines", "concepts"]
+
+FUSED_QUESTIONS_RULES = """
+5. "questions": A list of {question_type} quiz questions covering every fact in the text, as objects with
+   "question", "answer" (approximately {char_limit} characters long), "type" (always "{question_type}")
+   and "context_snippet" (a short quote from the text that supports the answer).
+
+Return a single JSON object with exactly these five keys.
+"""
+
+def build_fused_messages(text_chunk: str, question_type: str, char_limit: int, context: str = None):
+    """
+    One request per chunk that returns both the knowledge categories and quiz questions.
+    """
+    prefix = CONTEXT_PREFIX.format(context=context) if context else ""
+    system = SYSTEM_PROMPT + FUSED_QUESTIONS_RULES.format(question_type=question_type, char_limit=char_limit)
+    return [
+        {'role': 'system', 'content': system},
+        {'role': 'user', 'content': f"{prefix}Analyze this text, extract knowledge and generate questions:\n\n{text_chunk}"}
+    ]
+
+async def _process_chunk(client, limiter, model, chunk, question_type, char_limit, fused):
+    """
+    Runs one chunk's LLM requests, each holding its own `limiter` slot.
+    """
+    text, start, end = chunk[:3]
+    context = chunk[3] if len(chunk) > 3 else None
+    label = f"pages {start}-{end}"
+
+    if fused:
+        try:
+            async with limiter:
+                content = await cached_achat(client, model, build_fused_messages(text, question_type, char_limit, context), format='json', stage="fused", label=label)
+            data = json.loads(content)
+            knowledge = {k: data.get(k, []) for k in CATEGORIES}
+            questions = data.get("questions", [])
+            return knowledge, questions if isinstance(questions, list) else []
+        except Exception as e:
+            print(f"Error processing pages {start}-{end}: {e}")
+            return empty_result(), []
+
+    async def extract():
+        try:
+            async with limiter:
+                content = await cached_achat(client, model, build_messages(text, context), format='json', stage="extract", label=label)
+            return json.loads(content)
+        except Exception as e:
+            print(f"Error extracting knowledge (pages {start}-{end}): {e}")
+            return empty_result()
+
+    async def questions():
+        async with limiter:
+            return await qna_llm_client.generate_questions_async(text, question_type, char_limit, model=model, client=client, label=label)
+
+    # Both requests for a chunk go out together
+    return await asyncio.gather(extract(), questions())
+
+async def _run_chunks(chunks, model, question_type, char_limit, concurrency, fused):
+    client = get_async_client()
+    limiter = request_limiter(concurrency)
+    accumulator = KnowledgeAccumulator()
+    questions_by_chunk = [None] * len(chunks)
+    # Feed the accumulator in chunk order so the merge is deterministic
+    emitter = InOrderEmitter(lambda index, knowledge: accumulator.add(knowledge))
+
+    with tqdm(total=len(chunks), unit="chunk") as pbar:
+        async def worker(index):
+            knowledge, questions = await _process_chunk(client, limiter, model, chunks[index], question_type, char_limit, fused)
+            questions_by_chunk[index] = questions
+            emitter.push(index, knowledge)
+            pbar.update(1)
+
+        await asyncio.gather(*(worker(i) for i in range(len(chunks))))
+
+    chunk_questions = [q for questions in questions_by_chunk for q in questions]
+    return accumulator.snapshot(), chunk_questions
+
+def _save(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Cheat sheet and quiz from a single pass over a PDF")
+    parser.add_argument("pdf_path", help="Path to the source PDF file")
+    parser.add_argument("--notes-output", default=os.path.join(_cheatsheet_dir, "output.json"), help="Where to save the cheat sheet JSON")
+    parser.add_argument("--quiz-output", default=os.path.join(_qna_dir, "final_questions.json"), help="Where to save the quiz JSON")
+    parser.add_argument("--type", default="Long Answer", help="Question type (MCQ, True/False, Long Answer)")
+    parser.add_argument("--limit", type=int, default=200, help="Character limit for answers")
+    parser.add_argument("--model", "-m", default="llama3.1:8b", help="Ollama model to use")
+    parser.add_argument("--concurrency", "-c", type=int, default=6, help="Upper bound on LLM requests in flight; the adaptive limit settles below it")
+    parser.add_argument("--fixed-concurrency", action="store_true", help="Always keep --concurrency requests in flight instead of adapting to observed latency")
+    parser.add_argument("--fused", action="store_true", help="Use one combined prompt per chunk that returns notes and questions together")
+    parser.add_argument("--chunk-tokens", type=int, default=1500, help="Pack whole pages into chunks of about this many tokens")
+    parser.add_argument("--context-tokens", type=int, default=150, help="Tokens of the previous chunk sent as read-only context")
+    parser.add_argument("--dedupe-threshold", type=float, default=QUESTION_DEDUPE_THRESHOLD, help="Similarity above which questions are treated as duplicates (0 = keep all)")
+    parser.add_argument("--prescreen-threshold", type=float, default=DEFAULT_THRESHOLD, help="Only send items scoring at least this on the local repair check to the supervisors (0 = send all)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk LLM response cache")
+    parser.add_argument("--clear-cache", action="store_true", help="Clear the LLM response cache before running")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for complete replies instead of streaming them item by item")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.pdf_path):
+        print(f"Error: File not found: {args.pdf_path}")
+        sys.exit(1)
+
+    cache = configure_cache(enabled=not args.no_cache, clear=args.clear_cache)
+    set_streaming(not args.no_stream)
+    set_adaptive(not args.fixed_concurrency)
+    concurrency = max(1, args.concurrency)
+    warm_model(args.model)
+
+    print(f"Processing {args.pdf_path}...")
+    print(f"Using model: {args.model} ({'fused prompt' if args.fused else 'separate prompts'})")
+
+    # 1. Read and chunk the PDF once
+    print("Reading PDF and creating chunks...")
+    chunks = list(extract_context_chunks(args.pdf_path, token_budget=args.chunk_tokens, context_tokens=args.context_tokens))
+    print(f"Total chunks created: {len(chunks)}")
+
+    # 2. Knowledge extraction and question generation over the same chunks
+    print("Extracting knowledge and generating questions...")
+    merged_knowledge, chunk_questions = asyncio.run(
+        _run_chunks(chunks, args.model, args.type, args.limit, concurrency, args.fused)
+    )
+
+    # 3. Cheat sheet supervision and save
+    print("Applying AI Supervision to notes...")
+    final_knowledge = supervise_cheatsheet(merged_knowledge, model=args.model, concurrency=concurrency, threshold=args.prescreen_threshold)
+    _save(args.notes_output, final_knowledge)
+    print(f"Cheat sheet saved to {args.notes_output}")
+
+    # 4. Questions from the fresh notes, dedupe, supervision and save
+    note_questions = qna_llm_client.generate_questions_from_notes(final_knowledge, args.type, args.limit, model=args.model, concurrency=concurrency)
+    print(f"  + Generated {len(note_questions)} questions from notes.")
+    all_questions = chunk_questions + note_questions
+    if args.dedupe_threshold:
+        before = len(all_questions)
+        all_questions = dedupe_questions(all_questions, args.dedupe_threshold)
+        print(f"Removed {before - len(all_questions)} duplicate questions ({len(all_questions)} remaining).")
+
+    print("Applying AI Supervision to quiz...")
+    final_questions = qna_supervisor.supervise_quiz(all_questions, model=args.model, threshold=args.prescreen_threshold, char_limit=args.limit, question_type=args.type)
+    _save(args.quiz_output, final_questions)
+    print(f"Quiz with {len(final_questions)} questions saved to {args.quiz_output}")
+
+    release_model(args.model)
+    print(cache.report())
+    print(repair_stats.report())
+    print(call_telemetry.report())
+    if concurrency_report():
+        print(concurrency_report())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import os
+import sys
+import json
+import random
+import asyncio
+import argparse
+import threading
+import importlib.util
+import weakref
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import ollama_stub
+import common.llm_cache as llm_cache
+import common.ollama_client as ollama_client
+from common.quiz_schema import normalize_question
+from common.telemetry import CallTelemetry
+
+_repo_root = os.path.dirname(os.path.abspath(__file__))
+_cheatsheet_dir = os.path.join(_repo_root, "CheatSheet")
+
+MODEL = "llama3.1:8b"
+TEXT = (
+    "Photosynthesis is the process by which green plants turn light into chemical energy. "
+    "The Treaty of Versailles was signed in 1919 and formally ended the First World War. "
+    "Mitochondria produce most of the chemical energy that powers the cell. "
+    "Supervised learning trains a model on examples that come with labels."
+)
+CATEGORY_FIELDS = {
+    "definitions": ["term", "definition"],
+    "comparisons": ["subject_a", "subject_b", "difference_or_similarity"],
+    "timelines": ["date", "event"],
+    "concepts": ["name", "explanation"],
+}
+
+@pytest.fixture(scope="module")
+def pipeline():
+    # pipeline.py imports the CheatSheet modules by bare name; QNA has modules
+    # with the same names, so those are set aside while it loads
+    names = ["supervisor", "engine", "extractor", "merger", "pdf_processor", "journal"]
+    saved = {name: sys.modules.pop(name) for name in names if name in sys.modules}
+    sys.path.insert(0, _cheatsheet_dir)
+    try:
+        spec = importlib.util.spec_from_file_location("stub_test_pipeline", os.path.join(_repo_root, "pipeline.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(_cheatsheet_dir)
+        for name in names:
+            sys.modules.pop(name, None)
+        sys.modules.update(saved)
+    return module
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    """
+    The stand-in serving on a free port, with the pipelines' clients pointed
+    at it. Yields the keys the stub and the client computed for each chat request.
+    """
+    args = argparse.Namespace(
+        mode="synth", store=str(tmp_path / "replay"), upstream="", fallback_synth=False, items=4,
+        latency=0.0, jitter=0.0, tokens_per_second=0.0, error_rate=0.0, parallel=0, cut_rate=0.0,
+        seed="0", quiet=True
+    )
+    monkeypatch.setattr(ollama_stub.StubHandler, "state", ollama_stub.StubState(args))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ollama_stub.StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    stub_keys, client_keys = [], []
+    request_key, cache_key = ollama_stub.request_key, llm_cache.cache_key
+    monkeypatch.setattr(ollama_stub, "request_key", lambda body: stub_keys.append(request_key(body)) or stub_keys[-1])
+    monkeypatch.setattr(llm_cache, "cache_key", lambda *a: client_keys.append(cache_key(*a)) or client_keys[-1])
+
+    monkeypatch.setenv("OLLAMA_HOST", f"127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(ollama_client, "_client", None)
+    monkeypatch.setattr(ollama_client, "_async_clients", weakref.WeakKeyDictionary())
+    monkeypatch.setattr(ollama_client, "_adaptive", False)
+    monkeypatch.setattr(ollama_client, "_limiter", None)
+    monkeypatch.setattr(ollama_client, "call_telemetry", CallTelemetry(str(tmp_path / "calls.ndjson")))
+    monkeypatch.setattr(llm_cache, "_cache", llm_cache.ResponseCache(enabled=False))
+    try:
+        yield stub_keys, client_keys
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def _assert_knowledge(knowledge):
+    assert set(knowledge) == set(CATEGORY_FIELDS)
+    assert any(knowledge.values())
+    for category, items in knowledge.items():
+        for item in items:
+            assert all(isinstance(item.get(field), str) and item[field] for field in CATEGORY_FIELDS[category])
+
+def _assert_questions(questions, question_type, char_limit):
+    assert questions
+    for question in questions:
+        normalized, problems = normalize_question(question)
+        assert problems == []
+        assert normalized["type"] == question_type
+        if question_type == "Long Answer":
+            assert len(normalized["answer"]) <= char_limit
+        if question_type == "True/False":
+            assert normalized["answer"] in ("True", "False")
+
+@pytest.mark.parametrize("question_type", ["Long Answer", "MCQ", "True/False"])
+def test_extract_and_questions_prompts(pipeline, stub, question_type):
+    chunk = (TEXT, 1, 2)
+    knowledge, questions = asyncio.run(
+        pipeline._process_chunk(None, asyncio.Semaphore(2), MODEL, chunk, question_type, 90, fused=False)
+    )
+    _assert_knowledge(knowledge)
+    _assert_questions(questions, question_type, 90)
+
+@pytest.mark.parametrize("question_type", ["Long Answer", "MCQ"])
+def test_fused_prompt(pipeline, stub, question_type):
+    chunk = (TEXT, 1, 2, "Previous chunk context that is only read.")
+    knowledge, questions = asyncio.run(
+        pipeline._process_chunk(None, asyncio.Semaphore(2), MODEL, chunk, question_type, 120, fused=True)
+    )
+    _assert_knowledge(knowledge)
+    _assert_questions(questions, question_type, 120)
+
+def test_notes_questions_prompt(pipeline, stub):
+    notes = {"definitions": [{"term": "Photosynthesis", "definition": "How green plants turn light into chemical energy."}]}
+    questions = pipeline.qna_llm_client.generate_questions_from_notes(notes, "True/False", 100, model=MODEL, concurrency=2)
+    _assert_questions(questions, "True/False", 100)
+
+def test_supervise_prompts_echo_the_batch(pipeline, stub):
+    knowledge = {
+        "definitions": [{"term": "Photosynthesis", "definition": "How green plants turn light into chemical energy."}],
+        "comparisons": [],
+        "timelines": [{"date": "1919", "event": "The Treaty of Versailles was signed."}],
+        "concepts": [],
+    }
+    assert pipeline.supervise_cheatsheet(knowledge, model=MODEL, concurrency=2, threshold=0) == knowledge
+
+    questions = [{"question": "What do mitochondria do?", "answer": "They produce most of the cell's energy.", "type": "Long Answer", "context_snippet": "Mitochondria produce"}]
+    assert pipeline.qna_supervisor.supervise_quiz(questions, model=MODEL, threshold=0, char_limit=200) == questions
+
+def test_request_key_matches_the_client_cache_key(pipeline, stub):
+    stub_keys, client_keys = stub
+    asyncio.run(pipeline._process_chunk(None, asyncio.Semaphore(2), MODEL, (TEXT, 1, 2), "MCQ", 90, fused=False))
+    pipeline.qna_supervisor.supervise_quiz([{"question": "Q?", "answer": "A", "type": "MCQ", "options": ["A. x", "B. y"]}], model=MODEL, threshold=0)
+    assert len(stub_keys) == 3
+    assert sorted(stub_keys) == sorted(client_keys)
+
+def test_plain_text_requests_get_plain_text(pipeline):
+    body = {"model": MODEL, "messages": pipeline.build_messages(TEXT), "format": None}
+    reply = ollama_stub.synthesize(body, random.Random(0), 2)
+    with pytest.raises(ValueError):
+        json.loads(reply)
+    assert reply.split(". ")[0] in TEXT